@@ -0,0 +1 @@
+from .analysis_cache import AnalysisCache, hash_file
\ No newline at end of file
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Versão do formato das entradas; mudar invalida todo o cache.
+CACHE_FORMAT_VERSION = 1
+
+
+def hash_file(path, chunk_size=16 * 1024 * 1024):
+    # SHA-256 do conteúdo do arquivo, lido em blocos para não carregar o vídeo inteiro em memória.
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache():
+    # Cache endereçado por conteúdo: a chave é o hash do vídeo, dos pesos do modelo e dos parâmetros da etapa.
+    # Cada entrada é um diretório com um .npy por array (carregado com mmap, sem unpickle) e um meta.json.
+    # Entradas antigas são removidas por LRU quando o tamanho total passa de max_size_bytes.
+    def __init__(self, root='cache', max_size_bytes=20 * 1024 ** 3):
+        self.root = root
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._index_path = os.path.join(self.root, 'index.json')
+        self._file_hashes_path = os.path.join(self.root, 'file_hashes.json')
+
+    @contextmanager
+    def _locked(self):
+        # Trava o índice para que vários processos possam usar o mesmo cache.
+        with open(os.path.join(self.root, 'index.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_json(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temporary_path, path)
+
+    def file_hash(self, path):
+        # Reaproveita o hash enquanto tamanho e data de modificação do arquivo não mudarem.
+        stat = os.stat(path)
+        signature = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        with self._locked():
+            known = self._read_json(self._file_hashes_path)
+        if signature in known:
+            return known[signature]
+        digest = hash_file(path)
+        with self._locked():
+            known = self._read_json(self._file_hashes_path)
+            known[signature] = digest
+            self._write_json(self._file_hashes_path, known)
+        return digest
+
+    def make_key(self, stage, files=None, params=None):
+        description = {
+            "version": CACHE_FORMAT_VERSION,
+            "stage": stage,
+            "files": {name: self.file_hash(path) for name, path in sorted((files or {}).items())},
+            "params": params or {},
+        }
+        encoded = json.dumps(description, sort_keys=True, default=str).encode()
+        return f"{stage}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+
+    def get(self, key):
+        # Retorna (arrays, metadata) ou None. Os arrays são memory-mapped e somente leitura.
+        entry_path = os.path.join(self.root, key)
+        with self._locked():
+            index = self._read_json(self._index_path)
+            entry = index.get("entries", {}).get(key)
+            if entry is None or not os.path.isdir(entry_path):
+                self.misses += 1
+                self._record_stats(index, misses=1)
+                self._write_json(self._index_path, index)
+                return None
+            entry["last_access"] = time.time()
+            self.hits += 1
+            self._record_stats(index, hits=1)
+            self._write_json(self._index_path, index)
+
+        with open(os.path.join(entry_path, 'meta.json')) as f:
+            metadata = json.load(f)
+        arrays = {name: np.load(os.path.join(entry_path, f"{name}.npy"), mmap_mode='r')
+                  for name in metadata["arrays"]}
+        return arrays, metadata.get("metadata", {})
+
+    def put(self, key, arrays, metadata=None):
+        # Grava em um diretório temporário e renomeia, para que leitores nunca vejam entradas incompletas.
+        temporary_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(temporary_path)
+        size = 0
+        for name, values in arrays.items():
+            array_path = os.path.join(temporary_path, f"{name}.npy")
+            np.save(array_path, np.ascontiguousarray(values))
+            size += os.path.getsize(array_path)
+        with open(os.path.join(temporary_path, 'meta.json'), 'w') as f:
+            json.dump({"arrays": list(arrays), "metadata": metadata or {}, "created": time.time()}, f)
+
+        entry_path = os.path.join(self.root, key)
+        with self._locked():
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path)
+            os.replace(temporary_path, entry_path)
+            index = self._read_json(self._index_path)
+            index.setdefault("entries", {})[key] = {"size": size, "last_access": time.time()}
+            self._evict(index, keep=key)
+            self._write_json(self._index_path, index)
+
+    def _evict(self, index, keep=None):
+        entries = index.get("entries", {})
+        total_size = sum(entry["size"] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_access"]):
+            if total_size <= self.max_size_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total_size -= entries.pop(key)["size"]
+            self.evictions += 1
+            self._record_stats(index, evictions=1)
+
+    def _record_stats(self, index, hits=0, misses=0, evictions=0):
+        # Além dos contadores desta instância, o índice guarda os totais acumulados entre execuções.
+        totals = index.setdefault("stats", {"hits": 0, "misses": 0, "evictions": 0})
+        totals["hits"] += hits
+        totals["misses"] += misses
+        totals["evictions"] += evictions
+
+    def stats(self):
+        with self._locked():
+            index = self._read_json(self._index_path)
+        entries = index.get("entries", {})
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(entries),
+            "total_bytes": sum(entry["size"] for entry in entries.values()),
+            "max_bytes": self.max_size_bytes,
+            "lifetime": index.get("stats", {"hits": 0, "misses": 0, "evictions": 0}),
+        }
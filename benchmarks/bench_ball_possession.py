@@ -0,0 +1,113 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import TrackTable, OBJECT_CLASSES, measure_distance
+from player_ball_assigner import PlayerBallAssigner
+
+# Uso: python -m benchmarks.bench_ball_possession --minutes 10 90 --players 22
+# Posse de bola em partidas sintéticas: laço em Python com measure_distance por jogador e por quadro vs.
+# a busca vetorizada do PlayerBallAssigner sobre a partida inteira.
+
+
+def generate_match(minutes, players, fps=24, seed=0):
+    # Jogadores em passeio aleatório (em pixels); a bola fica nos pés de um jogador que muda a cada ~2 s,
+    # está no ar (longe de todos) em 20% dos quadros e some em 5% deles. Metade dos jogadores é de cada time.
+    rng = np.random.default_rng(seed)
+    num_frames = int(minutes * 60 * fps)
+    steps = rng.normal(0, 3, (num_frames, players, 2))
+    feet = np.cumsum(steps, axis=0) + rng.uniform([100, 300], [1800, 1000], (1, players, 2))
+    feet = np.abs((feet - [100, 300]) % (2 * np.array([1700, 700]))[None] - [1700, 700]) + [100, 300]
+    carrier = np.repeat(rng.integers(0, players, num_frames // (2 * fps) + 1), 2 * fps)[:num_frames]
+    ball = feet[np.arange(num_frames), carrier] + rng.normal(0, 15, (num_frames, 2))
+    in_flight = rng.random(num_frames) < 0.2
+    ball[in_flight] += rng.choice([-1, 1], (in_flight.sum(), 2)) * 400
+    has_ball = rng.random(num_frames) >= 0.05
+
+    frame = np.repeat(np.arange(num_frames, dtype=np.int32), players)
+    # A cada 1000 quadros cada jogador ganha um novo track_id, como acontece após oclusões.
+    track_id = np.tile(np.arange(1, players + 1, dtype=np.int32), num_frames) + (frame // 1000) * players
+    foot = feet.reshape(-1, 2)
+    bbox = np.concatenate([foot - [20, 60], foot + [20, 0]], axis=1)
+    ball_frames = np.flatnonzero(has_ball)
+    ball_bbox = np.concatenate([ball[ball_frames] - 6, ball[ball_frames] + 6], axis=1)
+
+    tracks = TrackTable(np.r_[frame, ball_frames],
+                        np.r_[np.full(len(frame), OBJECT_CLASSES.index('player')),
+                              np.full(len(ball_frames), OBJECT_CLASSES.index('ball'))],
+                        np.r_[track_id, np.ones(len(ball_frames), dtype=np.int32)],
+                        np.concatenate([bbox, ball_bbox]), num_frames=num_frames)
+    position = np.stack([(tracks.bbox[:, 0] + tracks.bbox[:, 2]) / 2, tracks.bbox[:, 3]], axis=1)
+    is_ball = tracks.object_mask('ball')
+    position[is_ball, 1] = (tracks.bbox[is_ball, 1] + tracks.bbox[is_ball, 3]) / 2
+    tracks.set_column('position', np.trunc(position))
+    team = np.where((tracks.track_id - 1) % players < players // 2, 1, 2).astype(np.float32)
+    team[is_ball] = np.nan
+    tracks.set_column('team', team)
+    return tracks
+
+
+def possession_one_by_one(tracks, max_player_ball_distance=70):
+    # Caminho ingênuo: em cada quadro, mede a distância da bola a cada jogador com measure_distance.
+    position = tracks.get_column('position')
+    team = tracks.get_column('team')
+    holder = []
+    team_ball_control = []
+    for frame_num in range(tracks.num_frames):
+        rows = range(*tracks.frame_slice(frame_num).indices(len(tracks)))
+        ball_position = None
+        for row in rows:
+            if tracks.object_class[row] == OBJECT_CLASSES.index('ball'):
+                ball_position = position[row].tolist()
+        assigned_player, assigned_team, minimum_distance = -1, None, 99999
+        if ball_position is not None:
+            for row in rows:
+                if tracks.object_class[row] != OBJECT_CLASSES.index('player'):
+                    continue
+                distance = measure_distance(position[row].tolist(), ball_position)
+                if distance < max_player_ball_distance and distance < minimum_distance:
+                    minimum_distance = distance
+                    assigned_player, assigned_team = int(tracks.track_id[row]), int(team[row])
+        holder.append(assigned_player)
+        # Sem dono, a posse fica com o último time que teve a bola.
+        team_ball_control.append(assigned_team if assigned_team is not None else
+                                 (team_ball_control[-1] if team_ball_control else None))
+    return np.array(holder), team_ball_control
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Posse de bola: laço por jogador vs. busca vetorizada.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 90])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--skip-naive-above", type=float, default=90,
+                        help="não roda o laço em Python em partidas mais longas que isso (minutos)")
+    args = parser.parse_args()
+
+    print(f"{'minutos':>8}{'linhas':>11}{'laço s':>9}{'vetorizado s':>14}{'speedup':>9}{'iguais':>9}"
+          f"{'posse time 1/2 (%)':>21}")
+    for minutes in args.minutes:
+        tracks = generate_match(minutes, args.players)
+        assigner = PlayerBallAssigner()
+        start = time.perf_counter()
+        possession = assigner.assign_ball_possession(tracks)
+        vectorized_seconds = time.perf_counter() - start
+
+        naive_seconds, agreement = float('nan'), float('nan')
+        if minutes <= args.skip_naive_above:
+            start = time.perf_counter()
+            naive_holder, _ = possession_one_by_one(tracks, assigner.max_player_ball_distance)
+            naive_seconds = time.perf_counter() - start
+            # Compara o jogador mais próximo de cada quadro, antes da suavização.
+            nearest = assigner.nearest_players(tracks)
+            vectorized_holder = np.full(len(nearest), -1)
+            vectorized_holder[nearest >= 0] = tracks.track_id[nearest[nearest >= 0]]
+            agreement = float((naive_holder == vectorized_holder).mean())
+        summary = PlayerBallAssigner.summary(possession)
+        print(f"{minutes:>8.0f}{len(tracks):>11}{naive_seconds:>9.2f}{vectorized_seconds:>14.3f}"
+              f"{naive_seconds / vectorized_seconds:>8.0f}x{agreement:>9.2%}"
+              f"{summary['team_1']:>12.1f} / {summary['team_2']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import itertools
+import time
+import sys
+sys.path.append('../')
+from utils import read_video_stream
+from trackers import Tracker
+
+# Uso: python -m benchmarks.bench_ball_roi [--video input_videos/2e57b9_3.mp4] [--model models/best.pt]
+# Compara a bola detectada só no quadro inteiro com a busca em recorte (BALL_ROI), com e sem quadros-chave.
+
+
+def run_tracking(model_path, frames, ball_roi=False, keyframe_interval=None):
+    tracker = Tracker(model_path, ball_roi=ball_roi, keyframe_interval=keyframe_interval)
+    track_builder = tracker.create_track_builder()
+    start = time.perf_counter()
+    tracker.track_frames(frames, track_builder)
+    elapsed = time.perf_counter() - start
+    return tracker, track_builder.build(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quadros com bola e custo da busca da bola em recorte.")
+    parser.add_argument("--video", default="input_videos/2e57b9_3.mp4")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--frames", type=int, default=300, help="número máximo de quadros analisados")
+    parser.add_argument("--keyframe-interval", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(read_video_stream(args.video), args.frames))
+    print(f"{'modo':<24}{'quadros com bola':>18}{'após interpolar':>17}{'s':>8}{'hit rate ROI':>14}")
+    for name, ball_roi, keyframe_interval in (("quadro inteiro", False, None), ("recorte", True, None),
+                                              (f"quadro-chave K={args.keyframe_interval}", False,
+                                               args.keyframe_interval),
+                                              (f"K={args.keyframe_interval} + recorte", True,
+                                               args.keyframe_interval)):
+        tracker, tracks, seconds = run_tracking(args.model, frames, ball_roi, keyframe_interval)
+        ball_frames = int(tracks.object_mask('ball').sum())
+        interpolated_frames = int(tracker.interpolate_ball_positions(tracks).object_mask('ball').sum())
+        hit_rate = tracker.ball_tracker.report()["roi_hit_rate"] if tracker.ball_tracker is not None else 0.0
+        print(f"{name:<24}{ball_frames:>12}/{len(frames):<5}{interpolated_frames:>11}/{len(frames):<5}"
+              f"{seconds:>8.2f}{hit_rate:>14.1%}")
+
+
+if __name__ == '__main__':
+    main()
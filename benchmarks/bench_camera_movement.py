@@ -0,0 +1,64 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import read_video
+from camera_movement_estimator import CameraMovementEstimator
+from benchmarks.synthetic import generate_panning_frames
+
+# Uso: python -m benchmarks.bench_camera_movement [--video input_videos/2e57b9_3.mp4]
+
+CONFIGURATIONS = [
+    ("full frame (atual)", dict(flow_scale=1.0, crop_to_mask=False)),
+    ("strips", dict(flow_scale=1.0, crop_to_mask=True)),
+    ("strips 0.5x", dict(flow_scale=0.5, crop_to_mask=True)),
+    ("strips 0.25x", dict(flow_scale=0.25, crop_to_mask=True)),
+    ("full frame 0.5x", dict(flow_scale=0.5, crop_to_mask=False)),
+]
+
+
+def estimate(frames, **options):
+    camera_movement_estimator = CameraMovementEstimator(frames[0], **options)
+    start = time.perf_counter()
+    camera_movement_estimator.reset()
+    movement = camera_movement_estimator.estimate_frames(frames)
+    elapsed = time.perf_counter() - start
+    return np.array(movement, dtype=np.float64), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de precisão vs. velocidade do movimento da câmera.")
+    parser.add_argument("--video", default=None, help="vídeo de entrada; sem ele usa quadros sintéticos")
+    parser.add_argument("--frames", type=int, default=240, help="quadros sintéticos")
+    args = parser.parse_args()
+
+    # Nos quadros sintéticos o movimento real é conhecido e também entra no relatório.
+    true_motion = None
+    if args.video:
+        frames = read_video(args.video)
+    else:
+        frames, true_motion = generate_panning_frames(args.frames, return_motion=True)
+    reference, reference_seconds = estimate(frames, **CONFIGURATIONS[0][1])
+
+    header = f"{'configuração':<22}{'ms/quadro':>10}{'speedup':>9}{'erro médio px':>15}{'erro máx px':>13}" \
+             f"{'quadros c/ movimento diferente':>32}"
+    if true_motion is not None:
+        header += f"{'erro médio vs real px':>23}"
+    print(header)
+    for name, options in CONFIGURATIONS:
+        movement, seconds = estimate(frames, **options)
+        error = np.linalg.norm(movement - reference, axis=1)
+        moving_mismatch = int(((np.abs(movement).sum(axis=1) > 0) != (np.abs(reference).sum(axis=1) > 0)).sum())
+        line = f"{name:<22}{seconds / len(frames) * 1000:>10.2f}{reference_seconds / seconds:>9.1f}" \
+               f"{error.mean():>15.2f}{error.max():>13.2f}{moving_mismatch:>32}"
+        if true_motion is not None:
+            # Quadros abaixo de minimum_distance são registrados como zero, então só os demais são comparados.
+            moving = np.abs(movement).sum(axis=1) > 0
+            true_error = np.linalg.norm(movement[moving] - true_motion[moving], axis=1)
+            line += f"{true_error.mean() if len(true_error) else 0:>23.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import time
+import sys
+import numpy as np
+import supervision as sv
+sys.path.append('../')
+from utils import TrackTableBuilder
+from trackers import Tracker
+
+# Uso: python -m benchmarks.bench_detections_to_tracks [--frames 10000 --objects 50]
+# Mede apenas a conversão sv.Detections -> trilhas (o ByteTrack, igual nos dois caminhos, fica de fora).
+
+CLASS_NAMES = {0: 'ball', 1: 'goalkeeper', 2: 'player', 3: 'referee'}
+
+
+def generate_detections(num_frames, num_objects, seed=0):
+    # Um quadro típico: uma bola, dois goleiros, três árbitros e o restante jogadores, já com tracker_id.
+    rng = np.random.default_rng(seed)
+    class_id = np.full(num_objects, 2)
+    class_id[0], class_id[1:3], class_id[3:6] = 0, 1, 3
+    stream = []
+    for _ in range(num_frames):
+        xy = rng.uniform(0, 1800, (num_objects, 2)).astype(np.float32)
+        xyxy = np.hstack([xy, xy + rng.uniform(10, 90, (num_objects, 2)).astype(np.float32)])
+        stream.append(sv.Detections(xyxy=xyxy, confidence=np.full(num_objects, 0.9, dtype=np.float32),
+                                    class_id=rng.permutation(class_id), tracker_id=np.arange(1, num_objects + 1)))
+    return stream
+
+
+def add_rows_one_by_one(detection_supervision, class_name, track_builder):
+    # Caminho anterior: inverte os nomes e percorre as detecções linha a linha em todo quadro.
+    frame_num = track_builder.new_frame()
+    class_name_inv = {v: k for k, v in class_name.items()}
+    for object_ind, class_id in enumerate(detection_supervision.class_id):
+        if class_name[class_id] == "goalkeeper":
+            detection_supervision.class_id[object_ind] = class_name_inv["player"]
+    detection_with_tracking = detection_supervision
+    for frame_detection in detection_with_tracking:
+        bbox = frame_detection[0].tolist()
+        class_id = frame_detection[3]
+        track_id = frame_detection[4]
+        if class_id == class_name_inv["player"]:
+            track_builder.add(frame_num, "player", track_id, bbox)
+        if class_id == class_name_inv["referee"]:
+            track_builder.add(frame_num, "referees", track_id, bbox)
+    ball_bbox = None
+    for frame_detection in detection_supervision:
+        bbox = frame_detection[0].tolist()
+        if frame_detection[3] == class_name_inv["ball"]:
+            ball_bbox = bbox
+    if ball_bbox is not None:
+        track_builder.add(frame_num, "ball", 1, ball_bbox)
+
+
+def add_rows_vectorized(detection_supervision, class_name, track_builder):
+    # Caminho atual do Tracker, sem a chamada ao ByteTrack.
+    frame_num = track_builder.new_frame()
+    class_name_inv = {v: k for k, v in class_name.items()}
+    class_id = detection_supervision.class_id
+    class_id[class_id == class_name_inv["goalkeeper"]] = class_name_inv["player"]
+    Tracker.add_tracked_detections_to_tracks(frame_num, detection_supervision, detection_supervision, class_name_inv,
+                                             track_builder)
+
+
+def run(conversion, stream):
+    track_builder = TrackTableBuilder()
+    started = time.perf_counter()
+    for detection in stream:
+        conversion(detection, CLASS_NAMES, track_builder)
+    elapsed = time.perf_counter() - started
+    return track_builder.build(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversão de sv.Detections em trilhas: linha a linha vs. máscaras.")
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=50)
+    args = parser.parse_args()
+
+    stream = generate_detections(args.frames, args.objects)
+    # Cada caminho recebe sua própria cópia, pois a troca goleiro -> jogador altera class_id no lugar.
+    copies = [[sv.Detections(xyxy=d.xyxy, confidence=d.confidence, class_id=d.class_id.copy(),
+                             tracker_id=d.tracker_id) for d in stream] for _ in range(2)]
+    legacy, legacy_seconds = run(add_rows_one_by_one, copies[0])
+    vectorized, vectorized_seconds = run(add_rows_vectorized, copies[1])
+
+    identical = all(np.array_equal(getattr(legacy, name), getattr(vectorized, name))
+                    for name in ("frame", "object_class", "track_id", "bbox"))
+    print(f"{args.frames} quadros x {args.objects} objetos ({len(legacy)} linhas)")
+    print(f"linha a linha: {legacy_seconds:.2f} s ({legacy_seconds / args.frames * 1e6:.0f} us/quadro)")
+    print(f"máscaras:      {vectorized_seconds:.2f} s ({vectorized_seconds / args.frames * 1e6:.0f} us/quadro)")
+    print(f"speedup: {legacy_seconds / vectorized_seconds:.1f}x, trilhas idênticas: {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import TrackTable, OBJECT_CLASSES
+from heatmap import PitchHeatmap, MinimapRenderer, render_pitch_background
+from renderer import FrameRenderer
+
+# Uso: python -m benchmarks.bench_heatmap --minutes 10 90 --players 22 --resolution 1920x1080
+# 1) Mapas de ocupação: um incremento por ponto em Python vs. PitchHeatmap.update por quadro e por janela.
+# 2) Custo por quadro do minimapa no FrameRenderer: sem minimapa, com o fundo em cache e redesenhando o fundo
+#    em todo quadro.
+
+
+def generate_tracks(minutes, players, fps=24, seed=0):
+    # Jogadores em passeio aleatório dentro da região do campo do ViewTransformer (em metros), com 2% das
+    # posições fora do campo (NaN); metade dos jogadores é de cada time.
+    rng = np.random.default_rng(seed)
+    num_frames = int(minutes * 60 * fps)
+    size = np.array([23.32, 68])
+    steps = rng.normal(0, 0.2, (num_frames, players, 2))
+    position = np.cumsum(steps, axis=0) + rng.uniform(0, 1, (1, players, 2)) * size
+    position = (np.abs((position % (2 * size)) - size)).reshape(-1, 2)
+    position[rng.random(len(position)) < 0.02] = np.nan
+    frame = np.repeat(np.arange(num_frames, dtype=np.int32), players)
+    track_id = np.tile(np.arange(1, players + 1, dtype=np.int32), num_frames) + (frame // 1000) * players
+    tracks = TrackTable(frame, np.full(len(frame), OBJECT_CLASSES.index('player')), track_id,
+                        np.zeros((len(frame), 4)), num_frames=num_frames)
+    tracks.set_column('position_transformed', position)
+    tracks.set_column('team', np.where((track_id - 1) % players < players // 2, 1, 2))
+    return tracks
+
+
+def heatmap_point_by_point(tracks, heatmap):
+    # Caminho ingênuo: converte e soma cada posição na célula do jogador e na do time, uma por vez.
+    player_counts, team_counts = {}, np.zeros((3, *heatmap.shape), dtype=np.int64)
+    position = tracks.get_column('position_transformed')
+    team = tracks.get_column('team')
+    for row in range(len(tracks)):
+        x, y = position[row]
+        if np.isnan(x) or np.isnan(y):
+            continue
+        column = min(max(int(x // heatmap.bin_size), 0), heatmap.shape[1] - 1)
+        line = min(max(int(y // heatmap.bin_size), 0), heatmap.shape[0] - 1)
+        track_id = int(tracks.track_id[row])
+        if track_id not in player_counts:
+            player_counts[track_id] = np.zeros(heatmap.shape, dtype=np.int32)
+        player_counts[track_id][line, column] += 1
+        team_counts[int(team[row]), line, column] += 1
+    return player_counts, team_counts
+
+
+def time_heatmaps(tracks, skip_naive):
+    timings = {}
+    reference = None
+    for name, window in (("por ponto", None), ("por quadro", 1), ("janela 1000", 1000)):
+        heatmap = PitchHeatmap()
+        if name == "por ponto":
+            if skip_naive:
+                timings[name] = float('nan')
+                continue
+            start = time.perf_counter()
+            _, reference = heatmap_point_by_point(tracks, heatmap)
+            timings[name] = time.perf_counter() - start
+            continue
+        start = time.perf_counter()
+        heatmap.add_tracks(tracks, window=window)
+        timings[name] = time.perf_counter() - start
+        if reference is not None:
+            assert np.array_equal(heatmap.team_counts.reshape(reference.shape), reference)
+    return timings
+
+
+class UncachedMinimapRenderer(MinimapRenderer):
+    # Redesenha o fundo do campo em todo quadro, como seria sem o cache.
+    def draw(self, frame, positions, object_classes, team=None, team_colors=None):
+        render_pitch_background.cache_clear()
+        self.background = render_pitch_background(self.pitch_length, self.pitch_width, self.scale)
+        return super().draw(frame, positions, object_classes, team, team_colors)
+
+
+def time_minimap(width, height, players, frames=300, seed=0):
+    # Milissegundos por quadro de FrameRenderer.render_frame com cada variante do minimapa.
+    tracks = generate_tracks(frames / (60 * 24), players, seed=seed)
+    tracks.bbox[:] = np.random.default_rng(seed).uniform(0, min(width, height) - 100, (len(tracks), 1)) + \
+        np.array([0, 0, 40, 90])
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    timings = {}
+    for name, minimap in (("sem minimapa", None), ("fundo em cache", MinimapRenderer()),
+                          ("fundo por quadro", UncachedMinimapRenderer())):
+        renderer = FrameRenderer(tracks, minimap=minimap)
+        start = time.perf_counter()
+        for frame_num in range(tracks.num_frames):
+            renderer.render_frame(frame, frame_num)
+        timings[name] = 1000 * (time.perf_counter() - start) / tracks.num_frames
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapas de ocupação e custo do minimapa por quadro.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 90])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--skip-naive-above", type=float, default=10,
+                        help="não roda o laço por ponto em partidas mais longas que isso (minutos)")
+    args = parser.parse_args()
+
+    print(f"{'minutos':>8}{'linhas':>11}{'por ponto s':>13}{'por quadro s':>14}{'janela 1000 s':>15}")
+    for minutes in args.minutes:
+        tracks = generate_tracks(minutes, args.players)
+        timings = time_heatmaps(tracks, minutes > args.skip_naive_above)
+        print(f"{minutes:>8.0f}{len(tracks):>11}{timings['por ponto']:>13.2f}{timings['por quadro']:>14.2f}"
+              f"{timings['janela 1000']:>15.3f}")
+
+    width, height = (int(value) for value in args.resolution.lower().split("x"))
+    timings = time_minimap(width, height, args.players)
+    print(f"render_frame {width}x{height}, {args.players} jogadores (ms/quadro):")
+    for name, milliseconds in timings.items():
+        print(f"  {name:<18}{milliseconds:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import itertools
+import json
+import time
+import sys
+sys.path.append('../')
+from ultralytics import YOLO
+from utils import read_video_stream, iter_frame_windows
+from trackers.inference_backend import InferenceBackend
+
+# Uso: python -m benchmarks.bench_inference_backend [--video input_videos/2e57b9_3.mp4] [--backends pytorch onnx]
+# Mede quadros/s de cada backend de inferência, com o lote escolhido automaticamente.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quadros por segundo de cada backend de inferência.")
+    parser.add_argument("--video", default="input_videos/2e57b9_3.mp4")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx"])
+    parser.add_argument("--output", default=None, help="grava o relatório em JSON")
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(read_video_stream(args.video), args.frames))
+    frame_size = (frames[0].shape[1], frames[0].shape[0])
+    reports = []
+
+    # Referência: o caminho atual do Tracker (YOLO.predict com lotes fixos de 20 quadros).
+    model = YOLO(args.model)
+    model.predict(frames[:1], conf=0.1, verbose=False)
+    started = time.perf_counter()
+    for frames_batch in iter_frame_windows(frames, 20):
+        model.predict(frames_batch, conf=0.1, verbose=False)
+    seconds = time.perf_counter() - started
+    reports.append({"backend": "ultralytics (atual)", "batch_size": 20, "frames": len(frames),
+                    "seconds": round(seconds, 4), "fps": round(len(frames) / seconds, 2)})
+
+    for backend_name in args.backends:
+        backend = InferenceBackend(args.model, backend_name, frame_size=frame_size)
+        for frames_batch in iter_frame_windows(frames, backend.batch_size):
+            backend.predict(frames_batch)
+        reports.append(backend.report())
+
+    print(f"{'backend':<22}{'lote':>6}{'quadros':>9}{'s':>9}{'quadros/s':>11}")
+    for report in reports:
+        print(f"{report['backend']:<22}{report['batch_size']:>6}{report['frames']:>9}{report['seconds']:>9.2f}"
+              f"{report['fps']:>11.1f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
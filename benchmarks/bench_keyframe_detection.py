@@ -0,0 +1,78 @@
+import argparse
+import itertools
+import time
+import sys
+import numpy as np
+import supervision as sv
+sys.path.append('../')
+from utils import read_video_stream
+from trackers import Tracker
+
+# Uso: python -m benchmarks.bench_keyframe_detection [--video input_videos/2e57b9_3.mp4] [--model models/best.pt]
+# Compara o rastreamento com detecção em todos os quadros e no modo de quadros-chave.
+
+
+def count_id_switches(reference, candidate, iou_threshold=0.5):
+    # Associa, quadro a quadro, cada caixa da referência à caixa do candidato de maior IoU (mesma classe).
+    # Há uma troca de ID quando uma trilha da referência passa a corresponder a outro ID do candidato.
+    matched_ids = {}
+    matches = 0
+    switches = 0
+    for frame_num in range(min(reference.num_frames, candidate.num_frames)):
+        reference_rows = reference.frame_slice(frame_num)
+        candidate_rows = candidate.frame_slice(frame_num)
+        for object_class in np.unique(reference.object_class[reference_rows]):
+            reference_mask = reference.object_class[reference_rows] == object_class
+            candidate_mask = candidate.object_class[candidate_rows] == object_class
+            if not candidate_mask.any():
+                continue
+            iou = sv.box_iou_batch(reference.bbox[reference_rows][reference_mask],
+                                   candidate.bbox[candidate_rows][candidate_mask])
+            best = iou.argmax(axis=1)
+            reference_ids = reference.track_id[reference_rows][reference_mask]
+            candidate_ids = candidate.track_id[candidate_rows][candidate_mask]
+            for row in np.flatnonzero(iou.max(axis=1) >= iou_threshold):
+                key = (int(object_class), int(reference_ids[row]))
+                candidate_id = int(candidate_ids[best[row]])
+                if key in matched_ids and matched_ids[key] != candidate_id:
+                    switches += 1
+                matched_ids[key] = candidate_id
+                matches += 1
+    return switches, matches
+
+
+def run_tracking(model_path, frames, keyframe_interval=None):
+    tracker = Tracker(model_path, keyframe_interval=keyframe_interval)
+    track_builder = tracker.create_track_builder()
+    start = time.perf_counter()
+    tracker.track_frames(frames, track_builder)
+    elapsed = time.perf_counter() - start
+    detected_frames = len(frames) if tracker.keyframe_detector is None else \
+        tracker.keyframe_detector.report()["detected_frames"]
+    return track_builder.build(), detected_frames, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Economia de detecções e trocas de ID no modo de quadros-chave.")
+    parser.add_argument("--video", default="input_videos/2e57b9_3.mp4")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--frames", type=int, default=300, help="número máximo de quadros analisados")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[2, 3, 5, 10])
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(read_video_stream(args.video), args.frames))
+    reference, _, reference_seconds = run_tracking(args.model, frames)
+
+    print(f"{'modo':<18}{'detecções':>11}{'economia':>10}{'s':>8}{'speedup':>9}{'trocas de ID':>14}"
+          f"{'taxa de troca':>15}")
+    print(f"{'todos os quadros':<18}{len(frames):>11}{0:>9.0%}{reference_seconds:>8.2f}{1:>9.1f}{0:>14}{0:>14.2%}")
+    for keyframe_interval in args.intervals:
+        tracks, detected_frames, seconds = run_tracking(args.model, frames, keyframe_interval)
+        switches, matches = count_id_switches(reference, tracks)
+        print(f"{f'quadro-chave K={keyframe_interval}':<18}{detected_frames:>11}"
+              f"{1 - detected_frames / len(frames):>9.0%}{seconds:>8.2f}{reference_seconds / seconds:>9.1f}"
+              f"{switches:>14}{switches / matches if matches else 0:>14.2%}")
+
+
+if __name__ == '__main__':
+    main()
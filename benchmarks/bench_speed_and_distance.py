@@ -0,0 +1,49 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import TrackTable, OBJECT_CLASSES
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+
+# Uso: python -m benchmarks.bench_speed_and_distance --minutes 10 45 90 --objects 30
+
+
+def generate_tracks(minutes, objects, fps=24, seed=0):
+    # Jogadores em passeio aleatório (em metros) durante toda a partida; 2% das posições ficam fora do campo (NaN)
+    # e a cada 1000 quadros cada jogador ganha um novo track_id, como acontece após oclusões.
+    rng = np.random.default_rng(seed)
+    number_of_frames = int(minutes * 60 * fps)
+    frame = np.repeat(np.arange(number_of_frames, dtype=np.int32), objects)
+    track_id = np.tile(np.arange(objects, dtype=np.int32), number_of_frames) + (frame // 1000) * objects
+    steps = rng.normal(0, 0.2, (number_of_frames, objects, 2))
+    position = (np.cumsum(steps, axis=0) + rng.uniform(0, 60, (1, objects, 2))).reshape(-1, 2)
+    position[rng.random(len(position)) < 0.02] = np.nan
+    tracks = TrackTable(frame, np.full(len(frame), OBJECT_CLASSES.index('player')), track_id,
+                        np.zeros((len(frame), 4)), num_frames=number_of_frames)
+    tracks.set_column('position_transformed', position)
+    return tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escala do cálculo de velocidade e distância com a duração do jogo.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 45, 90])
+    parser.add_argument("--objects", type=int, default=30, help="jogadores rastreados por quadro")
+    args = parser.parse_args()
+
+    print(f"{'minutos':>8}{'linhas':>11}{'blocos s':>10}{'janela deslizante s':>21}{'linhas/s (deslizante)':>23}")
+    for minutes in args.minutes:
+        tracks = generate_tracks(minutes, args.objects)
+        timings = {}
+        for method in ('blocks', 'rolling'):
+            estimator = SpeedAndDistanceEstimator(method=method)
+            tracks._track_index = None  # o índice por trilha entra na medição
+            start = time.perf_counter()
+            estimator.add_speed_and_distance_to_tracks(tracks)
+            timings[method] = time.perf_counter() - start
+        print(f"{minutes:>8.0f}{len(tracks):>11}{timings['blocks']:>10.2f}{timings['rolling']:>21.2f}"
+              f"{len(tracks) / timings['rolling']:>23,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import sys
+import cv2
+import numpy as np
+import supervision as sv
+sys.path.append('../')
+from utils import VideoEncoder, iter_frame_windows, OBJECT_CLASSES
+from trackers import Tracker
+from camera_movement_estimator import CameraMovementEstimator
+from view_trasformer import ViewTransformer
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from renderer import FrameRenderer
+from player_ball_assigner import PlayerBallAssigner
+from heatmap import PitchHeatmap, MinimapRenderer
+from track_archive import TrackArchive
+from instrumentation import Instrumentation
+from benchmarks.synthetic import SyntheticPitchVideo
+from benchmarks.mock_detector import MockDetector
+
+# Uso: python -m benchmarks.bench_suite --frames 250 1000 --resolutions 1280x720 1920x1080
+#      python -m benchmarks.bench_suite --compare benchmarks/results/<antes>.json benchmarks/results/<depois>.json
+# Roda todas as etapas da análise sobre vídeos sintéticos (SyntheticPitchVideo) com o detector simulado
+# (MockDetector), sem models/best.pt nem vídeos reais, e grava os tempos por etapa em
+# benchmarks/results/<commit>.json para comparar execuções entre commits.
+
+# Etapas medidas, na ordem da análise; 'synthesize' e 'mock_detection' não fazem parte do código da análise,
+# mas ficam no resultado para separar o custo do próprio benchmark.
+STAGES = ("synthesize", "mock_detection", "tracking", "team_assignment", "camera_movement", "interpolate_ball",
+          "position", "adjust_positions", "view_transform", "speed", "ball_possession", "heatmaps",
+          "track_archive", "render", "encode")
+
+
+def git_revision():
+    # Commit atual e se há alterações não commitadas nos arquivos versionados.
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit.strip(), bool(status.strip())
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "supervision": sv.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_scale(num_frames, width, height, window=50, fps=24, seed=0):
+    # Uma execução completa sobre um vídeo sintético: rastreamento e movimento da câmera janela a janela,
+    # etapas por tabela sobre a partida inteira e, em uma segunda passada pelos quadros, desenho e gravação.
+    instrumentation = Instrumentation(run_name=f"{num_frames}x{width}x{height}")
+    stage = instrumentation.stage
+    with stage("synthesize"):
+        video = SyntheticPitchVideo(num_frames, width, height, seed=seed)
+
+    tracker = Tracker('mock', model=MockDetector(), assign_teams=True)
+    tracker.reset_tracking()
+    track_builder = tracker.create_track_builder()
+    camera_movement_estimator = None
+    camera_movement = []
+    for start in range(0, num_frames, window):
+        with stage("synthesize", frames=min(window, num_frames - start)):
+            frames = list(video.iter_frames(start, start + window))
+        if camera_movement_estimator is None:
+            camera_movement_estimator = CameraMovementEstimator(frames[0])
+        with stage("mock_detection", frames=len(frames)):
+            detections = tracker.detect_batch(frames)
+        first_rows = []
+        with stage("tracking", frames=len(frames)):
+            for detection_supervision, class_name in detections:
+                first_rows.append(track_builder.size)
+                tracker.add_supervision_detection_to_tracks(detection_supervision, class_name, track_builder)
+        with stage("team_assignment", frames=len(frames)):
+            for frame, start, stop in zip(frames, first_rows, first_rows[1:] + [track_builder.size]):
+                object_class, track_id, bbox = track_builder.rows(start, stop)
+                is_player = object_class == OBJECT_CLASSES.index('player')
+                tracker.team_assigner.update(frame, track_id[is_player], bbox[is_player])
+        with stage("camera_movement", frames=len(frames)):
+            camera_movement.extend(camera_movement_estimator.estimate_frames(frames))
+
+    tracks = track_builder.build()
+    with stage("team_assignment"):
+        tracker.add_team_to_tracks(tracks)
+    with stage("interpolate_ball", frames=num_frames):
+        tracks = tracker.interpolate_ball_positions(tracks)
+    with stage("position", frames=num_frames):
+        tracker.add_position_to_tracks(tracks)
+    with stage("adjust_positions", frames=num_frames):
+        camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement)
+    with stage("view_transform", frames=num_frames):
+        ViewTransformer().add_transformed_position_to_tracks(tracks)
+    with stage("speed", frames=num_frames):
+        SpeedAndDistanceEstimator(frame_rate=fps).add_speed_and_distance_to_tracks(tracks)
+    with stage("ball_possession", frames=num_frames):
+        possession = PlayerBallAssigner().assign_ball_possession(tracks)
+    heatmap = PitchHeatmap()
+    with stage("heatmaps", frames=num_frames):
+        heatmap.add_tracks(tracks, window=window)
+
+    renderer = FrameRenderer(tracks, camera_movement_per_frame=camera_movement, team_colors=tracker.team_colors(),
+                             ball_possession=possession, minimap=MinimapRenderer())
+    with tempfile.TemporaryDirectory() as directory:
+        with stage("track_archive", frames=num_frames):
+            archive = TrackArchive.write(os.path.join(directory, "tracks"), tracks, chunk_frames=window,
+                                         metadata={"fps": fps})
+        archive_rows = len(archive.to_table())
+        archive.close()
+        encoder = VideoEncoder(os.path.join(directory, "output.avi"), fps=fps, frame_size=(width, height),
+                               background=False)
+        frame_num = 0
+        for frames in iter_frame_windows(instrumentation.iterate("synthesize", video.iter_frames()), window):
+            with stage("render", frames=len(frames)):
+                for frame in frames:
+                    renderer.render_frame(frame, frame_num)
+                    frame_num += 1
+            with stage("encode", frames=len(frames)):
+                for frame in frames:
+                    encoder.write(frame)
+        with stage("encode"):
+            encoder.close()
+
+    # Resultados que não dependem da máquina: mudam só quando o comportamento da análise muda.
+    player_rows = tracks.object_mask('player')
+    checks = {
+        "track_rows": len(tracks),
+        "player_track_ids": int(len(np.unique(tracks.track_id[player_rows]))),
+        "ball_frames": int(len(np.unique(tracks.frame[tracks.object_mask('ball')]))),
+        "speed_rows": int(np.count_nonzero(~np.isnan(tracks.get_column('speed')))),
+        "team_rows": int(np.count_nonzero(~np.isnan(tracks.get_column('team')))),
+        "possession_frames": int(np.count_nonzero(possession["player"] >= 0)),
+        "heatmap_samples": int(heatmap.team_counts.sum()),
+        "archive_rows": archive_rows,
+        "camera_movement_mae_px": round(float(np.abs(np.asarray(camera_movement, dtype=np.float64) -
+                                                     video.camera_movement).mean()), 4),
+    }
+    return instrumentation.report(profile_top=0), checks
+
+
+def best_of(reports):
+    # Para cada etapa, mantém a repetição mais rápida (menos sujeita a ruído da máquina).
+    stages = {}
+    for name in STAGES:
+        candidates = [report["stages"][name] for report in reports if name in report["stages"]]
+        if candidates:
+            stages[name] = min(candidates, key=lambda stage: stage["wall_seconds"])
+    return {"wall_seconds": min(report["wall_seconds"] for report in reports),
+            "peak_rss_bytes": max(report["peak_rss_bytes"] for report in reports), "stages": stages}
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def run_suite(args):
+    commit, dirty = git_revision()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "parameters": {"frames": args.frames, "resolutions": args.resolutions, "window": args.window,
+                       "repeat": args.repeat, "seed": args.seed},
+        "scales": {},
+    }
+    for num_frames in args.frames:
+        for resolution in args.resolutions:
+            width, height = parse_resolution(resolution)
+            name = f"{num_frames}x{width}x{height}"
+            print(f"Running {name}...")
+            runs = [run_scale(num_frames, width, height, args.window, seed=args.seed) for _ in range(args.repeat)]
+            results["scales"][name] = dict(best_of([report for report, _ in runs]), checks=runs[0][1])
+            print_scale(name, results["scales"][name])
+
+    output = args.output or os.path.join("benchmarks", "results",
+                                         f"{(commit or 'unknown')[:12]}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+def print_scale(name, scale):
+    print(f"{name:<20}{'s':>10}{'quadros/s':>12}{'ms/quadro':>12}")
+    for stage_name, stage in scale["stages"].items():
+        milliseconds = 1000 * stage["wall_seconds"] / stage["frames"] if stage["frames"] else 0.0
+        print(f"  {stage_name:<18}{stage['wall_seconds']:>10.3f}{stage['frames_per_second'] or 0:>12.1f}"
+              f"{milliseconds:>12.2f}")
+    print(f"  checks: {json.dumps(scale['checks'])}")
+
+
+def compare(base_path, new_path, threshold):
+    # Compara o tempo de parede de cada etapa em cada escala presente nos dois arquivos.
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"base: {(base['commit'] or 'unknown')[:12]}  novo: {(new['commit'] or 'unknown')[:12]}")
+    regressions = 0
+    for name in base["scales"]:
+        if name not in new["scales"]:
+            continue
+        base_scale, new_scale = base["scales"][name], new["scales"][name]
+        print(f"{name:<20}{'base s':>10}{'novo s':>10}{'razão':>8}")
+        for stage_name in STAGES:
+            if stage_name not in base_scale["stages"] or stage_name not in new_scale["stages"]:
+                continue
+            base_seconds = base_scale["stages"][stage_name]["wall_seconds"]
+            new_seconds = new_scale["stages"][stage_name]["wall_seconds"]
+            ratio = new_seconds / base_seconds if base_seconds else float('nan')
+            # Etapas de poucos milissegundos variam muito em termos relativos; exige também 5 ms de diferença.
+            slower = ratio > 1 + threshold and new_seconds - base_seconds > 0.005 and \
+                stage_name not in ("synthesize", "mock_detection")
+            regressions += slower
+            print(f"  {stage_name:<18}{base_seconds:>10.3f}{new_seconds:>10.3f}{ratio:>8.2f}"
+                  f"{'  mais lento' if slower else ''}")
+        changed = {key: (value, new_scale["checks"].get(key)) for key, value in base_scale["checks"].items()
+                   if key in new_scale["checks"] and new_scale["checks"][key] != value}
+        if changed:
+            print(f"  resultados diferentes (base, novo): {json.dumps(changed)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de cada etapa da análise em vídeos sintéticos.")
+    parser.add_argument("--frames", type=int, nargs="+", default=[250, 1000])
+    parser.add_argument("--resolutions", nargs="+", default=["1280x720", "1920x1080"])
+    parser.add_argument("--window", type=int, default=50, help="quadros em memória por janela")
+    parser.add_argument("--repeat", type=int, default=1, help="repetições por escala (vale a mais rápida)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="padrão: benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), default=None,
+                        help="compara dois arquivos de resultados em vez de rodar o benchmark")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fração de aumento do tempo considerada regressão no --compare")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="no --compare, termina com código 1 se alguma etapa ficou mais lenta")
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        regressions = compare(args.compare[0], args.compare[1], args.threshold)
+        sys.exit(1 if regressions and args.fail_on_regression else 0)
+    run_suite(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from team_assigner import TeamAssigner
+from benchmarks.synthetic import SyntheticPitchVideo
+
+# Uso: python -m benchmarks.bench_team_assigner [--frames 500 --players 20 --resolution 1920x1080]
+# Custo por quadro da separação em times: k-means por jogador em todo quadro (ingênuo), k-means em lote de
+# todos os jogadores em todo quadro, e o TeamAssigner (em lote, com cache por track_id). As caixas e os
+# track_ids vêm do vídeo sintético, sem detector nem ByteTrack.
+
+
+def classify_one_by_one(team_assigner, frame, bboxes):
+    # Caminho ingênuo: recorta e agrupa os pixels de um jogador por vez, em todo quadro.
+    teams = []
+    for bbox in bboxes:
+        color = team_assigner.jersey_colors(frame, bbox[None])[0]
+        teams.append(int(((team_assigner.team_colors - color) ** 2).sum(axis=1).argmin()) + 1)
+    return np.array(teams)
+
+
+def accuracy(predicted, truth):
+    # Os números dos times são arbitrários: vale a melhor das duas correspondências.
+    valid = ~np.isnan(predicted)
+    if not valid.any():
+        return 0.0
+    hits = (predicted[valid] == truth[valid]).mean()
+    return float(max(hits, 1 - hits)) * valid.mean()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por quadro da separação dos jogadores em times.")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--recheck-interval", type=int, default=50)
+    parser.add_argument("--new-ids-every", type=int, default=200,
+                        help="a cada N quadros os jogadores ganham novos track_ids, como após oclusões")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.resolution.lower().split("x"))
+    video = SyntheticPitchVideo(args.frames, width, height, num_players=args.players)
+    players = np.flatnonzero([kind.startswith("team_") for kind in video.kinds])
+    truth = np.array([1 if video.kinds[index] == "team_1" else 2 for index in players], dtype=np.float32)
+
+    team_assigner = TeamAssigner(recheck_interval=args.recheck_interval)
+    naive_assigner = TeamAssigner()
+    batched_assigner = TeamAssigner()
+    seconds = {"ingênuo": 0.0, "lote": 0.0, "lote + cache": 0.0}
+    hits = {name: [] for name in seconds}
+    for frame_num, frame in enumerate(video.iter_frames()):
+        bboxes = video.boxes(frame_num)[players].astype(np.float32)
+        track_ids = np.arange(1, len(players) + 1) + (frame_num // args.new_ids_every) * len(players)
+        if naive_assigner.team_colors is None:
+            naive_assigner.fit(frame, bboxes)
+            batched_assigner.fit(frame, bboxes)
+
+        start = time.perf_counter()
+        naive_teams = classify_one_by_one(naive_assigner, frame, bboxes)
+        seconds["ingênuo"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched_teams = batched_assigner.classify(frame, bboxes)
+        seconds["lote"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        team_assigner.update(frame, track_ids, bboxes)
+        cached_teams = team_assigner.teams(track_ids)
+        seconds["lote + cache"] += time.perf_counter() - start
+
+        hits["ingênuo"].append(accuracy(naive_teams.astype(np.float32), truth))
+        hits["lote"].append(accuracy(batched_teams.astype(np.float32), truth))
+        hits["lote + cache"].append(accuracy(cached_teams, truth))
+
+    print(f"{len(players)} jogadores, {args.frames} quadros {width}x{height}, "
+          f"{team_assigner.report()['classified_fraction']:.1%} das linhas classificadas com cache")
+    print(f"{'método':<16}{'ms/quadro':>12}{'acerto':>10}{'speedup':>10}")
+    for name, total in seconds.items():
+        print(f"{name:<16}{1000 * total / args.frames:>12.3f}{np.mean(hits[name]):>10.1%}"
+              f"{seconds['ingênuo'] / total:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import tempfile
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import TrackTable
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from track_archive import TrackArchive
+from benchmarks.bench_ball_possession import generate_match
+
+# Uso: python -m benchmarks.bench_track_archive --minutes 10 90 --players 22
+# Carregar as trilhas enriquecidas de uma partida sintética para uma consulta: o antigo stub em pickle (formato
+# de dicionários, só nas partidas curtas), o pickle da TrackTable e o TrackArchive (zlib e sem compressão).
+# Cada medição roda em um processo novo, para que o pico de memória (RSS) de uma não contamine a outra.
+# Consultas: a velocidade de um jogador em 5 minutos no meio da partida, todas as colunas de 1 minuto e a
+# partida inteira.
+
+def generate_tracks(minutes, players, fps=24, seed=0):
+    # Posições em pixels da partida sintética de bench_ball_possession, levadas para metros e enriquecidas
+    # com velocidade e distância pelo SpeedAndDistanceEstimator.
+    tracks = generate_match(minutes, players, fps=fps, seed=seed)
+    position = tracks.get_column('position')
+    tracks.set_column('position_adjusted', position - np.array([3.0, 1.0]) * (tracks.frame[:, None] % 50))
+    tracks.set_column('position_transformed', position * np.array([23.32 / 1900, 68 / 1300]))
+    SpeedAndDistanceEstimator(frame_rate=fps).add_speed_and_distance_to_tracks(tracks)
+    return tracks
+
+
+def query_table(tracks, query):
+    # As mesmas consultas sobre a tabela inteira em memória (o que resta fazer depois do unpickle).
+    if query["name"] == "jogador 5 min":
+        rows = tracks.track_rows('player', query["track_id"])
+        rows = rows[(tracks.frame[rows] >= query["start"]) & (tracks.frame[rows] < query["stop"])]
+        return float(np.nansum(tracks.get_column('speed')[rows]))
+    if query["name"] == "quadros 1 min":
+        rows = slice(int(tracks.frame_offsets[query["start"]]), int(tracks.frame_offsets[query["stop"]]))
+        return float(np.nansum(tracks.get_column('speed')[rows]))
+    return float(np.nansum(tracks.get_column('speed')))
+
+
+def query_archive(archive, query):
+    if query["name"] == "jogador 5 min":
+        result = archive.track(query["track_id"], columns=['speed'], start=query["start"], stop=query["stop"])
+        return float(np.nansum(result['speed']))
+    if query["name"] == "quadros 1 min":
+        return float(np.nansum(archive.frames(query["start"], query["stop"]).get_column('speed')))
+    return float(np.nansum(archive.to_table().get_column('speed')))
+
+
+def peak_rss_bytes():
+    # VmHWM do /proc (por processo, zerado no exec); ru_maxrss do Linux é herdado do pai no fork, então só é
+    # usado onde não há /proc (em KB no Linux, em bytes no macOS).
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(mode, path, query):
+    # Roda no processo filho: tempo de carga + consulta e pico de RSS acima do processo já com os imports.
+    baseline = peak_rss_bytes()
+    start = time.perf_counter()
+    if mode == "pickle dict":
+        with open(path, 'rb') as f:
+            tracks = TrackTable.from_dict(pickle.load(f))
+        value = query_table(tracks, query)
+    elif mode == "pickle tabela":
+        with open(path, 'rb') as f:
+            value = query_table(pickle.load(f), query)
+    else:
+        with TrackArchive(path) as archive:
+            value = query_archive(archive, query)
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rss_mb": (peak_rss_bytes() - baseline) / 1024 ** 2, "value": value}
+
+
+def run_measure(mode, path, query):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_track_archive", "--measure", mode, path,
+                             json.dumps(query)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de trilhas enriquecidas: pickle vs. TrackArchive.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 90])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--skip-dict-above", type=float, default=10,
+                        help="não grava o stub em dicionários em partidas mais longas que isso (minutos)")
+    parser.add_argument("--measure", nargs=3, metavar=("MODO", "CAMINHO", "CONSULTA"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        mode, path, query = args.measure
+        print(json.dumps(measure(mode, path, json.loads(query))))
+        return
+
+    print(f"{'minutos':>8}  {'formato':<16}{'MB em disco':>12}{'grava s':>9}  {'consulta':<17}{'carga s':>9}"
+          f"{'pico RSS MB':>13}")
+    for minutes in args.minutes:
+        tracks = generate_tracks(minutes, args.players)
+        middle = tracks.num_frames // 2
+        track_id = int(tracks.track_id[tracks.frame_slice(middle)][0])
+        queries = [
+            {"name": "jogador 5 min", "track_id": track_id, "start": max(middle - 3600, 0),
+             "stop": min(middle + 3600, tracks.num_frames)},
+            {"name": "quadros 1 min", "start": middle, "stop": min(middle + 1440, tracks.num_frames)},
+            {"name": "partida inteira"},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            formats = {}
+            if minutes <= args.skip_dict_above:
+                formats["pickle dict"] = (os.path.join(directory, 'track_stubs.pkl'), tracks.to_dict)
+            formats["pickle tabela"] = (os.path.join(directory, 'tracks.pkl'), lambda: tracks)
+            formats["archive zlib"] = (os.path.join(directory, 'archive_zlib'), 'zlib')
+            formats["archive cru"] = (os.path.join(directory, 'archive_raw'), None)
+            for name, (path, source) in formats.items():
+                start = time.perf_counter()
+                if name.startswith("pickle"):
+                    with open(path, 'wb') as f:
+                        pickle.dump(source(), f, protocol=pickle.HIGHEST_PROTOCOL)
+                else:
+                    TrackArchive.write(path, tracks, compression=source, metadata={"fps": 24})
+                write_seconds = time.perf_counter() - start
+                results = [run_measure(name, path, query) for query in queries]
+                reference = [query_table(tracks, query) for query in queries]
+                for query, result, expected in zip(queries, results, reference):
+                    assert np.isclose(result["value"], expected), (name, query["name"])
+                    print(f"{minutes:>8.0f}  {name:<16}{directory_size(path) / 1024 ** 2:>12.1f}{write_seconds:>9.2f}"
+                          f"  {query['name']:<17}{result['seconds']:>9.3f}{result['rss_mb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
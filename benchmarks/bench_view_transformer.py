@@ -0,0 +1,53 @@
+import argparse
+import time
+import sys
+import numpy as np
+sys.path.append('../')
+from view_trasformer import ViewTransformer
+
+# Uso: python -m benchmarks.bench_view_transformer --minutes 90 --objects 25
+
+
+def generate_points(number_of_points, seed=0):
+    # Posições ajustadas espalhadas pela imagem 1920x1080, parte delas fora do campo.
+    rng = np.random.default_rng(seed)
+    return rng.uniform([0, 0], [1920, 1080], size=(number_of_points, 2)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara transform_point (ponto a ponto) com transform_points (lote).")
+    parser.add_argument("--minutes", type=float, default=90)
+    parser.add_argument("--fps", type=float, default=24)
+    parser.add_argument("--objects", type=int, default=25, help="objetos rastreados por quadro")
+    parser.add_argument("--loop-points", type=int, default=100000,
+                        help="pontos usados para medir o laço ponto a ponto (o tempo é extrapolado)")
+    args = parser.parse_args()
+
+    number_of_points = int(args.minutes * 60 * args.fps * args.objects)
+    points = generate_points(number_of_points)
+    view_transformer = ViewTransformer()
+
+    start = time.perf_counter()
+    transformed, inside = view_transformer.transform_points(points)
+    batch_seconds = time.perf_counter() - start
+
+    sample = points[:min(args.loop_points, number_of_points)]
+    start = time.perf_counter()
+    loop_results = [view_transformer.transform_point(point) for point in sample]
+    loop_seconds = (time.perf_counter() - start) * number_of_points / len(sample)
+
+    # Confere se os dois caminhos concordam na amostra.
+    for result, batch_point, batch_inside in zip(loop_results, transformed, inside):
+        assert (result is not None) == batch_inside
+        if result is not None:
+            assert np.allclose(result.ravel(), batch_point, atol=1e-3)
+
+    print(f"points:            {number_of_points}")
+    print(f"inside pitch:      {inside.mean() * 100:.1f}%")
+    print(f"per-point loop:    {loop_seconds:.2f} s (extrapolated from {len(sample)} points)")
+    print(f"batch:             {batch_seconds:.3f} s")
+    print(f"speedup:           {loop_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2
+sys.path.append('../')
+from utils import read_video_stream
+from camera_movement_estimator import CameraMovementEstimator
+from benchmarks.synthetic import generate_panning_frames
+
+# Confere se o caminho paralelo reproduz o caminho serial, com a câmera sempre em movimento, com pausas mais
+# longas que o aquecimento (overlap) em volta das fronteiras dos segmentos e com a câmera parada o vídeo inteiro.
+# No vídeo parado todos os segmentos são refeitos no processo principal, então também confere o tempo: o caminho
+# paralelo não pode passar de --max-slowdown vezes o serial (mais a parte dos filhos, se faltam núcleos).
+# Uso: python -m benchmarks.check_parallel_camera_movement --frames 600 --static-frames 3000 --workers 4
+
+
+def compare(name, serial, parallel, serial_seconds, parallel_seconds, tolerance, max_slowdown=None):
+    serial = np.array(serial, dtype=np.float64).reshape(-1, 2)
+    parallel = np.array(parallel, dtype=np.float64).reshape(-1, 2)
+    if serial.shape != parallel.shape:
+        print(f"{name}: FAIL - {len(serial)} serial frames vs {len(parallel)} parallel frames")
+        return False
+    mismatched = np.flatnonzero(np.abs(serial - parallel).max(axis=1) > tolerance)
+    too_slow = max_slowdown is not None and parallel_seconds > max_slowdown * serial_seconds
+    status = "OK"
+    if len(mismatched):
+        status = f"FAIL - frames {mismatched[:10].tolist()}"
+    elif too_slow:
+        status = f"FAIL - parallel slower than {max_slowdown:.2f}x serial"
+    print(f"{name}: {status} (serial {serial_seconds:.2f} s, parallel {parallel_seconds:.2f} s, "
+          f"speedup {serial_seconds / parallel_seconds:.1f}x)")
+    return not len(mismatched) and not too_slow
+
+
+def with_static_stretches(frames, boundaries, length):
+    # Câmera parada por length quadros em volta de cada fronteira (o mesmo quadro repetido), como nas
+    # transmissões em que a câmera fica parada por alguns segundos; fora das pausas o movimento continua.
+    still = np.zeros(len(frames), dtype=bool)
+    for boundary in boundaries:
+        still[max(boundary - length // 2, 0):boundary + length // 2] = True
+    source = np.maximum(np.cumsum(~still) - 1, 0)
+    return [frames[index] for index in source]
+
+
+def slowdown_budget(args):
+    # Com núcleos de sobra o processo principal refaz os segmentos enquanto os filhos rodam, e o tempo fica perto
+    # do serial. Com no máximo workers núcleos, o trabalho especulativo dos filhos (cada segmento mais o
+    # aquecimento) divide a CPU com o processo principal e soma ao tempo.
+    cores = os.cpu_count() or 1
+    if cores > args.workers:
+        return args.max_slowdown
+    return args.max_slowdown + (1 + args.overlap / args.segment_length) / max(cores - 1, 1)
+
+
+def write_video(frames, directory):
+    video_path = os.path.join(directory, "synthetic.avi")
+    out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 24, (1280, 720))
+    for frame in frames:
+        out.write(np.ascontiguousarray(frame))
+    out.release()
+    return video_path
+
+
+def run(source, args):
+    # source é uma lista de quadros ou o caminho do vídeo; no caminho serial o vídeo é lido sob demanda.
+    frames = read_video_stream(source) if isinstance(source, str) else source
+    camera_movement_estimator = CameraMovementEstimator(next(read_video_stream(source)) if isinstance(source, str)
+                                                        else source[0])
+    start = time.perf_counter()
+    serial = camera_movement_estimator.get_camera_movement(frames)
+    serial_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = camera_movement_estimator.get_camera_movement_parallel(source, num_workers=args.workers,
+                                                                      segment_length=args.segment_length,
+                                                                      overlap=args.overlap)
+    parallel_seconds = time.perf_counter() - start
+    return serial, parallel, serial_seconds, parallel_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara get_camera_movement_parallel com o caminho serial.")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--static-frames", type=int, default=3000,
+                        help="quadros do vídeo com a câmera parada o tempo todo (0 desliga o caso)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--segment-length", type=int, default=150)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--static-length", type=int, default=120,
+                        help="quadros de câmera parada em volta de cada fronteira de segmento")
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--max-slowdown", type=float, default=2.0,
+                        help="tempo máximo do caminho paralelo no vídeo parado, em múltiplos do serial")
+    args = parser.parse_args()
+
+    panning = generate_panning_frames(args.frames, width=1280, height=720)
+    boundaries = range(args.segment_length, args.frames, args.segment_length)
+    cases = [("panning", panning, None),
+             ("static stretches", with_static_stretches(panning, boundaries, args.static_length), None)]
+    if args.static_frames:
+        # O mesmo quadro repetido: nenhuma renovação depois do quadro 0.
+        cases.append(("static camera", [panning[0]] * args.static_frames, slowdown_budget(args)))
+    ok = True
+    for name, frames, max_slowdown in cases:
+        ok = compare(f"{name}, in-memory frames", *run(frames, args), args.tolerance, max_slowdown) and ok
+
+        # O mesmo teste lendo de um arquivo de vídeo, em que cada processo busca o seu trecho.
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = write_video(frames, directory)
+            ok = compare(f"{name}, video file", *run(video_path, args), args.tolerance, max_slowdown) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+import cv2
+
+# Mesmas classes do models/best.pt.
+CLASS_NAMES = {0: 'ball', 1: 'goalkeeper', 2: 'player', 3: 'referee'}
+
+# Para cada cor do vídeo sintético (synthetic.PITCH_COLORS): classe, faixa de cor (BGR) aceita, área mínima
+# do blob e confiança.
+COLOR_CLASSES = (
+    ("team_1", 2, (0, 0, 170), (90, 90, 255), 60, 0.9),
+    ("team_2", 2, (170, 50, 0), (255, 130, 80), 60, 0.9),
+    ("goalkeeper", 1, (160, 0, 160), (255, 80, 255), 60, 0.85),
+    ("referee", 3, (0, 180, 180), (90, 255, 255), 60, 0.8),
+    ("ball", 0, (235, 235, 235), (255, 255, 255), 6, 0.6),
+)
+
+
+class _Array():
+    # Imita o tensor do ultralytics no que o supervision usa: .cpu().numpy() e .int().
+    def __init__(self, values):
+        self.values = values
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+    def int(self):
+        return _Array(self.values.astype(np.int64))
+
+
+class MockBoxes():
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+        self.cls = _Array(cls)
+        self.id = None
+
+
+class MockResult():
+    # Resultado com a interface de ultralytics.engine.results.Results aceita por sv.Detections.from_ultralytics.
+    def __init__(self, xyxy, conf, cls, names):
+        self.boxes = MockBoxes(xyxy, conf, cls)
+        self.names = names
+        self.masks = None
+        self.obb = None
+
+    def __contains__(self, name):
+        return getattr(self, name, None) is not None
+
+
+class MockDetector():
+    # Detector determinístico para os benchmarks, no lugar do YOLO em Tracker(model=...): encontra os objetos
+    # do SyntheticPitchVideo pela cor (cv2.inRange + contornos externos). Funciona em quadros inteiros e em
+    # recortes (busca da bola em ROI), e não precisa de models/best.pt nem de GPU. Objetos da mesma cor que se
+    # sobrepõem viram uma única caixa, como acontece com oclusões no modelo real.
+    def __init__(self, color_classes=COLOR_CLASSES, names=CLASS_NAMES):
+        self.color_classes = color_classes
+        self.names = names
+        self.frames_predicted = 0
+
+    def detect(self, frame, conf=0.25):
+        boxes, confidences, classes = [], [], []
+        for _, class_id, lower, upper, min_area, confidence in self.color_classes:
+            if confidence < conf:
+                continue
+            mask = cv2.inRange(frame, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            rects = np.array([cv2.boundingRect(contour) for contour in contours], dtype=np.float32).reshape(-1, 4)
+            rects = rects[rects[:, 2] * rects[:, 3] >= min_area]
+            boxes.append(np.concatenate([rects[:, :2], rects[:, :2] + rects[:, 2:]], axis=1))
+            confidences.append(np.full(len(rects), confidence))
+            classes.append(np.full(len(rects), class_id))
+        self.frames_predicted += 1
+        return MockResult(np.concatenate(boxes).astype(np.float32).reshape(-1, 4),
+                          np.concatenate(confidences).astype(np.float32),
+                          np.concatenate(classes).astype(np.float32), self.names)
+
+    def predict(self, source, conf=0.25, imgsz=None, verbose=False, **kwargs):
+        # imgsz é ignorado: a cor é procurada na resolução recebida.
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        return [self.detect(frame, conf) for frame in frames]
+
+    def __call__(self, source, **kwargs):
+        return self.predict(source, **kwargs)
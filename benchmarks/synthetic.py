@@ -0,0 +1,134 @@
+import numpy as np
+import cv2
+
+
+def generate_panning_frames(num_frames=240, width=1920, height=1080, max_pan=12, seed=0, return_motion=False):
+    # Gera quadros que simulam um movimento horizontal de câmera sobre uma textura fixa.
+    # Os quadros são recortes (views) de uma única imagem, então quase não ocupam memória extra.
+    # Com return_motion, também retorna o movimento real [x, y] de cada quadro no formato do estimador.
+    rng = np.random.default_rng(seed)
+    pans = np.concatenate([[0], rng.integers(0, max_pan + 1, size=num_frames - 1)])
+    offsets = np.cumsum(pans)
+    texture = (rng.random((height + 2 * max_pan, width + int(offsets[-1]) + 1, 3)) * 255).astype(np.uint8)
+    texture = cv2.GaussianBlur(texture, (7, 7), 0)
+    tilt = rng.integers(-1, 2, size=num_frames).cumsum().clip(-max_pan, max_pan) + max_pan
+    frames = [texture[tilt[i]:tilt[i] + height, offsets[i]:offsets[i] + width] for i in range(num_frames)]
+    if not return_motion:
+        return frames
+    motion = np.stack([pans, np.diff(tilt, prepend=tilt[0])], axis=1).astype(np.float64)
+    return frames, motion
+
+
+# Cores (BGR) de cada tipo de objeto no vídeo sintético; o detector simulado (mock_detector) as reconhece.
+PITCH_COLORS = {
+    "team_1": (40, 40, 210),
+    "team_2": (210, 90, 30),
+    "goalkeeper": (200, 40, 200),
+    "referee": (30, 220, 230),
+    "ball": (255, 255, 255),
+}
+
+
+def _smooth_motion(rng, num_frames, count, amplitude, period_range=(40, 160)):
+    # Velocidades suaves e determinísticas: soma de duas senoides com período e fase aleatórios por objeto.
+    t = np.arange(num_frames)[:, None]
+    velocity = np.zeros((num_frames, count))
+    for _ in range(2):
+        period = rng.uniform(*period_range, size=count)
+        phase = rng.uniform(0, 2 * np.pi, size=count)
+        velocity += amplitude / 2 * np.sin(2 * np.pi * t / period + phase)
+    return velocity
+
+
+def _reflect(values, low, high):
+    # Mantém as trajetórias dentro de [low, high] refletindo nas bordas (quique), sem laço por quadro.
+    length = high - low
+    r = np.mod(values - low, 2 * length)
+    return low + length - np.abs(r - length)
+
+
+class SyntheticPitchVideo():
+    # Vídeo sintético de uma partida: gramado com textura e linhas, jogadores de dois times, goleiros, árbitros e
+    # bola em movimento, e uma câmera que faz panorâmicas. As trajetórias são calculadas na criação e os quadros
+    # são desenhados sob demanda (iter_frames), então vídeos longos não ocupam memória. Com a mesma seed, os
+    # quadros são idênticos em qualquer máquina. Os objetos se movem nas coordenadas da imagem (a câmera
+    # acompanha o jogo); camera_movement é o movimento real da câmera no formato do CameraMovementEstimator.
+    def __init__(self, num_frames=250, width=1920, height=1080, num_players=20, num_referees=3, max_pan=10,
+                 max_tilt=4, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        scale = height / 1080
+
+        # Câmera: deslocamento horizontal (inteiro) suave e uma pequena inclinação vertical.
+        pans = np.rint(_smooth_motion(rng, num_frames, 1, max_pan, (120, 400))[:, 0]).astype(np.int64)
+        pans[0] = 0
+        offsets = np.cumsum(pans)
+        offsets -= offsets.min()
+        tilt = np.rint(max_tilt + max_tilt * np.sin(np.arange(num_frames) / 50 + rng.uniform(0, 2 * np.pi)))
+        self.offsets = offsets
+        self.tilt = tilt.astype(np.int64)
+        self.camera_movement = np.stack([np.diff(offsets, prepend=offsets[0]),
+                                         np.diff(self.tilt, prepend=self.tilt[0])], axis=1).astype(np.float64)
+        self.texture = self._pitch_texture(rng, height + 2 * max_tilt + 1, width + int(offsets.max()) + 1, scale)
+
+        # Objetos: jogadores (metade de cada time), dois goleiros, árbitros e a bola.
+        self.kinds = (["team_1"] * (num_players // 2) + ["team_2"] * (num_players - num_players // 2) +
+                      ["goalkeeper"] * 2 + ["referee"] * num_referees + ["ball"])
+        count = len(self.kinds)
+        is_ball = np.array([kind == "ball" for kind in self.kinds])
+        self.sizes = np.where(is_ball[:, None], [[12 * scale, 12 * scale]], [[22 * scale, 56 * scale]])
+        speed = np.where(is_ball, 14 * scale, 4 * scale)
+        start = rng.uniform([0, 0], [width, height], size=(count, 2))
+        low, high = self.sizes / 2, np.array([width, height]) - self.sizes / 2
+        centers = np.empty((num_frames, count, 2))
+        for axis in range(2):
+            steps = _smooth_motion(rng, num_frames, count, speed)
+            centers[:, :, axis] = _reflect(start[:, axis] + np.cumsum(steps, axis=0), low[:, axis], high[:, axis])
+        self.centers = centers
+
+    @staticmethod
+    def _pitch_texture(rng, height, width, scale):
+        # Gramado com ruído e tufos escuros (pontos característicos para o fluxo óptico), faixas de corte e
+        # linhas brancas.
+        noise = cv2.GaussianBlur(rng.normal(0, 30, (height, width)).astype(np.float32), (3, 3), 0)[:, :, None]
+        texture = np.clip(np.array([45, 125, 55], dtype=np.float32) + noise, 0, 255)
+        tufts = rng.integers(0, [height, width], size=(height * width // 400, 2))
+        texture[tufts[:, 0], tufts[:, 1]] = (20, 70, 25)
+        stripe = int(120 * scale)
+        texture[:, (np.arange(width) // stripe) % 2 == 1] *= 0.88
+        texture = texture.astype(np.uint8)
+        line_color, thickness = (200, 215, 200), max(2, int(4 * scale))
+        for x in range(int(300 * scale), width, int(900 * scale)):
+            cv2.line(texture, (x, 0), (x, height - 1), line_color, thickness)
+            cv2.circle(texture, (x, height // 2), int(180 * scale), line_color, thickness)
+        cv2.line(texture, (0, int(80 * scale)), (width - 1, int(80 * scale)), line_color, thickness)
+        cv2.line(texture, (0, height - int(80 * scale)), (width - 1, height - int(80 * scale)), line_color, thickness)
+        return texture
+
+    def __len__(self):
+        return self.num_frames
+
+    def boxes(self, frame_num):
+        # Caixas reais (x1, y1, x2, y2) de todos os objetos no quadro, na ordem de self.kinds.
+        centers = self.centers[frame_num]
+        return np.concatenate([centers - self.sizes / 2, centers + self.sizes / 2], axis=1)
+
+    def render(self, frame_num):
+        x, y = int(self.offsets[frame_num]), int(self.tilt[frame_num])
+        frame = self.texture[y:y + self.height, x:x + self.width].copy()
+        # A bola é desenhada primeiro, então às vezes fica escondida atrás de um jogador.
+        boxes = self.boxes(frame_num)
+        for index in [len(self.kinds) - 1] + list(range(len(self.kinds) - 1)):
+            x1, y1, x2, y2 = np.rint(boxes[index]).astype(int)
+            color = PITCH_COLORS[self.kinds[index]]
+            if self.kinds[index] == "ball":
+                cv2.circle(frame, ((x1 + x2) // 2, (y1 + y2) // 2), (x2 - x1) // 2, color, -1)
+            else:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        return frame
+
+    def iter_frames(self, start=0, stop=None):
+        for frame_num in range(start, self.num_frames if stop is None else min(stop, self.num_frames)):
+            yield self.render(frame_num)
@@ -1 +1 @@
-from .camera_movement_estimator import CameraMovementEstimator
\ No newline at end of file
+from .camera_movement_estimator import CameraMovementEstimator, camera_movement_to_matrices, track_points, LK_PARAMS
\ No newline at end of file
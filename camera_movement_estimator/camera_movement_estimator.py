@@ -3,25 +3,80 @@ import cv2
 import numpy as np
 import os
 import sys
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append('../')
-from utils import measure_distance, measure_xy_distance
+from utils import TrackTable, read_video_stream
+
+# Quadros compartilhados com os processos filhos (herdados via fork, sem serialização).
+_shared_frames = None
+
+# Parâmetros do fluxo óptico Lucas-Kanade, também usados para propagar caixas entre quadros-chave.
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+)
+
+
+def track_points(old_gray, new_gray, points, lk_params=LK_PARAMS):
+    # Acompanha pontos (N, 2) de old_gray até new_gray e retorna as novas posições e quais foram encontrados.
+    # points None (goodFeaturesToTrack sem nenhum canto) é tratado como nenhum ponto.
+    if points is None:
+        points = np.zeros((0, 2), dtype=np.float32)
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if not len(points):
+        return np.zeros((0, 2), dtype=np.float32), np.zeros(0, dtype=bool)
+    new_points, status, _ = cv2.calcOpticalFlowPyrLK(old_gray, new_gray, points, None, **lk_params)
+    return new_points.reshape(-1, 2), status.ravel() == 1
+
+
+def camera_movement_to_matrices(camera_movement_per_frame):
+    # Converte a lista de movimentos [x, y] em matrizes 3x3 equivalentes a "posição - movimento".
+    camera_movement = np.asarray(camera_movement_per_frame, dtype=np.float64).reshape(-1, 2)
+    matrices = np.tile(np.eye(3), (len(camera_movement), 1, 1))
+    matrices[:, :2, 2] = -camera_movement
+    return matrices
 
 
 class CameraMovementEstimator():
-    def __init__(self, frame):
+    def __init__(self, frame, motion_model='translation', flow_scale=1.0, crop_to_mask=False):
         self.minimum_distance = 5
+        # Modelo usado nas matrizes de movimento por quadro: 'translation', 'similarity' ou 'homography'.
+        self.motion_model = motion_model
+        # Fator de redução aplicado antes do fluxo óptico (1.0 mantém a resolução original).
+        self.flow_scale = flow_scale
+        self.crop_to_mask = crop_to_mask
+        # Faixas de colunas onde os pontos característicos são procurados.
+        self.mask_columns = [(0, 20), (900, 1050)]
 
-        self.lk_params = dict(
-            winSize=(15, 15),
-            maxLevel=2,
-            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
-        )
+        self.lk_params = dict(LK_PARAMS)
 
         first_frame_grayscale = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         mask_features = np.zeros_like(first_frame_grayscale)
-        mask_features[:, 0:20] = 1
-        mask_features[:, 900:1050] = 1
+        for start, end in self.mask_columns:
+            mask_features[:, start:end] = 1
+
+        # Com crop_to_mask, o fluxo roda apenas sobre as faixas da máscara, lado a lado em uma imagem estreita.
+        # Cada faixa leva uma margem de imagem real ao redor (para os pontos não saírem dela ao se moverem)
+        # e fica separada da seguinte por colunas vazias, para que a janela do LK não misture faixas vizinhas.
+        self.strip_offsets = None
+        if crop_to_mask:
+            margin = 3 * self.lk_params['winSize'][0]
+            gap = 2 * self.lk_params['winSize'][0]
+            offsets = []
+            stitched_start = 0
+            for start, end in self.mask_columns:
+                start = max(start - margin, 0)
+                end = min(end + margin, first_frame_grayscale.shape[1])
+                if end <= start:
+                    continue
+                offsets.append((stitched_start, start, end))
+                stitched_start += end - start + gap
+            self.strip_offsets = np.array(offsets, dtype=np.float64)
+        mask_features = self._prepare_grayscale(mask_features, cv2.INTER_NEAREST)
 
         self.features = dict(
             maxCorners=100,
@@ -31,8 +86,17 @@ class CameraMovementEstimator():
             mask=mask_features
         )
 
+        self.reset()
+
     def add_adjust_positions_to_tracks(self, tracks, camera_movement_per_frame):
         print("Adding adjusted positions to tracks...")
+        if isinstance(tracks, TrackTable):
+            # Subtrai de cada linha o movimento da câmera do seu quadro em uma única operação.
+            camera_movement = np.asarray(camera_movement_per_frame, dtype=np.float32).reshape(-1, 2)
+            position_adjusted = tracks.get_column('position') - camera_movement[tracks.frame]
+            tracks.set_column('position_adjusted', position_adjusted)
+            print("Adjusted positions added to tracks!")
+            return
         # Itera sobre cada objeto rastreado e suas trilhas no conjunto de dados.
         for object, object_tracks in tracks.items():
             # Enumera cada quadro e suas respectivas informações de rastreamento.
@@ -49,7 +113,22 @@ class CameraMovementEstimator():
                     tracks[object][frame_num][track_id]['position_adjusted'] = position_adjusted
         print("Adjusted positions added to tracks!")
 
-    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None):
+    def cache_key(self, cache, video_path, motion_matrices=False):
+        # A chave do cache depende do conteúdo do vídeo e de todos os parâmetros que alteram o resultado.
+        params = {
+            "minimum_distance": self.minimum_distance,
+            "flow_scale": self.flow_scale,
+            "crop_to_mask": self.crop_to_mask,
+            "mask_columns": self.mask_columns,
+            "lk_params": self.lk_params,
+            "features": {name: value for name, value in self.features.items() if name != 'mask'},
+        }
+        if motion_matrices:
+            params["motion_model"] = self.motion_model
+        stage = "camera_motion_matrices" if motion_matrices else "camera_movement"
+        return cache.make_key(stage, files={"video": video_path}, params=params)
+
+    def get_camera_movement(self, frames, read_from_stub=False, stub_path=None, cache=None, video_path=None):
         print("Getting camera movement...")
         # Verifica se deve ler o movimento da câmera de um arquivo stub.
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
@@ -57,46 +136,21 @@ class CameraMovementEstimator():
             with open(stub_path, 'rb') as f:
                 return pickle.load(f)
 
-        # Inicializa a lista de movimentos da câmera com valores zero para cada quadro.
-        camera_movement = [[0, 0]] * len(frames)
-
-        # Converte o primeiro quadro para escala de cinza.
-        old_gray = cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY)
-        # Detecta pontos característicos no primeiro quadro.
-        old_features = cv2.goodFeaturesToTrack(old_gray, **self.features)
-
-        # Processa cada quadro, começando do segundo até o último.
-        for frame_num in range(1, len(frames)):
-            # Converte o quadro atual para escala de cinza.
-            frame_gray = cv2.cvtColor(frames[frame_num], cv2.COLOR_BGR2GRAY)
-            # Calcula o fluxo óptico para encontrar novos pontos característicos.
-            new_features, _, _ = cv2.calcOpticalFlowPyrLK(old_gray, frame_gray, old_features, None, **self.lk_params)
-
-            # Inicializa a variável para rastrear a maior distância encontrada.
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0, 0
-
-            # Itera sobre cada par de pontos antigos e novos.
-            for i, (new, old) in enumerate(zip(new_features, old_features)):
-                # Achata as coordenadas dos pontos para simplificar o acesso.
-                new_features_point = new.ravel()
-                old_features_point = old.ravel()
-
-                # Calcula a distância entre os pontos antigos e novos.
-                distance = measure_distance(new_features_point, old_features_point)
-                # Atualiza o movimento da câmera se a distância for a maior encontrada.
-                if distance > max_distance:
-                    max_distance = distance
-                    camera_movement_x, camera_movement_y = measure_xy_distance(old_features_point, new_features_point)
-
-            # Se a maior distância encontrada for significativa, atualiza o registro de movimento para esse quadro.
-            if max_distance > self.minimum_distance:
-                camera_movement[frame_num] = [camera_movement_x, camera_movement_y]
-                # Detecta novos pontos característicos no quadro atual para usar no próximo cálculo.
-                old_features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
-
-            # Atualiza o quadro antigo para ser o atual para o próximo loop.
-            old_gray = frame_gray.copy()
+        # Com um AnalysisCache e o caminho do vídeo, reaproveita o resultado de execuções anteriores.
+        cache_key = self.cache_key(cache, video_path) if cache is not None and video_path else None
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print("Camera movement loaded from cache!")
+                return cached[0]["camera_movement"].tolist()
+
+        # Reinicia o estado para que o primeiro quadro recebido seja a referência.
+        self.reset()
+        # Estima o movimento quadro a quadro; aceita listas ou geradores de quadros.
+        camera_movement = self.estimate_frames(frames)
+
+        if cache_key is not None:
+            cache.put(cache_key, {"camera_movement": np.asarray(camera_movement, dtype=np.float64).reshape(-1, 2)})
 
         # Se um caminho para o stub foi fornecido, salva os dados de movimento da câmera no arquivo.
         if stub_path is not None:
@@ -107,6 +161,232 @@ class CameraMovementEstimator():
         print("Camera movement calculated!")
         return camera_movement
 
+    def get_camera_movement_parallel(self, frames, num_workers=None, segment_length=500, overlap=50):
+        # Divide o vídeo em segmentos e estima cada um em um processo separado.
+        # frames pode ser uma lista de quadros ou o caminho do vídeo (cada processo lê apenas o seu trecho).
+        # Cada segmento começa overlap quadros antes do seu início (aquecimento, descartado). No quadro f, o estado
+        # do caminho serial só depende dos pontos detectados na última renovação (no quadro 0 e em todo quadro com
+        # movimento) e do quadro f - 1; então o segmento reproduz o serial se o aquecimento começa na última
+        # renovação serial antes dele ou se também renovou os pontos nesse quadro. Quando a câmera fica parada
+        # por mais de overlap quadros isso não acontece, e o segmento é refeito no processo principal a partir
+        # desse estado (pontos da última renovação e o quadro anterior ao segmento como referência) até o primeiro
+        # quadro em que ambos renovam os pontos; dali em diante o resultado do processo filho já é o serial.
+        # Renovações em que a detecção não encontrou nenhum ponto mantêm os anteriores e não contam.
+        print("Getting camera movement in parallel...")
+        num_workers = num_workers or os.cpu_count()
+        if isinstance(frames, str):
+            cap = cv2.VideoCapture(frames)
+            number_of_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+        else:
+            number_of_frames = len(frames)
+
+        options = dict(motion_model=self.motion_model, flow_scale=self.flow_scale, crop_to_mask=self.crop_to_mask)
+        starts = list(range(0, max(number_of_frames, 1), segment_length))
+        segments = []
+        for index, start in enumerate(starts):
+            # O último segmento lê até o fim do vídeo, pois CAP_PROP_FRAME_COUNT pode ser impreciso.
+            end = starts[index + 1] if index + 1 < len(starts) else None
+            segments.append((start, end, max(start - overlap, 0)))
+
+        global _shared_frames
+        context = None
+        if not isinstance(frames, str) and 'fork' in multiprocessing.get_all_start_methods():
+            _shared_frames = frames
+            context = multiprocessing.get_context('fork')
+
+        def segment_task(end, warmup_start):
+            if isinstance(frames, str):
+                return frames, end, warmup_start, options
+            if context is None:
+                # Sem fork, cada processo recebe uma cópia apenas do seu trecho de quadros.
+                return frames[warmup_start:end], None, 0, options
+            return None, end, warmup_start, options
+
+        try:
+            with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as executor:
+                camera_movement = []
+                refreshes = [0]
+                tasks = [segment_task(end, warmup_start) for _, end, warmup_start in segments]
+                results = executor.map(_estimate_segment, tasks)
+                for (start, end, warmup_start), segment_movement in zip(segments, results):
+                    # Normalmente a última renovação já encontrou pontos: uma única detecção por segmento.
+                    while len(refreshes) > 1:
+                        refresh_frame = _read_segment(frames, refreshes[-1], refreshes[-1] + 1)[0]
+                        if len(self.detect_features(self._prepare_grayscale(
+                                cv2.cvtColor(refresh_frame, cv2.COLOR_BGR2GRAY)))):
+                            break
+                        refreshes.pop()
+                    last_refresh = refreshes[-1]
+                    synchronized = warmup_start == last_refresh or (
+                        warmup_start < last_refresh < warmup_start + len(segment_movement) and
+                        any(segment_movement[last_refresh - warmup_start]))
+                    if synchronized:
+                        segment_movement = segment_movement[start - warmup_start:]
+                    else:
+                        # Refeito no processo principal enquanto os demais segmentos seguem nos processos.
+                        segment_movement = _resume_segment(frames, start, end, last_refresh, options,
+                                                           segment_movement[start - warmup_start:])
+                    refreshes += [start + offset for offset, movement in enumerate(segment_movement) if any(movement)]
+                    camera_movement += segment_movement
+        finally:
+            _shared_frames = None
+
+        print("Camera movement calculated!")
+        return camera_movement
+
+    def _prepare_grayscale(self, image, interpolation=cv2.INTER_AREA):
+        # Recorta as faixas da máscara (se habilitado) e reduz a imagem pelo flow_scale.
+        if self.strip_offsets is not None:
+            gap = 2 * self.lk_params['winSize'][0]
+            strips = []
+            for _, start, end in self.strip_offsets.astype(int):
+                if strips:
+                    strips.append(np.zeros((image.shape[0], gap), dtype=image.dtype))
+                strips.append(image[:, start:end])
+            image = np.hstack(strips)
+        if self.flow_scale != 1.0:
+            image = cv2.resize(image, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=interpolation)
+        return image
+
+    def _to_full_resolution(self, old_features, new_features):
+        # Converte os pares de pontos da imagem preparada para coordenadas do quadro original.
+        # O ponto novo usa a faixa do ponto antigo, mesmo que tenha saído dela durante o movimento.
+        old_points = old_features.reshape(-1, 2).astype(np.float64) / self.flow_scale
+        new_points = new_features.reshape(-1, 2).astype(np.float64) / self.flow_scale
+        if self.strip_offsets is not None:
+            stitched_starts = self.strip_offsets[:, 0]
+            strip = np.clip(np.searchsorted(stitched_starts, old_points[:, 0], side='right') - 1, 0, None)
+            shift = self.strip_offsets[strip, 1] - stitched_starts[strip]
+            old_points[:, 0] += shift
+            new_points[:, 0] += shift
+        return old_points, new_points
+
+    def _uses_full_frame(self):
+        return self.strip_offsets is None and self.flow_scale == 1.0
+
+    def reset(self):
+        # Descarta o quadro e os pontos característicos de referência.
+        self.old_gray = None
+        self.old_features = None
+
+    def get_state(self):
+        # Quadro e pontos de referência: o suficiente para continuar a estimativa após um checkpoint.
+        return {"old_gray": self.old_gray, "old_features": self.old_features}
+
+    def set_state(self, state):
+        self.old_gray = state["old_gray"]
+        self.old_features = state["old_features"]
+
+    def detect_features(self, frame_gray):
+        # Pontos característicos nas faixas da máscara, (N, 1, 2). Sem nenhum canto (faixa lisa ou fora do quadro,
+        # em vídeos estreitos) goodFeaturesToTrack retorna None, e o resultado é um array vazio.
+        features = cv2.goodFeaturesToTrack(frame_gray, **self.features)
+        return np.zeros((0, 1, 2), dtype=np.float32) if features is None else features
+
+    def refresh_features(self, frame_gray):
+        # Renova os pontos após um movimento; se a detecção não encontra nenhum, mantém os anteriores.
+        features = self.detect_features(frame_gray)
+        if len(features):
+            self.old_features = features
+
+    def seed(self, refresh_frame, previous_frame):
+        # Reproduz o estado do caminho serial sem repassar os quadros intermediários: os pontos detectados no
+        # quadro da última renovação e o quadro anterior como referência.
+        self.old_features = self.detect_features(
+            self._prepare_grayscale(cv2.cvtColor(refresh_frame, cv2.COLOR_BGR2GRAY)))
+        self.old_gray = self._prepare_grayscale(cv2.cvtColor(previous_frame, cv2.COLOR_BGR2GRAY))
+
+    def estimate_frames(self, frames):
+        # Estima o movimento de uma sequência de quadros, continuando a partir do último quadro visto.
+        return [self.estimate_frame_movement(frame) for frame in frames]
+
+    def estimate_frame_movement(self, frame):
+        # Converte o quadro atual para escala de cinza.
+        frame_gray = self._prepare_grayscale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+        # O primeiro quadro apenas define a referência e não possui movimento.
+        if self.old_gray is None:
+            self.old_gray = frame_gray
+            # Detecta pontos característicos no primeiro quadro.
+            self.old_features = self.detect_features(frame_gray)
+            return [0, 0]
+
+        # Calcula o fluxo óptico para encontrar novos pontos característicos.
+        new_features, _ = track_points(self.old_gray, frame_gray, self.old_features, self.lk_params)
+
+        # Calcula o deslocamento de todos os pontos de uma vez e escolhe o maior deles.
+        old_points = self.old_features.reshape(-1, 2)
+        new_points = new_features.reshape(-1, 2)
+        if not self._uses_full_frame():
+            old_points, new_points = self._to_full_resolution(old_points, new_points)
+        displacement = old_points - new_points
+        distances = np.sqrt((displacement ** 2).sum(axis=1))
+
+        max_distance = 0
+        camera_movement_x, camera_movement_y = 0, 0
+        if len(distances):
+            index = int(np.argmax(distances))
+            if distances[index] > max_distance:
+                max_distance = distances[index]
+                camera_movement_x, camera_movement_y = displacement[index]
+
+        movement = [0, 0]
+        # Se a maior distância encontrada for significativa, atualiza o registro de movimento para esse quadro.
+        if max_distance > self.minimum_distance:
+            movement = [camera_movement_x, camera_movement_y]
+            # Detecta novos pontos característicos no quadro atual para usar no próximo cálculo.
+            self.refresh_features(frame_gray)
+
+        # Atualiza o quadro antigo para ser o atual para o próximo quadro.
+        self.old_gray = frame_gray
+        return movement
+
+    def get_camera_motion_matrices(self, frames):
+        print("Getting camera motion matrices...")
+        self.reset()
+        motion_matrices = self.estimate_frames_matrices(frames)
+        print("Camera motion matrices calculated!")
+        return motion_matrices
+
+    def estimate_frames_matrices(self, frames):
+        # Retorna um array (N, 3, 3) com a matriz de movimento de cada quadro.
+        matrices = [self.estimate_frame_motion_matrix(frame) for frame in frames]
+        return np.array(matrices, dtype=np.float64).reshape(-1, 3, 3)
+
+    def estimate_frame_motion_matrix(self, frame):
+        # A matriz leva a posição no quadro atual para a posição ajustada, como add_adjust_positions_to_tracks.
+        # No modelo 'translation' ela equivale exatamente ao movimento [x, y] do quadro.
+        if self.motion_model == 'translation':
+            return camera_movement_to_matrices([self.estimate_frame_movement(frame)])[0]
+
+        frame_gray = self._prepare_grayscale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        matrix = np.eye(3)
+        if self.old_gray is None:
+            self.old_gray = frame_gray
+            self.old_features = self.detect_features(frame_gray)
+            return matrix
+
+        new_features, tracked = track_points(self.old_gray, frame_gray, self.old_features, self.lk_params)
+        old_points, new_points = self._to_full_resolution(self.old_features, new_features)
+        old_points, new_points = old_points[tracked], new_points[tracked]
+        displacement = np.linalg.norm(new_points - old_points, axis=1)
+
+        # Mesmo critério do modelo de translação: só há movimento se algum ponto se deslocou o suficiente.
+        if len(displacement) and displacement.max() > self.minimum_distance:
+            if self.motion_model == 'similarity' and len(old_points) >= 2:
+                estimated, _ = cv2.estimateAffinePartial2D(old_points, new_points, method=cv2.RANSAC)
+                if estimated is not None:
+                    matrix[:2] = estimated
+            elif self.motion_model == 'homography' and len(old_points) >= 4:
+                estimated, _ = cv2.findHomography(old_points, new_points, cv2.RANSAC)
+                if estimated is not None:
+                    matrix = estimated
+            self.refresh_features(frame_gray)
+
+        self.old_gray = frame_gray
+        return matrix
+
     def draw_camera_movement(self, frames, camera_movement_per_frame):
         output_frames = []
 
@@ -138,3 +418,42 @@ class CameraMovementEstimator():
 
         # Retorna a lista de quadros modificados.
         return output_frames
+
+
+def _read_segment(source, start, end):
+    # Quadros [start, end) de uma lista ou de um arquivo de vídeo (end None lê até o fim).
+    if isinstance(source, str):
+        count = None if end is None else end - start
+        return list(itertools.islice(read_video_stream(source, start_frame=start), count))
+    return source[start:end]
+
+
+def _estimate_segment(segment):
+    # Executado nos processos filhos: estima o movimento do trecho [warmup_start, end), incluindo o aquecimento
+    # (o primeiro item é o quadro warmup_start).
+    source, end, warmup_start, options = segment
+    frames = _read_segment(_shared_frames if source is None else source, warmup_start, end)
+    if not len(frames):
+        return []
+
+    camera_movement_estimator = CameraMovementEstimator(frames[0], **options)
+    return camera_movement_estimator.estimate_frames(frames)
+
+
+def _resume_segment(source, start, end, last_refresh, options, estimated):
+    # Estima o trecho [start, end) a partir do estado serial em start, lendo só o quadro da renovação e o trecho.
+    # estimated é o resultado do processo filho para o mesmo trecho, reaproveitado a partir da primeira
+    # renovação em comum.
+    frames = _read_segment(source, start - 1, end)
+    camera_movement_estimator = CameraMovementEstimator(frames[0], **options)
+    camera_movement_estimator.seed(_read_segment(source, last_refresh, last_refresh + 1)[0], frames[0])
+    camera_movement = []
+    for index, frame in enumerate(frames[1:]):
+        features = camera_movement_estimator.old_features
+        movement = camera_movement_estimator.estimate_frame_movement(frame)
+        camera_movement.append(movement)
+        # Os pontos só foram trocados se a detecção encontrou algum; senão o filho também manteve os seus.
+        refreshed = camera_movement_estimator.old_features is not features
+        if refreshed and index < len(estimated) and any(estimated[index]):
+            return camera_movement + estimated[index + 1:]
+    return camera_movement
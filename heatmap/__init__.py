@@ -0,0 +1,2 @@
+from .pitch_heatmap import PitchHeatmap
+from .minimap import MinimapRenderer, render_pitch_background
\ No newline at end of file
@@ -0,0 +1,79 @@
+import functools
+import numpy as np
+import cv2
+
+# Cores dos pontos no minimapa, na ordem de OBJECT_CLASSES (player, referees, ball); os jogadores com time
+# usam a cor do time.
+MINIMAP_COLORS = ((0, 0, 255), (0, 0, 0), (255, 255, 255))
+
+
+@functools.lru_cache(maxsize=8)
+def render_pitch_background(pitch_length, pitch_width, scale):
+    # Campo visto de cima (x na horizontal, y na vertical, como na câmera), desenhado uma única vez por
+    # tamanho e compartilhado por todos os minimapas: faixas de grama a cada 5 m e as linhas da região.
+    width, height = int(round(pitch_length * scale)), int(round(pitch_width * scale))
+    background = np.empty((height, width, 3), dtype=np.uint8)
+    background[:] = (40, 140, 40)
+    for x in range(0, int(np.ceil(pitch_length)), 10):
+        background[:, int(x * scale):int(min(x + 5, pitch_length) * scale)] = (50, 160, 50)
+    cv2.rectangle(background, (0, 0), (width - 1, height - 1), (255, 255, 255), 1)
+    cv2.line(background, (0, height // 2), (width - 1, height // 2), (220, 220, 220), 1)
+    background.setflags(write=False)
+    return background
+
+
+class MinimapRenderer():
+    # Minimapa com as posições no campo (position_transformed) dos objetos do quadro, desenhado sobre o fundo
+    # em cache e misturado apenas na região do canto superior direito do quadro. O custo por quadro é uma cópia
+    # do fundo (alguns KB), um círculo por objeto e a mistura da região.
+    def __init__(self, pitch_length=23.32, pitch_width=68, scale=4, margin=20, alpha=0.8):
+        self.pitch_length = pitch_length
+        self.pitch_width = pitch_width
+        self.scale = scale
+        self.margin = margin
+        self.alpha = alpha
+        self.background = render_pitch_background(pitch_length, pitch_width, scale)
+
+    def to_pixels(self, positions):
+        # Metros -> pixels do minimapa, para um array (N, 2); as posições NaN ficam de fora.
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        valid = ~np.isnan(positions).any(axis=1)
+        height, width = self.background.shape[:2]
+        pixels = np.rint(positions[valid] * self.scale).astype(np.int32)
+        pixels[:, 0] = pixels[:, 0].clip(0, width - 1)
+        pixels[:, 1] = pixels[:, 1].clip(0, height - 1)
+        return pixels, valid
+
+    def draw(self, frame, positions, object_classes, team=None, team_colors=None):
+        minimap = self.background.copy()
+        pixels, valid = self.to_pixels(positions)
+        object_classes = np.asarray(object_classes)[valid]
+        team = None if team is None else np.asarray(team)[valid]
+        for index, (x, y) in enumerate(pixels.tolist()):
+            object_class = int(object_classes[index])
+            color = MINIMAP_COLORS[object_class]
+            if object_class == 0 and team is not None and team_colors and not np.isnan(team[index]):
+                color = team_colors.get(int(team[index]), color)
+            cv2.circle(minimap, (x, y), 3 if object_class == 2 else 4, color, cv2.FILLED)
+
+        # Mistura só a região do minimapa (recortada se o quadro for menor).
+        height, width = minimap.shape[:2]
+        top, left = self.margin, max(frame.shape[1] - width - self.margin, 0)
+        region = frame[top:top + height, left:left + width]
+        minimap = minimap[:region.shape[0], :region.shape[1]]
+        cv2.addWeighted(minimap, self.alpha, region, 1 - self.alpha, 0, region)
+        return frame
+
+    def render_heatmap(self, counts):
+        # Mapa de calor (contagens de PitchHeatmap) colorido sobre o fundo do campo, para gravar como imagem.
+        counts = np.asarray(counts, dtype=np.float32)
+        height, width = self.background.shape[:2]
+        intensity = np.log1p(counts)
+        intensity = (255 * intensity / intensity.max()).astype(np.uint8) if intensity.max() > 0 else \
+            intensity.astype(np.uint8)
+        intensity = cv2.resize(intensity, (width, height), interpolation=cv2.INTER_LINEAR)
+        colored = cv2.applyColorMap(intensity, cv2.COLORMAP_JET)
+        image = self.background.copy()
+        occupied = intensity > 0
+        image[occupied] = cv2.addWeighted(colored, 0.7, image, 0.3, 0)[occupied]
+        return image
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import cv2
+import sys
+sys.path.append('../')
+from utils import TrackTable
+from .minimap import MinimapRenderer
+
+
+class PitchHeatmap():
+    # Mapas de ocupação do campo (position_transformed, em metros) por jogador e por time, em células de
+    # bin_size x bin_size metros. As dimensões padrão são as da região do campo do ViewTransformer.
+    # A grade tem uma linha por faixa de y (largura do campo) e uma coluna por faixa de x, na mesma orientação
+    # da câmera. Cada chamada de update acumula um lote de posições (um quadro, uma janela ou a partida inteira)
+    # com uma única contagem vetorizada por célula, sem atualizações ponto a ponto em Python.
+    def __init__(self, pitch_length=23.32, pitch_width=68, bin_size=1.0):
+        self.pitch_length = pitch_length
+        self.pitch_width = pitch_width
+        self.bin_size = bin_size
+        self.shape = (int(np.ceil(pitch_width / bin_size)), int(np.ceil(pitch_length / bin_size)))
+        self.num_bins = self.shape[0] * self.shape[1]
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        # Contagens por track_id (indexadas pelo próprio ID, crescem por duplicação) e por time
+        # (linha 0: jogadores sem time, linhas 1 e 2: times).
+        self._player_counts = np.zeros((0, self.num_bins), dtype=np.int32)
+        self.team_counts = np.zeros((3, self.num_bins), dtype=np.int64)
+
+    def get_state(self):
+        return {"frames": self.frames, "player_counts": self._player_counts.copy(),
+                "team_counts": self.team_counts.copy()}
+
+    def set_state(self, state):
+        self.frames = state["frames"]
+        self._player_counts = state["player_counts"].copy()
+        self.team_counts = state["team_counts"].copy()
+
+    def _reserve(self, max_track_id):
+        capacity = len(self._player_counts)
+        if max_track_id < capacity:
+            return
+        counts = np.zeros((max(2 * capacity, max_track_id + 1, 64), self.num_bins), dtype=np.int32)
+        counts[:capacity] = self._player_counts
+        self._player_counts = counts
+
+    def bin_indices(self, positions):
+        # Célula (índice na grade achatada) de cada posição e quais posições estão no campo. As posições
+        # são positivas, então truncar é o mesmo que arredondar para baixo; as bordas caem na última célula.
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        valid = ~np.isnan(positions).any(axis=1)
+        cell = (np.nan_to_num(positions) / self.bin_size).astype(np.int64)
+        np.clip(cell, 0, (self.shape[1] - 1, self.shape[0] - 1), out=cell)
+        return cell[:, 1] * self.shape[1] + cell[:, 0], valid
+
+    @staticmethod
+    def _accumulate(counts, rows, cells):
+        # Soma uma ocorrência por par (linha, célula) em counts (linhas, células), só no bloco de linhas
+        # presentes no lote. Lotes grandes (janelas ou a partida inteira) são contados com np.bincount sobre o
+        # bloco; lotes pequenos (um quadro) com np.add.at.
+        first, last = int(rows.min()), int(rows.max())
+        block = counts[first:last + 1]
+        keys = (rows - first) * counts.shape[1] + cells
+        if len(keys) * 8 >= block.size:
+            block += np.bincount(keys, minlength=block.size).reshape(block.shape).astype(counts.dtype)
+        else:
+            np.add.at(block.reshape(-1), keys, 1)
+
+    def update(self, track_ids, positions, teams=None, frames=1):
+        # Acumula as posições de jogadores (track_ids (N,), positions (N, 2) em metros, NaN fora do campo) e,
+        # opcionalmente, seus times (NaN para sem time). frames é o número de quadros do lote.
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        cells, valid = self.bin_indices(positions)
+        self.frames += frames
+        if not valid.any():
+            return
+        track_ids, cells = track_ids[valid], cells[valid]
+        self._reserve(int(track_ids.max()))
+        self._accumulate(self._player_counts, track_ids, cells)
+        team = np.zeros(len(cells), dtype=np.int64)
+        if teams is not None:
+            teams = np.asarray(teams, dtype=np.float32).reshape(-1)[valid]
+            team = np.where((teams == 1) | (teams == 2), teams, 0).astype(np.int64)
+        self._accumulate(self.team_counts, team, cells)
+
+    def add_tracks(self, tracks, window=None):
+        # Acumula todas as linhas de jogadores das trilhas (com position_transformed), janela a janela de
+        # window quadros (None: a partida inteira em um único lote).
+        print("Adding tracks to heatmaps...")
+        if not isinstance(tracks, TrackTable):
+            tracks = TrackTable.from_dict(tracks)
+        if not tracks.has_column('position_transformed'):
+            print("Heatmaps skipped: tracks have no position_transformed!")
+            return
+        players = tracks.object_mask('player')
+        position = tracks.get_column('position_transformed')
+        team = tracks.get_column('team') if tracks.has_column('team') else None
+        window = window or max(tracks.num_frames, 1)
+        for start in range(0, tracks.num_frames, window):
+            stop = min(start + window, tracks.num_frames)
+            rows = slice(int(tracks.frame_offsets[start]), int(tracks.frame_offsets[stop]))
+            in_window = players[rows]
+            self.update(tracks.track_id[rows][in_window], position[rows][in_window],
+                        None if team is None else team[rows][in_window], frames=stop - start)
+        print("Tracks added to heatmaps!")
+
+    def player_heatmap(self, track_id):
+        # Contagens (linhas, colunas) de um track_id; zeros se ele nunca apareceu no campo.
+        if track_id >= len(self._player_counts):
+            return np.zeros(self.shape, dtype=np.int32)
+        return self._player_counts[track_id].reshape(self.shape)
+
+    def team_heatmap(self, team):
+        # Contagens (linhas, colunas) de um time (1 ou 2; 0 para jogadores sem time).
+        return self.team_counts[team].reshape(self.shape)
+
+    def track_ids(self):
+        # track_ids com alguma posição no campo.
+        return np.flatnonzero(self._player_counts.any(axis=1))
+
+    def save(self, path, images=True):
+        # Grava as contagens (quadros, times e jogadores com ocupação) em um .npz compactado e, com images,
+        # o mapa de cada time sobre o campo ao lado (<nome>_team1.png, <nome>_team2.png e, para os jogadores
+        # sem time, <nome>_players.png).
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        track_ids = self.track_ids()
+        np.savez_compressed(path, frames=self.frames, bin_size=self.bin_size,
+                            pitch_size=np.array([self.pitch_length, self.pitch_width]),
+                            team_counts=self.team_counts.reshape(3, *self.shape), track_ids=track_ids,
+                            player_counts=self._player_counts[track_ids].reshape(-1, *self.shape))
+        if not images:
+            return
+        minimap = MinimapRenderer(self.pitch_length, self.pitch_width)
+        for team, name in ((0, "players"), (1, "team1"), (2, "team2")):
+            if self.team_counts[team].any():
+                cv2.imwrite(f"{os.path.splitext(path)[0]}_{name}.png", minimap.render_heatmap(self.team_heatmap(team)))
@@ -0,0 +1 @@
+from .instrumentation import Instrumentation, peak_rss_bytes, current_rss_bytes
\ No newline at end of file
@@ -0,0 +1,205 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sem medição de pico de memória
+    resource = None
+
+
+def peak_rss_bytes():
+    # Pico de memória residente do processo até agora (ru_maxrss é em KiB no Linux e em bytes no macOS).
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss_bytes():
+    # Memória residente atual (só no Linux, via /proc); 0 quando não disponível.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class StageRecord():
+    # Totais acumulados de uma etapa (uma etapa pode ser executada várias vezes, ex.: uma vez por janela).
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.frames = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = 0
+        self.rss_growth_bytes = 0
+        self.profile = None
+
+    def report(self, profile_top=15):
+        report = {
+            "calls": self.calls,
+            "frames": self.frames,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rss_growth_bytes": self.rss_growth_bytes,
+            "frames_per_second": round(self.frames / self.wall_seconds, 2) if self.frames and self.wall_seconds
+            else None,
+        }
+        if self.profile is not None:
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats('cumulative').print_stats(profile_top)
+            report["profile"] = output.getvalue().splitlines()
+        return report
+
+
+class StageTimer():
+    # Objeto devolvido por Instrumentation.stage; permite informar o número de quadros depois de medir
+    # ou descartar a medição (discard = True).
+    def __init__(self, frames=0):
+        self.frames = frames
+        self.discard = False
+
+
+class Instrumentation():
+    # Mede cada etapa da análise: tempo de parede, tempo de CPU (do processo inteiro, incluindo as threads
+    # auxiliares), pico de memória residente e quadros por segundo. Com profile_stages (nomes das etapas ou
+    # True para todas), a etapa também roda sob o cProfile; os .prof vão para profile_dir, quando definido.
+    # O resultado é gravado em JSON e no formato de texto do Prometheus (textfile collector do node exporter).
+    # Com enabled=False, stage() não mede nada e quase não tem custo.
+    def __init__(self, run_name='football_analysis', profile_stages=(), profile_dir=None, enabled=True):
+        self.run_name = run_name
+        self.profile_stages = profile_stages
+        self.profile_dir = profile_dir
+        self.enabled = enabled
+        self.stages = {}
+        self.started = time.perf_counter()
+        self._profiling = False
+
+    def _should_profile(self, name):
+        return self.profile_stages is True or name in self.profile_stages
+
+    @contextmanager
+    def stage(self, name, frames=0):
+        # Uso: with instrumentation.stage("detect_frames", frames=len(frames)) as stage: ...
+        # (ou stage.frames = n dentro do bloco, quando o número de quadros só é conhecido no final).
+        timer = StageTimer(frames)
+        if not self.enabled:
+            yield timer
+            return
+        record = self.stages.setdefault(name, StageRecord(name))
+        # O cProfile não aceita dois perfis ativos, então etapas aninhadas não são perfiladas.
+        profile = None
+        if self._should_profile(name) and not self._profiling:
+            profile = record.profile = record.profile or cProfile.Profile()
+            self._profiling = True
+        peak_before = peak_rss_bytes()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield timer
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+            if not timer.discard:
+                record.wall_seconds += time.perf_counter() - wall_started
+                record.cpu_seconds += time.process_time() - cpu_started
+                record.calls += 1
+                record.frames += timer.frames
+                peak_after = peak_rss_bytes()
+                record.peak_rss_bytes = max(record.peak_rss_bytes, peak_after)
+                record.rss_growth_bytes += peak_after - peak_before
+
+    def iterate(self, name, iterable):
+        # Mede o tempo gasto para produzir cada item de um iterador (ex.: leitura sob demanda dos quadros),
+        # contando um quadro por item.
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name, frames=1) as stage:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stage.discard = True
+                    return
+            yield item
+
+    def report(self, profile_top=15):
+        return {
+            "run": self.run_name,
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "rss_bytes": current_rss_bytes(),
+            "stages": {name: record.report(profile_top) for name, record in self.stages.items()},
+        }
+
+    def write_json(self, path, profile_top=15):
+        _write_atomically(path, json.dumps(self.report(profile_top), indent=2))
+        if self.profile_dir is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for name, record in self.stages.items():
+                if record.profile is not None:
+                    record.profile.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+    def prometheus_text(self, prefix='football_analysis'):
+        # Uma métrica gauge por medida, com os rótulos run e stage.
+        report = self.report(profile_top=0)
+        run = _escape_label(self.run_name)
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{{{labels}}} {value}")
+
+        metric("run_wall_seconds", "Wall-clock duration of the run.", [(f'run="{run}"', report["wall_seconds"])])
+        metric("run_peak_rss_bytes", "Peak resident memory of the process.",
+               [(f'run="{run}"', report["peak_rss_bytes"])])
+        stage_metrics = (
+            ("stage_wall_seconds", "wall_seconds", "Wall-clock time spent in the stage."),
+            ("stage_cpu_seconds", "cpu_seconds", "Process CPU time spent in the stage."),
+            ("stage_peak_rss_bytes", "peak_rss_bytes", "Peak resident memory of the process after the stage."),
+            ("stage_frames", "frames", "Frames processed by the stage."),
+            ("stage_frames_per_second", "frames_per_second", "Frames processed per wall-clock second."),
+            ("stage_calls", "calls", "Number of times the stage ran."),
+        )
+        for metric_name, key, help_text in stage_metrics:
+            metric(metric_name, help_text, [(f'run="{run}",stage="{_escape_label(name)}"', stage[key])
+                                            for name, stage in report["stages"].items()
+                                            if stage[key] is not None])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix='football_analysis'):
+        # O textfile collector exige que o arquivo seja trocado de uma vez (nunca lido pela metade).
+        _write_atomically(path, self.prometheus_text(prefix))
+
+    def print_summary(self):
+        print("Stage timings:")
+        for name, record in self.stages.items():
+            fps = f", {record.frames / record.wall_seconds:.1f} frames/s" if record.frames and record.wall_seconds \
+                else ""
+            print(f"  {name:<36} {record.wall_seconds:8.2f} s wall, {record.cpu_seconds:8.2f} s CPU, "
+                  f"peak RSS {record.peak_rss_bytes / 1024 ** 2:.0f} MiB{fps}")
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomically(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write(text)
+    os.replace(temporary_path, path)
@@ -3,45 +3,199 @@ from trackers import Tracker
 from speed_and_distance_estimator import SpeedAndDistanceEstimator
 from view_trasformer import ViewTransformer
 from camera_movement_estimator import CameraMovementEstimator
+from pipeline import run_streaming_analysis, run_threaded_analysis, run_live_analysis
+from renderer import FrameRenderer
+from player_ball_assigner import PlayerBallAssigner
+from heatmap import PitchHeatmap, MinimapRenderer
+from track_archive import TrackArchive
+from analysis_cache import AnalysisCache
+from instrumentation import Instrumentation
+
+# Modo de execução:
+# 'streaming': os quadros são lidos sob demanda e apenas FRAME_WINDOW quadros ficam em memória
+# 'threaded': como o streaming, mas leitura, detecção, rastreamento, desenho e gravação rodam em paralelo
+# 'in_memory': fluxo original, com o vídeo inteiro em memória
+# 'live': cada quadro é anotado assim que chega de LIVE_SOURCE, dentro de um orçamento de latência
+PIPELINE_MODE = 'streaming'
+FRAME_WINDOW = 100
+# Tamanho das filas entre as etapas do modo 'threaded'
+PIPELINE_QUEUE_SIZE = 8
+# Threads que desenham intervalos disjuntos de quadros e se o painel de movimento da câmera é exibido
+RENDER_WORKERS = 4
+DRAW_CAMERA_MOVEMENT = False
+# Divide o vídeo de saída em arquivos de N quadros para publicação progressiva (None gera um único arquivo)
+OUTPUT_SEGMENT_LENGTH = None
+# Combina o movimento da câmera de cada quadro com a transformação de perspectiva em uma única projeção
+PER_FRAME_HOMOGRAPHY = False
+# Fluxo óptico da câmera apenas nas faixas da máscara (flow_scale < 1 reduz ainda mais a resolução)
+CAMERA_OPTIONS = dict(crop_to_mask=True, flow_scale=1.0)
+# Número de processos para estimar o movimento da câmera por segmentos (None mantém o cálculo serial)
+CAMERA_WORKERS = None
+# Diretório do cache de análises (trilhas e movimento da câmera), indexado pelo conteúdo do vídeo, do modelo
+# e pelos parâmetros; substitui os antigos stubs em pickle. None desativa o cache
+ANALYSIS_CACHE_DIR = 'cache'
+# Salva o estado da análise a cada N quadros; uma execução interrompida continua do último checkpoint
+CHECKPOINT_INTERVAL = 1000
+# Roda o YOLO só a cada N quadros (e em trocas de cena ou movimentos bruscos), propagando as caixas por fluxo
+# óptico nos quadros intermediários. None detecta todos os quadros
+KEYFRAME_INTERVAL = None
+# Backend de inferência ('onnx', 'openvino', 'torchscript' ou 'pytorch'): exporta o modelo uma vez para models/exports/
+# e escolhe o tamanho do lote pela latência medida. None mantém o YOLO.predict padrão com lotes de 20 quadros
+INFERENCE_BACKEND = None
+# Procura a bola só em um recorte ao redor da posição prevista (no quadro inteiro apenas quando ela é perdida)
+BALL_ROI = False
+# Separa os jogadores em dois times pela cor da camisa (coluna 'team' e elipses na cor de cada time)
+ASSIGN_TEAMS = True
+# Preenche os quadros sem bola por interpolação linear entre as detecções vizinhas
+INTERPOLATE_BALL = True
+# Marca o jogador mais próximo da bola em cada quadro e mostra a posse acumulada de cada time
+BALL_POSSESSION = True
+# Minimapa do campo visto de cima no canto do vídeo e arquivo dos mapas de ocupação por jogador e por time
+# (.npz, com as imagens de cada time ao lado). None não grava os mapas
+DRAW_MINIMAP = True
+HEATMAP_PATH = 'output_videos/heatmaps_2e57b9_3.npz'
+# Diretório do arquivo das trilhas enriquecidas em blocos comprimidos, consultável por trecho ou por jogador sem
+# carregar a partida inteira (TrackArchive(caminho).track(7, columns=['speed'])). None não grava o arquivo
+TRACK_ARCHIVE_PATH = 'output_videos/tracks_2e57b9_3'
+# Modo 'live': fonte do cv2.VideoCapture (índice da câmera, URL ou arquivo, reproduzido no FPS nativo),
+# latência máxima desejada em segundos e política quando a análise atrasa ('none', 'drop', 'skip_detection'
+# ou 'adaptive')
+LIVE_SOURCE = 'input_videos/2e57b9_3.mp4'
+LIVE_LATENCY_BUDGET = 0.2
+LIVE_POLICY = 'adaptive'
+# Métricas por etapa (tempo de parede e de CPU, pico de memória, quadros/s) em JSON e no formato de texto do
+# Prometheus, para o textfile collector do node exporter. PROFILE_STAGES lista as etapas executadas sob o
+# cProfile (True para todas); os .prof vão para PROFILE_DIR
+METRICS_PATH = 'output_videos/metrics_2e57b9_3.json'
+PROMETHEUS_METRICS_PATH = 'output_videos/metrics_2e57b9_3.prom'
+PROFILE_STAGES = ()
+PROFILE_DIR = 'output_videos/profiles'
+
+
+def write_metrics(instrumentation):
+    instrumentation.print_summary()
+    if METRICS_PATH:
+        instrumentation.write_json(METRICS_PATH)
+    if PROMETHEUS_METRICS_PATH:
+        instrumentation.write_prometheus(PROMETHEUS_METRICS_PATH)
+
 
 def main():
     print("Starting...")
-    # Lê os quadros de vídeo
-    video_frames = read_video('input_videos/2e57b9_3.mp4')
+    cache = AnalysisCache(ANALYSIS_CACHE_DIR) if ANALYSIS_CACHE_DIR else None
+    instrumentation = Instrumentation(run_name='2e57b9_3', profile_stages=PROFILE_STAGES, profile_dir=PROFILE_DIR)
+    if PIPELINE_MODE == 'live':
+        tracker = Tracker('models/best.pt', keyframe_interval=KEYFRAME_INTERVAL,
+                          backend=INFERENCE_BACKEND, ball_roi=BALL_ROI, assign_teams=ASSIGN_TEAMS)
+        run_live_analysis(LIVE_SOURCE, tracker, output_video_path='output_videos/live_output.avi',
+                          latency_budget=LIVE_LATENCY_BUDGET, policy=LIVE_POLICY, camera_options=CAMERA_OPTIONS,
+                          draw_camera_movement=DRAW_CAMERA_MOVEMENT,
+                          report_path='output_videos/live_report.json', minimap=DRAW_MINIMAP,
+                          heatmap_path=HEATMAP_PATH)
+        print("Finishing...")
+        return
+
+    if PIPELINE_MODE == 'threaded':
+        tracker = Tracker('models/best.pt', keyframe_interval=KEYFRAME_INTERVAL,
+                          backend=INFERENCE_BACKEND, ball_roi=BALL_ROI, assign_teams=ASSIGN_TEAMS)
+        run_threaded_analysis('input_videos/2e57b9_3.mp4', 'output_videos/output_video_2e57b9_3.avi', tracker,
+                              queue_size=PIPELINE_QUEUE_SIZE, camera_options=CAMERA_OPTIONS,
+                              report_path='output_videos/pipeline_report_2e57b9_3.json',
+                              render_workers=RENDER_WORKERS, draw_camera_movement=DRAW_CAMERA_MOVEMENT,
+                              output_segment_length=OUTPUT_SEGMENT_LENGTH, interpolate_ball=INTERPOLATE_BALL,
+                              ball_possession=BALL_POSSESSION, minimap=DRAW_MINIMAP, heatmap_path=HEATMAP_PATH,
+                              archive_path=TRACK_ARCHIVE_PATH, instrumentation=instrumentation)
+        write_metrics(instrumentation)
+        print("Finishing...")
+        return
+
+    if PIPELINE_MODE == 'streaming':
+        tracker = Tracker('models/best.pt', keyframe_interval=KEYFRAME_INTERVAL,
+                          backend=INFERENCE_BACKEND, ball_roi=BALL_ROI, assign_teams=ASSIGN_TEAMS)
+        run_streaming_analysis('input_videos/2e57b9_3.mp4', 'output_videos/output_video_2e57b9_3.avi', tracker,
+                               frame_window=FRAME_WINDOW, per_frame_homography=PER_FRAME_HOMOGRAPHY,
+                               camera_options=CAMERA_OPTIONS, camera_workers=CAMERA_WORKERS,
+                               render_workers=RENDER_WORKERS, draw_camera_movement=DRAW_CAMERA_MOVEMENT,
+                               output_segment_length=OUTPUT_SEGMENT_LENGTH, cache=cache,
+                               checkpoint_path='checkpoints/streaming_2e57b9_3.pkl',
+                               checkpoint_interval=CHECKPOINT_INTERVAL, interpolate_ball=INTERPOLATE_BALL,
+                               ball_possession=BALL_POSSESSION, minimap=DRAW_MINIMAP, heatmap_path=HEATMAP_PATH,
+                               archive_path=TRACK_ARCHIVE_PATH, instrumentation=instrumentation)
+        write_metrics(instrumentation)
+        print("Finishing...")
+        return
+
+    # Lê os quadros de vídeo e o FPS de origem
+    with instrumentation.stage("read_video") as stage:
+        video_frames = read_video('input_videos/2e57b9_3.mp4')
+        stage.frames = len(video_frames)
+    num_frames = len(video_frames)
+    frame_rate = get_video_properties('input_videos/2e57b9_3.mp4')["fps"] or 24
 
     # Instancia o objeto Tracker com um modelo pré-treinado especificado
-    tracker = Tracker('models/best.pt')
+    tracker = Tracker('models/best.pt', keyframe_interval=KEYFRAME_INTERVAL,
+                      backend=INFERENCE_BACKEND, ball_roi=BALL_ROI, assign_teams=ASSIGN_TEAMS)
 
     # Obtém o rastreamento dos objetos nos quadros do vídeo.
-    # Caso não seja especificado para ler de um 'stub', processa o vídeo para detectar e rastrear objetos.
-    tracks = tracker.get_object_tracking(video_frames, read_from_stub=False, stub_path='stubs/track_stubs.pkl')
+    # Caso o resultado não esteja no cache, processa o vídeo para detectar e rastrear objetos.
+    tracks = tracker.get_object_tracking(video_frames, cache=cache, video_path='input_videos/2e57b9_3.mp4',
+                                         checkpoint_path='checkpoints/tracking_2e57b9_3.pkl',
+                                         checkpoint_interval=CHECKPOINT_INTERVAL,
+                                         instrumentation=instrumentation)
+    if INTERPOLATE_BALL:
+        tracks = tracker.interpolate_ball_positions(tracks)
 
-    tracker.add_position_to_tracks(tracks)
+    with instrumentation.stage("add_position_to_tracks", frames=num_frames):
+        tracker.add_position_to_tracks(tracks)
 
-    camera_movement_estimator = CameraMovementEstimator(video_frames[0])
-    camera_movement_per_frame = camera_movement_estimator.get_camera_movement(video_frames,
-                                                                                read_from_stub=False,
-                                                                                stub_path='stubs/camera_movement_stub.pkl')
-    camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
+    # Mesmas opções dos outros modos, para que o resultado e a chave do cache sejam os mesmos
+    camera_movement_estimator = CameraMovementEstimator(video_frames[0], **CAMERA_OPTIONS)
+    with instrumentation.stage("get_camera_movement", frames=num_frames):
+        camera_movement_per_frame = camera_movement_estimator.get_camera_movement(
+            video_frames, cache=cache, video_path='input_videos/2e57b9_3.mp4')
+    with instrumentation.stage("add_adjust_positions_to_tracks", frames=num_frames):
+        camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
 
     view_transformer = ViewTransformer()
-    view_transformer.add_transformed_position_to_tracks(tracks)
+    with instrumentation.stage("add_transformed_position_to_tracks", frames=num_frames):
+        view_transformer.add_transformed_position_to_tracks(tracks)
 
     # Velocidade e Distancia estimada
-    speed_estimator = SpeedAndDistanceEstimator()
-    speed_estimator.add_speed_and_distance_to_tracks(tracks)
+    speed_estimator = SpeedAndDistanceEstimator(frame_rate=frame_rate)
+    with instrumentation.stage("add_speed_and_distance_to_tracks", frames=num_frames):
+        speed_estimator.add_speed_and_distance_to_tracks(tracks)
+
+    # Posse de bola: jogador mais próximo da bola em cada quadro, suavizada ao longo do tempo
+    ball_possession = None
+    if BALL_POSSESSION:
+        with instrumentation.stage("assign_ball_possession", frames=num_frames):
+            ball_possession = PlayerBallAssigner().assign_ball_possession(tracks)
 
-    # Aplica anotações gráficas nos quadros do vídeo com base nos rastreamentos obtidos
-    output_video_frames = tracker.draw_annotations(video_frames, tracks)
+    # Mapas de ocupação do campo por jogador e por time
+    if HEATMAP_PATH:
+        heatmap = PitchHeatmap()
+        with instrumentation.stage("heatmaps", frames=num_frames):
+            heatmap.add_tracks(tracks, window=1000)
+            heatmap.save(HEATMAP_PATH)
 
-    # Aplica anotações para o movimento da camera
-    # output_video_frames = camera_movement_estimator.draw_camera_movement(output_video_frames, camera_movement_per_frame)
+    # Trilhas enriquecidas no disco, para consultas posteriores sem recarregar a partida inteira
+    if TRACK_ARCHIVE_PATH:
+        with instrumentation.stage("track_archive", frames=num_frames):
+            TrackArchive.write(TRACK_ARCHIVE_PATH, tracks, metadata={"fps": frame_rate})
 
-    # Aplica anotações da velocidade e distancia
-    output_video_frame = speed_estimator.draw_speed_and_distance(output_video_frames, tracks)
+    # Aplica todas as anotações (elipses, velocidade e distância e, opcionalmente, o painel da câmera)
+    # em uma única passada, desenhando diretamente sobre os quadros lidos
+    renderer = FrameRenderer(tracks, camera_movement_per_frame=camera_movement_per_frame
+                             if DRAW_CAMERA_MOVEMENT else None, team_colors=tracker.team_colors(),
+                             ball_possession=ball_possession, minimap=MinimapRenderer() if DRAW_MINIMAP else None)
+    with instrumentation.stage("draw_annotations", frames=num_frames):
+        output_video_frames = renderer.render_frames(video_frames, num_workers=RENDER_WORKERS)
 
     # Salva os quadros anotados como um novo arquivo de vídeo
-    save_video(output_video_frame, 'output_videos/output_video_2e57b9_3.avi')
+    with instrumentation.stage("save_video", frames=num_frames):
+        save_video(output_video_frames, 'output_videos/output_video_2e57b9_3.avi', fps=frame_rate,
+                   segment_length=OUTPUT_SEGMENT_LENGTH)
+    write_metrics(instrumentation)
     print("Finishing...")
     
 if __name__ == '__main__':
@@ -0,0 +1,4 @@
+from .streaming import run_streaming_analysis
+from .threaded import ThreadedPipeline, run_threaded_analysis
+from .batch import run_batch, collect_videos
+from .live import run_live_analysis, LiveFrameSource, LiveAnalyzer
\ No newline at end of file
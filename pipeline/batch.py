@@ -0,0 +1,190 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import sys
+sys.path.append('../')
+from trackers import Tracker
+from analysis_cache import AnalysisCache
+from pipeline.streaming import run_streaming_analysis
+
+# Uso: python -m pipeline.batch input_videos/ --workers 4
+#      python -m pipeline.batch manifest.txt --output-dir output_videos --keyframe-interval 5
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Estado de cada processo do pool: o modelo é carregado uma única vez e reaproveitado entre os vídeos.
+_worker = {}
+
+
+def collect_videos(source, output_dir):
+    # source pode ser um diretório (todos os vídeos dentro dele) ou um manifesto: .txt com um caminho por
+    # linha, ou .json com uma lista de caminhos ou de {"input": ..., "output": ...}.
+    # Caminhos relativos do manifesto são relativos à pasta do manifesto.
+    if os.path.isdir(source):
+        entries = [os.path.join(source, name) for name in sorted(os.listdir(source))
+                   if name.lower().endswith(VIDEO_EXTENSIONS)]
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            if source.endswith(".json"):
+                entries = json.load(f)
+            else:
+                entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        entries = [{key: os.path.join(base_dir, path) for key, path in entry.items()} if isinstance(entry, dict)
+                   else os.path.join(base_dir, entry) for entry in entries]
+
+    jobs = []
+    for entry in entries:
+        input_video_path = entry["input"] if isinstance(entry, dict) else entry
+        stem = os.path.splitext(os.path.basename(input_video_path))[0]
+        output_video_path = entry.get("output") if isinstance(entry, dict) else None
+        jobs.append({
+            "name": stem,
+            "input": input_video_path,
+            "output": output_video_path or os.path.join(output_dir, f"output_video_{stem}.avi"),
+        })
+    return jobs
+
+
+def _timing_path(job):
+    return os.path.splitext(job["output"])[0] + ".timing.json"
+
+
+def _is_done(job):
+    # Um vídeo só conta como concluído se a saída existe e o resumo de tempo registrou sucesso;
+    # saídas parciais de uma execução interrompida são refeitas.
+    if not os.path.exists(job["output"]) or not os.path.exists(_timing_path(job)):
+        return False
+    with open(_timing_path(job)) as f:
+        return json.load(f).get("status") == "ok"
+
+
+def _init_worker(model_path, tracker_options, cache_dir, threads_per_worker):
+    # Limita as threads de cada processo para que o pool não dispute os mesmos núcleos.
+    if threads_per_worker:
+        cv2.setNumThreads(threads_per_worker)
+        try:
+            import torch
+            torch.set_num_threads(threads_per_worker)
+        except ImportError:
+            pass
+    started = time.perf_counter()
+    _worker["tracker"] = Tracker(model_path, **tracker_options)
+    _worker["model_load_seconds"] = time.perf_counter() - started
+    _worker["cache"] = AnalysisCache(cache_dir) if cache_dir else None
+    _worker["videos"] = 0
+
+
+def _process_video(job, analysis_options):
+    tracker = _worker["tracker"]
+    tracker.reset_tracking()
+    summary = dict(job, worker_pid=os.getpid(), status="ok", frames=0,
+                   model_load_seconds=round(_worker["model_load_seconds"], 3) if not _worker["videos"] else 0.0)
+    _worker["videos"] += 1
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+        checkpoint_path = os.path.splitext(job["output"])[0] + ".checkpoint.pkl"
+        options = dict(analysis_options)
+        if options.pop("heatmaps", False):
+            options["heatmap_path"] = os.path.splitext(job["output"])[0] + "_heatmaps.npz"
+        if options.pop("archive", False):
+            options["archive_path"] = os.path.splitext(job["output"])[0] + "_tracks"
+        tracks = run_streaming_analysis(job["input"], job["output"], tracker, cache=_worker["cache"],
+                                        checkpoint_path=checkpoint_path, **options)
+        if tracks is None:
+            summary["status"] = "empty"
+        else:
+            summary["frames"] = tracks.num_frames
+    except Exception as error:
+        summary["status"] = "failed"
+        summary["error"] = f"{type(error).__name__}: {error}"
+        summary["traceback"] = traceback.format_exc()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    summary["cpu_seconds"] = round(time.process_time() - cpu_started, 3)
+    summary["fps"] = round(summary["frames"] / summary["seconds"], 2) if summary["seconds"] else 0.0
+    return summary
+
+
+def run_batch(jobs, model_path='models/best.pt', num_workers=None, threads_per_worker=None, tracker_options=None,
+              analysis_options=None, cache_dir='cache', summary_path=None, overwrite=False):
+    # Distribui os vídeos entre os processos e grava um resumo de tempo por vídeo (<saída>.timing.json)
+    # e um resumo geral. Vídeos já concluídos são pulados, a menos que overwrite=True, então uma fila
+    # interrompida pode ser retomada rodando o mesmo comando.
+    num_workers = num_workers or os.cpu_count()
+    pending = [job for job in jobs if overwrite or not _is_done(job)]
+    print(f"Processing {len(pending)} of {len(jobs)} videos with {num_workers} workers...")
+    summaries = []
+    started = time.perf_counter()
+    # 'spawn' evita herdar threads e estado do OpenCV/PyTorch do processo principal.
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(model_path, tracker_options or {}, cache_dir, threads_per_worker)) as pool:
+        futures = [pool.submit(_process_video, job, analysis_options or {}) for job in pending]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            with open(_timing_path(summary), 'w') as f:
+                json.dump(summary, f, indent=2)
+            print(f"[{len(summaries)}/{len(pending)}] {summary['name']}: {summary['status']}, "
+                  f"{summary['frames']} frames in {summary['seconds']:.1f} s ({summary['fps']:.1f} fps)")
+
+    report = {
+        "videos": len(pending),
+        "skipped": len(jobs) - len(pending),
+        "failed": sum(summary["status"] == "failed" for summary in summaries),
+        "workers": num_workers,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "frames": sum(summary["frames"] for summary in summaries),
+        "per_video": sorted(summaries, key=lambda summary: summary["name"]),
+    }
+    if summary_path is not None:
+        os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+        with open(summary_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"Batch finished: {report['frames']} frames from {len(pending)} videos in {report['wall_seconds']:.1f} s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processa vários vídeos em paralelo, um processo por vídeo.")
+    parser.add_argument("source", help="diretório de vídeos ou manifesto (.txt ou .json)")
+    parser.add_argument("--output-dir", default="output_videos")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: número de CPUs)")
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--frame-window", type=int, default=100)
+    parser.add_argument("--keyframe-interval", type=int, default=None)
+    parser.add_argument("--backend", default=None, help="backend de inferência (ex.: onnx)")
+    parser.add_argument("--assign-teams", action="store_true", help="separa os jogadores em times pela camisa")
+    parser.add_argument("--ball-possession", action="store_true",
+                        help="marca quem está com a bola e mostra a posse de cada time")
+    parser.add_argument("--minimap", action="store_true", help="desenha o minimapa do campo visto de cima")
+    parser.add_argument("--heatmaps", action="store_true",
+                        help="grava os mapas de ocupação em <saída>_heatmaps.npz (e as imagens dos times)")
+    parser.add_argument("--archive", action="store_true",
+                        help="grava as trilhas enriquecidas como um TrackArchive em <saída>_tracks/")
+    parser.add_argument("--cache-dir", default="cache", help="use '' para desativar o cache")
+    parser.add_argument("--summary", default=None, help="padrão: <output-dir>/batch_summary.json")
+    parser.add_argument("--overwrite", action="store_true", help="reprocessa vídeos já concluídos")
+    args = parser.parse_args()
+
+    jobs = collect_videos(args.source, args.output_dir)
+    run_batch(jobs, model_path=args.model, num_workers=args.workers, threads_per_worker=args.threads_per_worker,
+              tracker_options=dict(keyframe_interval=args.keyframe_interval, backend=args.backend,
+                                   assign_teams=args.assign_teams),
+              analysis_options=dict(frame_window=args.frame_window, ball_possession=args.ball_possession,
+                                    minimap=args.minimap, heatmaps=args.heatmaps, archive=args.archive),
+              cache_dir=args.cache_dir or None,
+              summary_path=args.summary or os.path.join(args.output_dir, "batch_summary.json"),
+              overwrite=args.overwrite)
+
+
+if __name__ == '__main__':
+    main()
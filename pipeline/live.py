@@ -0,0 +1,275 @@
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import VideoEncoder, OBJECT_CLASSES
+from trackers.keyframe_detector import KeyframeDetector
+from camera_movement_estimator import CameraMovementEstimator
+from view_trasformer import ViewTransformer
+from speed_and_distance_estimator import LiveSpeedAndDistanceEstimator
+from renderer import FrameRenderer
+from heatmap import PitchHeatmap, MinimapRenderer
+
+# Marca o fim dos quadros da fonte ao vivo.
+_END_OF_STREAM = object()
+
+# Políticas para quando a análise fica atrasada em relação ao orçamento de latência:
+# 'none': processa todos os quadros (a latência cresce sem limite)
+# 'drop': descarta quadros atrasados quando já há um quadro mais novo na fila (pula para o mais recente)
+# 'skip_detection': não roda o modelo nesses quadros; as caixas são propagadas por fluxo óptico
+# 'adaptive': primeiro pula a detecção e, se ainda assim não couber no orçamento, descarta como em 'drop'
+LIVE_POLICIES = ('none', 'drop', 'skip_detection', 'adaptive')
+
+
+class LiveFrameSource():
+    # Lê quadros de um cv2.VideoCapture (câmera, URL ou arquivo) em uma thread própria e registra o instante
+    # de chegada de cada um. Com realtime, um arquivo é reproduzido no FPS nativo, como se fosse ao vivo, e o
+    # instante de chegada é o previsto pelo FPS (mesmo que a leitura tenha atrasado por causa da fila cheia).
+    # A fila é limitada: com drop_when_full, o quadro mais antigo é descartado quando ela enche (uma fonte
+    # ao vivo não espera); sem ele, a leitura bloqueia até a análise consumir a fila.
+    def __init__(self, source, realtime=None, queue_size=4, drop_when_full=True):
+        self.source = source
+        self.realtime = isinstance(source, str) and os.path.isfile(source) if realtime is None else realtime
+        self.drop_when_full = drop_when_full
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video source: {source}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="live-source", daemon=True)
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if not self.drop_when_full or item is _END_OF_STREAM:
+                    continue
+                try:
+                    self._queue.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self.realtime:
+                    # O quadro i "chega" em started + i / fps. Se a leitura estiver atrasada, os quadros que uma
+                    # câmera já teria substituído são pulados (a menos que a política não permita descartes).
+                    if self.drop_when_full:
+                        while time.perf_counter() - started > (self.frames_read + 1) / self.fps and self.cap.grab():
+                            self.frames_read += 1
+                            self.frames_dropped += 1
+                    arrival = started + self.frames_read / self.fps
+                    delay = arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put((self.frames_read, arrival if self.realtime else time.perf_counter(), frame))
+                self.frames_read += 1
+        finally:
+            self._put(_END_OF_STREAM)
+
+    def pending(self):
+        # Quadros já recebidos e ainda não consumidos.
+        return self._queue.qsize()
+
+    def __iter__(self):
+        # Gera (índice do quadro na fonte, instante de chegada, quadro).
+        while True:
+            item = self._queue.get()
+            if item is _END_OF_STREAM:
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.cap.release()
+
+
+class LiveAnalyzer():
+    # Executa rastreamento, movimento da câmera, transformação para o campo e velocidade quadro a quadro,
+    # devolvendo o quadro anotado. As etapas que dependem do primeiro quadro são criadas na primeira chamada.
+    # Com um PitchHeatmap, as posições no campo dos jogadores são acumuladas a cada quadro processado.
+    def __init__(self, tracker, frame_rate=30, keyframe_interval=1, camera_options=None,
+                 draw_camera_movement=False, draw_minimap=False, heatmap=None):
+        self.tracker = tracker
+        # A detecção é sempre feita pelo KeyframeDetector, que sabe propagar as caixas quando ela é pulada.
+        self.keyframe_detector = tracker.keyframe_detector or KeyframeDetector(tracker,
+                                                                               keyframe_interval=keyframe_interval)
+        self.camera_options = camera_options
+        self.camera_movement_estimator = None
+        self.view_transformer = ViewTransformer()
+        self.speed_estimator = LiveSpeedAndDistanceEstimator(frame_rate=frame_rate)
+        self.renderer = FrameRenderer(None, minimap=MinimapRenderer() if draw_minimap else None)
+        self.heatmap = heatmap
+        self.draw_camera_movement = draw_camera_movement
+        self.track_builder = tracker.create_track_builder()
+
+    def process(self, frame_num, frame, detect=None):
+        # frame_num é o índice do quadro na fonte (a velocidade usa o tempo real, mesmo com quadros descartados).
+        if self.camera_movement_estimator is None:
+            self.camera_movement_estimator = CameraMovementEstimator(frame, **(self.camera_options or {}))
+        detection, class_name = self.keyframe_detector.process_frame(frame, detect)
+        if self.tracker.ball_tracker is not None:
+            # A busca da bola no recorte roda em todos os quadros, mesmo quando a detecção é pulada.
+            detection, class_name = self.tracker.ball_tracker.update(frame, detection, class_name)
+
+        # Apenas as linhas do quadro atual são mantidas no builder.
+        self.track_builder.clear()
+        self.tracker.add_supervision_detection_to_tracks(detection, class_name, self.track_builder, frame)
+        object_class, track_id, bbox = self.track_builder.rows(0)
+
+        position = self.tracker.positions_from_bboxes(bbox, object_class == OBJECT_CLASSES.index('ball'))
+        camera_movement = self.camera_movement_estimator.estimate_frame_movement(frame)
+        position_transformed, _ = self.view_transformer.transform_points(position - np.asarray(camera_movement))
+
+        speed = np.full(len(track_id), np.nan, dtype=np.float32)
+        distance = np.full(len(track_id), np.nan, dtype=np.float32)
+        is_player = object_class == OBJECT_CLASSES.index('player')
+        speed[is_player], distance[is_player] = self.speed_estimator.update(frame_num, track_id[is_player],
+                                                                            position_transformed[is_player])
+
+        team = None
+        if self.tracker.team_assigner is not None:
+            # O time de cada jogador é o da sua trilha até aqui (o TeamAssigner guarda um time por track_id).
+            team = np.full(len(track_id), np.nan, dtype=np.float32)
+            team[is_player] = self.tracker.team_assigner.teams(track_id[is_player])
+            self.renderer.team_colors = self.tracker.team_colors()
+        self.renderer.draw_rows(frame, bbox, object_class, speed, distance, team,
+                                camera_movement=camera_movement if self.draw_camera_movement else None)
+        if self.heatmap is not None:
+            self.heatmap.update(track_id[is_player], position_transformed[is_player],
+                                None if team is None else team[is_player])
+        if self.renderer.minimap is not None:
+            self.renderer.draw_minimap(frame, position_transformed, object_class, team)
+        return frame
+
+
+def latency_percentiles(latencies_seconds):
+    if not len(latencies_seconds):
+        return {}
+    latencies_ms = np.asarray(latencies_seconds) * 1000
+    percentiles = np.percentile(latencies_ms, [50, 90, 95, 99])
+    return {"p50_ms": round(float(percentiles[0]), 2), "p90_ms": round(float(percentiles[1]), 2),
+            "p95_ms": round(float(percentiles[2]), 2), "p99_ms": round(float(percentiles[3]), 2),
+            "max_ms": round(float(latencies_ms.max()), 2), "mean_ms": round(float(latencies_ms.mean()), 2)}
+
+
+def run_live_analysis(source, tracker, output_video_path=None, latency_budget=0.2, policy='adaptive',
+                      keyframe_interval=1, max_consecutive_skips=10, queue_size=4, realtime=None,
+                      camera_options=None, draw_camera_movement=False, display=False, report_path=None,
+                      max_frames=None, minimap=False, heatmap_path=None):
+    # Modo ao vivo: cada quadro é analisado e anotado assim que chega, e a latência de ponta a ponta (da
+    # chegada do quadro até a entrega do quadro anotado ao encoder ou à tela) é medida por quadro.
+    # Antes de processar um quadro, a latência final é estimada pela espera na fila mais o tempo médio de
+    # processamento (com e sem detecção); se passar de latency_budget segundos, a política é aplicada.
+    # Um quadro só é descartado se houver outro mais novo esperando, então a análise nunca para por completo.
+    # max_consecutive_skips limita quantos quadros seguidos podem ficar sem detecção.
+    # Com heatmap_path, os mapas de ocupação dos quadros processados são gravados nesse .npz ao final.
+    if policy not in LIVE_POLICIES:
+        raise ValueError(f"Unknown live policy: {policy}")
+    print("Starting live analysis...")
+    frame_source = LiveFrameSource(source, realtime=realtime, queue_size=queue_size,
+                                   drop_when_full=policy != 'none')
+    analyzer = LiveAnalyzer(tracker, frame_rate=frame_source.fps, keyframe_interval=keyframe_interval,
+                            camera_options=camera_options, draw_camera_movement=draw_camera_movement,
+                            draw_minimap=minimap, heatmap=PitchHeatmap() if heatmap_path is not None else None)
+    encoder = VideoEncoder(output_video_path, fps=frame_source.fps, frame_size=frame_source.frame_size) \
+        if output_video_path is not None else None
+
+    # Médias móveis exponenciais do tempo de processamento de um quadro com e sem detecção.
+    processing_seconds = {True: None, False: None}
+    latencies = []
+    counts = {"processed": 0, "dropped_by_policy": 0, "detection_skipped": 0}
+    consecutive_skips = 0
+    started = time.perf_counter()
+    frame_source.start()
+    try:
+        for frame_num, arrival, frame in frame_source:
+            waited = time.perf_counter() - arrival
+            detect = None
+            if policy != 'none':
+                predicted = waited + (processing_seconds[True] or 0.0)
+                if policy in ('skip_detection', 'adaptive') and predicted > latency_budget and \
+                        consecutive_skips < max_consecutive_skips:
+                    detect = False
+                    predicted = waited + (processing_seconds[False] or 0.0)
+                if policy in ('drop', 'adaptive') and predicted > latency_budget and frame_source.pending():
+                    counts["dropped_by_policy"] += 1
+                    continue
+
+            detections_before = analyzer.keyframe_detector.stats["detected_frames"]
+            processing_started = time.perf_counter()
+            annotated_frame = analyzer.process(frame_num, frame, detect)
+            if encoder is not None:
+                encoder.write(annotated_frame)
+            if display:
+                cv2.imshow("live", annotated_frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            finished = time.perf_counter()
+
+            detected = analyzer.keyframe_detector.stats["detected_frames"] > detections_before
+            elapsed = finished - processing_started
+            previous = processing_seconds[detected]
+            processing_seconds[detected] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+            consecutive_skips = 0 if detected else consecutive_skips + 1
+            counts["detection_skipped"] += detect is False and not detected
+            counts["processed"] += 1
+            latencies.append(finished - arrival)
+            if max_frames is not None and counts["processed"] >= max_frames:
+                break
+    finally:
+        frame_source.close()
+        if encoder is not None:
+            encoder.close()
+        if display:
+            cv2.destroyAllWindows()
+
+    wall_seconds = time.perf_counter() - started
+    report = {
+        "policy": policy,
+        "latency_budget_ms": round(latency_budget * 1000, 2),
+        "source_fps": round(frame_source.fps, 2),
+        "frames_read": frame_source.frames_read,
+        "frames_dropped_at_source": frame_source.frames_dropped,
+        "frames_dropped_by_policy": counts["dropped_by_policy"],
+        "frames_processed": counts["processed"],
+        "detection_skipped": counts["detection_skipped"],
+        "detected_frames": analyzer.keyframe_detector.stats["detected_frames"],
+        "output_fps": round(counts["processed"] / wall_seconds, 2) if wall_seconds else 0.0,
+        "within_budget": round(float(np.mean(np.asarray(latencies) <= latency_budget)), 4) if latencies else 0.0,
+        "latency": latency_percentiles(latencies),
+    }
+    print("Live analysis:", json.dumps(report))
+    if report_path is not None:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    if heatmap_path is not None:
+        analyzer.heatmap.save(heatmap_path)
+        print("Heatmaps saved to:", heatmap_path)
+    print("Live analysis finished!")
+    return report
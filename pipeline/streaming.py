@@ -0,0 +1,222 @@
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import read_video_stream, iter_frame_windows, VideoEncoder, get_video_properties, TrackTable, \
+    save_checkpoint, load_checkpoint, remove_checkpoint, video_signature
+from speed_and_distance_estimator import SpeedAndDistanceEstimator
+from view_trasformer import ViewTransformer
+from camera_movement_estimator import CameraMovementEstimator
+from renderer import FrameRenderer
+from player_ball_assigner import PlayerBallAssigner
+from heatmap import PitchHeatmap, MinimapRenderer
+from track_archive import TrackArchive
+from instrumentation import Instrumentation
+
+
+def run_streaming_analysis(input_video_path, output_video_path, tracker, frame_window=100,
+                           per_frame_homography=False, motion_model='translation', camera_options=None,
+                           camera_workers=None, render_workers=4, draw_camera_movement=False,
+                           output_segment_length=None, cache=None, checkpoint_path=None,
+                           checkpoint_interval=1000, interpolate_ball=False, ball_possession=False,
+                           minimap=False, heatmap_path=None, archive_path=None, instrumentation=None):
+    # Primeira passada: detecção, rastreamento e movimento da câmera.
+    # Apenas frame_window quadros ficam em memória ao mesmo tempo; o restante é descartado após o uso.
+    # Com per_frame_homography, o movimento da câmera vira uma matriz 3x3 por quadro que é combinada
+    # com a transformação de perspectiva, dispensando o passo de ajuste das posições.
+    # Com camera_workers, o movimento da câmera (translação) é estimado em paralelo, por segmentos do vídeo.
+    # Com output_segment_length, a saída é dividida em arquivos com esse número de quadros.
+    # Com um AnalysisCache, trilhas e movimento da câmera já calculados para o mesmo vídeo, modelo e
+    # parâmetros são carregados do cache; se ambos estiverem lá, a primeira passada é pulada.
+    # Com checkpoint_path, o estado da primeira passada (trilhas, ByteTrack e câmera) é salvo a cada
+    # checkpoint_interval quadros, arredondado para o fim da janela; uma execução interrompida retoma do
+    # último checkpoint e produz as mesmas trilhas. O checkpoint é apagado quando a análise termina.
+    # Com interpolate_ball, os quadros sem bola são preenchidos por interpolação antes das demais etapas.
+    # Com ball_possession, cada quadro recebe o jogador com a bola e o vídeo mostra a posse de cada time.
+    # Com minimap, o vídeo mostra as posições no campo vistas de cima; com heatmap_path, os mapas de ocupação
+    # por jogador e por time são gravados nesse .npz (e as imagens de cada time ao lado).
+    # Com archive_path, as trilhas enriquecidas são gravadas nesse diretório como um TrackArchive, para
+    # consultas por trecho da partida ou por jogador sem carregar tudo.
+    # Com um Instrumentation, cada etapa é medida (tempo de parede e de CPU, pico de memória, quadros/s).
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    parallel_camera_movement = bool(camera_workers) and not per_frame_homography
+    print("Starting streaming analysis...")
+    first_frame = next(read_video_stream(input_video_path), None)
+    if first_frame is None:
+        print("No frames read from:", input_video_path)
+        return None
+    # A máscara de pontos característicos depende das dimensões do primeiro quadro
+    camera_movement_estimator = CameraMovementEstimator(first_frame, motion_model=motion_model,
+                                                        **(camera_options or {}))
+
+    tracks = None
+    camera_motion = None
+    if cache is not None:
+        tracking_key = tracker.tracking_cache_key(cache, input_video_path)
+        camera_key = camera_movement_estimator.cache_key(cache, input_video_path,
+                                                         motion_matrices=per_frame_homography)
+        cached_tracks = cache.get(tracking_key)
+        if cached_tracks is not None:
+            print("Object tracking loaded from cache!")
+            tracks = tracker.tracks_from_cache(cached_tracks[0])
+        cached_camera_motion = cache.get(camera_key)
+        if cached_camera_motion is not None:
+            print("Camera movement loaded from cache!")
+            camera_motion = next(iter(cached_camera_motion[0].values()))
+
+    track_builder = tracker.create_track_builder()
+    camera_movement_per_frame = []
+    motion_matrices = []
+    estimate_camera_serially = camera_motion is None and not parallel_camera_movement
+    if tracks is None or estimate_camera_serially:
+        signature = {"stage": "streaming_analysis", "video": video_signature(input_video_path),
+                     "model_path": tracker.model_path, "tracking": tracks is None,
+                     "tracking_params": tracker.tracking_params(),
+                     "camera": estimate_camera_serially, "per_frame_homography": per_frame_homography,
+                     "motion_model": motion_model, "camera_options": camera_options}
+        frames_analyzed = 0
+        checkpoint = load_checkpoint(checkpoint_path, signature)
+        if checkpoint is not None:
+            frames_analyzed = checkpoint["frames_analyzed"]
+            track_builder = checkpoint["track_builder"]
+            tracker.set_tracking_state(checkpoint["tracking_state"])
+            camera_movement_estimator.set_state(checkpoint["camera_state"])
+            camera_movement_per_frame = checkpoint["camera_movement_per_frame"]
+            motion_matrices = checkpoint["motion_matrices"]
+            print(f"Resuming analysis from frame {frames_analyzed}...")
+
+        last_checkpoint = frames_analyzed
+        windows = iter_frame_windows(instrumentation.iterate(
+            "read_video", read_video_stream(input_video_path, start_frame=frames_analyzed)), frame_window)
+        while True:
+            window = next(windows, None)
+            if window is not None:
+                if tracks is None:
+                    tracker.track_frames(window, track_builder, instrumentation)
+                if estimate_camera_serially:
+                    with instrumentation.stage("get_camera_movement", frames=len(window)):
+                        if per_frame_homography:
+                            motion_matrices.append(camera_movement_estimator.estimate_frames_matrices(window))
+                        else:
+                            camera_movement_per_frame += camera_movement_estimator.estimate_frames(window)
+                frames_analyzed += len(window)
+                print(f"Analyzed {frames_analyzed} frames...")
+            # Também salva ao final da passada, para não repeti-la se a renderização for interrompida.
+            if checkpoint_path is not None and (window is None or
+                                                frames_analyzed - last_checkpoint >= checkpoint_interval):
+                save_checkpoint(checkpoint_path, signature, {
+                    "frames_analyzed": frames_analyzed,
+                    "track_builder": track_builder,
+                    "tracking_state": tracker.get_tracking_state(),
+                    "camera_state": camera_movement_estimator.get_state(),
+                    "camera_movement_per_frame": camera_movement_per_frame,
+                    "motion_matrices": motion_matrices,
+                })
+                last_checkpoint = frames_analyzed
+            if window is None:
+                break
+
+    if camera_motion is None and parallel_camera_movement:
+        with instrumentation.stage("get_camera_movement") as stage:
+            camera_movement_per_frame = camera_movement_estimator.get_camera_movement_parallel(
+                input_video_path, num_workers=camera_workers)
+            stage.frames = len(camera_movement_per_frame)
+    if camera_motion is None:
+        camera_motion = np.concatenate(motion_matrices) if per_frame_homography else \
+            np.asarray(camera_movement_per_frame, dtype=np.float64).reshape(-1, 2)
+        if cache is not None:
+            cache.put(camera_key, {"motion_matrices" if per_frame_homography else "camera_movement": camera_motion})
+    if tracks is None:
+        tracks = track_builder.build()
+        tracker.add_team_to_tracks(tracks)
+        if cache is not None:
+            cache.put(tracking_key, tracker.tracking_cache_arrays(tracks))
+    if cache is not None:
+        print("Analysis cache:", cache.stats())
+    if not per_frame_homography:
+        camera_movement_per_frame = camera_motion.tolist()
+    if interpolate_ball:
+        tracks = tracker.interpolate_ball_positions(tracks)
+
+    # As trilhas ficam em formato colunar; os dicionários antigos não são materializados.
+    # O FPS do vídeo de origem é usado tanto na velocidade quanto no vídeo de saída.
+    frame_rate = get_video_properties(input_video_path)["fps"] or 24
+    enrich_tracks(tracks, tracker, camera_movement_estimator, camera_movement_per_frame,
+                  camera_motion if per_frame_homography else None, frame_rate=frame_rate,
+                  instrumentation=instrumentation)
+    possession = assign_ball_possession(tracks, instrumentation) if ball_possession else None
+    if heatmap_path is not None:
+        write_heatmaps(tracks, heatmap_path, instrumentation)
+    if archive_path is not None:
+        write_track_archive(tracks, archive_path, frame_rate, instrumentation)
+
+    # Segunda passada: relê o vídeo e desenha cada quadro à medida que ele é gravado.
+    # O painel da câmera só existe no modo de translação, em que há um movimento [x, y] por quadro.
+    renderer = FrameRenderer(tracks, camera_movement_per_frame=camera_movement_per_frame
+                             if draw_camera_movement and not per_frame_homography else None,
+                             team_colors=tracker.team_colors(), ball_possession=possession,
+                             minimap=MinimapRenderer() if minimap else None)
+    annotated_frames = renderer.render_stream(read_video_stream(input_video_path), num_workers=render_workers,
+                                              window_size=frame_window)
+    print('Saving video to:', output_video_path)
+    with VideoEncoder.from_video(input_video_path, output_video_path,
+                                 segment_length=output_segment_length) as encoder:
+        # A etapa de desenho inclui a segunda leitura do vídeo; a gravação roda na thread do encoder.
+        for frame in instrumentation.iterate("draw_annotations", annotated_frames):
+            with instrumentation.stage("save_video", frames=1):
+                encoder.write(frame)
+    print('Video saved successfully!')
+    remove_checkpoint(checkpoint_path)
+    print("Streaming analysis finished!")
+    return tracks
+
+
+def enrich_tracks(tracks, tracker, camera_movement_estimator, camera_movement_per_frame, motion_matrices=None,
+                  frame_rate=24, instrumentation=None):
+    # Etapas que trabalham apenas sobre as trilhas, sem os quadros: posição, câmera, campo e velocidade.
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    num_frames = tracks.num_frames if isinstance(tracks, TrackTable) else len(tracks["player"])
+    with instrumentation.stage("add_position_to_tracks", frames=num_frames):
+        tracker.add_position_to_tracks(tracks)
+    view_transformer = ViewTransformer()
+    if motion_matrices is not None:
+        with instrumentation.stage("add_transformed_position_to_tracks", frames=num_frames):
+            view_transformer.add_transformed_position_to_tracks(tracks, motion_matrices=motion_matrices)
+    else:
+        with instrumentation.stage("add_adjust_positions_to_tracks", frames=num_frames):
+            camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
+        with instrumentation.stage("add_transformed_position_to_tracks", frames=num_frames):
+            view_transformer.add_transformed_position_to_tracks(tracks)
+
+    speed_estimator = SpeedAndDistanceEstimator(frame_rate=frame_rate)
+    with instrumentation.stage("add_speed_and_distance_to_tracks", frames=num_frames):
+        speed_estimator.add_speed_and_distance_to_tracks(tracks)
+    return speed_estimator
+
+
+def assign_ball_possession(tracks, instrumentation=None):
+    # Posse de bola por quadro e de cada time; precisa da coluna 'position' (e de 'team' para a posse por time).
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    with instrumentation.stage("assign_ball_possession", frames=tracks.num_frames):
+        possession = PlayerBallAssigner().assign_ball_possession(tracks)
+    print("Ball possession:", PlayerBallAssigner.summary(possession))
+    return possession
+
+
+def write_heatmaps(tracks, heatmap_path, instrumentation=None):
+    # Mapas de ocupação do campo por jogador e por time, acumulados janela a janela sobre as trilhas.
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    heatmap = PitchHeatmap()
+    with instrumentation.stage("heatmaps", frames=tracks.num_frames):
+        heatmap.add_tracks(tracks, window=1000)
+        heatmap.save(heatmap_path)
+    print("Heatmaps saved to:", heatmap_path)
+    return heatmap
+
+
+def write_track_archive(tracks, archive_path, frame_rate=24, instrumentation=None):
+    # Trilhas enriquecidas em blocos comprimidos no disco, com índices por quadro e por trilha.
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    with instrumentation.stage("track_archive", frames=tracks.num_frames):
+        archive = TrackArchive.write(archive_path, tracks, metadata={"fps": frame_rate})
+    print("Track archive saved to:", archive_path)
+    return archive
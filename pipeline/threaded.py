@@ -0,0 +1,259 @@
+import json
+import queue
+import threading
+import time
+import sys
+sys.path.append('../')
+from utils import read_video_stream, iter_frame_windows, VideoEncoder, get_video_properties
+from camera_movement_estimator import CameraMovementEstimator
+from renderer import FrameRenderer
+from pipeline.streaming import enrich_tracks, assign_ball_possession, write_heatmaps, write_track_archive
+from heatmap import MinimapRenderer
+from instrumentation import Instrumentation
+
+# Marca o fim do fluxo de itens entre duas etapas.
+_END_OF_STREAM = object()
+
+
+class PipelineStage():
+    def __init__(self, name, function):
+        # function recebe um iterador com as saídas da etapa anterior e retorna um iterador com as suas.
+        # A primeira etapa é chamada sem argumentos; a última deve produzir um item (ex.: None) por item
+        # consumido, apenas para a contagem de vazão.
+        self.name = name
+        self.function = function
+        self.items = 0
+        self.wall_seconds = 0.0
+        self.waiting_input_seconds = 0.0
+        self.blocked_output_seconds = 0.0
+
+    def report(self):
+        busy_seconds = max(self.wall_seconds - self.waiting_input_seconds - self.blocked_output_seconds, 0.0)
+        return {
+            "items": self.items,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "busy_seconds": round(busy_seconds, 4),
+            "waiting_input_seconds": round(self.waiting_input_seconds, 4),
+            "blocked_output_seconds": round(self.blocked_output_seconds, 4),
+            "items_per_second": round(self.items / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "busy_items_per_second": round(self.items / busy_seconds, 2) if busy_seconds else 0.0,
+        }
+
+
+class ThreadedPipeline():
+    # Executa cada etapa em sua própria thread, ligadas por filas limitadas.
+    # Quando uma fila enche, a etapa anterior bloqueia (backpressure) em vez de acumular itens em memória.
+    def __init__(self, queue_size=8, sample_interval=0.05):
+        self.queue_size = queue_size
+        self.sample_interval = sample_interval
+        self.stages = []
+        self.queues = []
+        self.queue_samples = []
+        self._stop = threading.Event()
+        self._errors = []
+
+    def add_stage(self, name, function):
+        self.stages.append(PipelineStage(name, function))
+        return self
+
+    def _get(self, stage, input_queue):
+        while True:
+            started = time.perf_counter()
+            try:
+                item = input_queue.get(timeout=0.1)
+            except queue.Empty:
+                stage.waiting_input_seconds += time.perf_counter() - started
+                if self._stop.is_set():
+                    return _END_OF_STREAM
+                continue
+            stage.waiting_input_seconds += time.perf_counter() - started
+            return item
+
+    def _put(self, stage, output_queue, item):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                output_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+            finally:
+                stage.blocked_output_seconds += time.perf_counter() - started
+        return False
+
+    def _input_iterator(self, stage, input_queue):
+        while True:
+            item = self._get(stage, input_queue)
+            if item is _END_OF_STREAM:
+                return
+            yield item
+
+    def _run_stage(self, stage, input_queue, output_queue):
+        started = time.perf_counter()
+        try:
+            outputs = stage.function() if input_queue is None else stage.function(
+                self._input_iterator(stage, input_queue))
+            for item in outputs:
+                if output_queue is not None and not self._put(stage, output_queue, item):
+                    break
+                stage.items += 1
+        except Exception as error:
+            self._errors.append((stage.name, error))
+            self._stop.set()
+        finally:
+            if output_queue is not None:
+                self._put(stage, output_queue, _END_OF_STREAM)
+            stage.wall_seconds = time.perf_counter() - started
+
+    def _sample_queues(self):
+        # Registra periodicamente a ocupação de cada fila.
+        while not self._stop.is_set():
+            self.queue_samples.append([q.qsize() for q in self.queues])
+            time.sleep(self.sample_interval)
+
+    def run(self):
+        self.queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages[1:]]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            input_queue = self.queues[index - 1] if index > 0 else None
+            output_queue = self.queues[index] if index < len(self.queues) else None
+            threads.append(threading.Thread(target=self._run_stage, args=(stage, input_queue, output_queue),
+                                            name=f"pipeline-{stage.name}", daemon=True))
+
+        sampler = threading.Thread(target=self._sample_queues, daemon=True)
+        started = time.perf_counter()
+        sampler.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - started
+        self._stop.set()
+        sampler.join()
+
+        if self._errors:
+            stage_name, error = self._errors[0]
+            raise RuntimeError(f"Pipeline stage '{stage_name}' failed") from error
+        return self.report()
+
+    def report(self):
+        stages = {stage.name: stage.report() for stage in self.stages}
+        queues = {}
+        for index, _ in enumerate(self.queues):
+            samples = [sample[index] for sample in self.queue_samples]
+            name = f"{self.stages[index].name}->{self.stages[index + 1].name}"
+            queues[name] = {
+                "capacity": self.queue_size,
+                "mean_occupancy": round(sum(samples) / len(samples), 2) if samples else 0.0,
+                "max_occupancy": max(samples) if samples else 0,
+                "full_fraction": round(sum(s >= self.queue_size for s in samples) / len(samples), 3)
+                if samples else 0.0,
+            }
+        return {"wall_seconds": round(self.wall_seconds, 4), "stages": stages, "queues": queues}
+
+
+def print_pipeline_report(title, report):
+    print(f"{title}: {report['wall_seconds']:.2f} s")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<10} {stage['items']} items, {stage['items_per_second']:.1f} items/s "
+              f"(busy {stage['busy_seconds']:.2f} s, waiting {stage['waiting_input_seconds']:.2f} s, "
+              f"blocked {stage['blocked_output_seconds']:.2f} s)")
+    for name, occupancy in report["queues"].items():
+        print(f"  queue {name:<18} mean {occupancy['mean_occupancy']:.1f}/{occupancy['capacity']}, "
+              f"max {occupancy['max_occupancy']}, full {occupancy['full_fraction'] * 100:.0f}% of the time")
+
+
+def run_threaded_analysis(input_video_path, output_video_path, tracker, queue_size=8, batch_size=None,
+                          camera_options=None, report_path=None, render_workers=4, draw_camera_movement=False,
+                          output_segment_length=None, interpolate_ball=False, ball_possession=False,
+                          minimap=False, heatmap_path=None, archive_path=None, instrumentation=None):
+    # Análise em duas passadas, cada uma com etapas simultâneas ligadas por filas limitadas:
+    # 1) decode -> detect (YOLO) -> track (ByteTrack) -> camera
+    # 2) decode -> render -> encode (cv2.VideoWriter)
+    # A renderização depende das trilhas completas (velocidade usa quadros futuros), daí as duas passadas.
+    # Com um Instrumentation, cada passada é medida como uma etapa (as etapas internas rodam em paralelo e
+    # aparecem no relatório próprio do pipeline), assim como as etapas sobre as trilhas.
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    print("Starting threaded analysis...")
+    # Sem batch_size, usa o lote do Tracker (que, com um InferenceBackend, é escolhido pela latência medida).
+    batch_size = batch_size or tracker.batch_size
+    track_builder = tracker.create_track_builder()
+    camera_movement_per_frame = []
+    state = {"camera_movement_estimator": None}
+
+    def decode():
+        return read_video_stream(input_video_path)
+
+    def detect(frames):
+        # Com o modo de quadros-chave do Tracker, apenas parte dos quadros passa pelo modelo.
+        for frames_batch in iter_frame_windows(frames, batch_size):
+            for frame, detection in zip(frames_batch, tracker.iter_supervision_detections(frames_batch)):
+                yield frame, detection
+
+    def track(items):
+        for frame, (detection, class_name) in items:
+            tracker.add_supervision_detection_to_tracks(detection, class_name, track_builder, frame)
+            yield frame
+
+    def camera(frames):
+        for frame in frames:
+            if state["camera_movement_estimator"] is None:
+                state["camera_movement_estimator"] = CameraMovementEstimator(frame, **(camera_options or {}))
+            camera_movement_per_frame.append(state["camera_movement_estimator"].estimate_frame_movement(frame))
+            yield None
+
+    analysis = ThreadedPipeline(queue_size=queue_size)
+    analysis.add_stage("decode", decode).add_stage("detect", detect).add_stage("track", track)
+    analysis.add_stage("camera", camera)
+    with instrumentation.stage("analysis_pipeline") as stage:
+        analysis_report = analysis.run()
+        stage.frames = track_builder.num_frames
+    print_pipeline_report("Analysis pipeline", analysis_report)
+
+    if state["camera_movement_estimator"] is None:
+        print("No frames read from:", input_video_path)
+        return None, {"analysis": analysis_report}
+
+    tracks = track_builder.build()
+    tracker.add_team_to_tracks(tracks)
+    if interpolate_ball:
+        tracks = tracker.interpolate_ball_positions(tracks)
+    frame_rate = get_video_properties(input_video_path)["fps"] or 24
+    enrich_tracks(tracks, tracker, state["camera_movement_estimator"], camera_movement_per_frame,
+                  frame_rate=frame_rate, instrumentation=instrumentation)
+    possession = assign_ball_possession(tracks, instrumentation) if ball_possession else None
+    if heatmap_path is not None:
+        write_heatmaps(tracks, heatmap_path, instrumentation)
+    if archive_path is not None:
+        write_track_archive(tracks, archive_path, frame_rate, instrumentation)
+    renderer = FrameRenderer(tracks, camera_movement_per_frame=camera_movement_per_frame
+                             if draw_camera_movement else None, team_colors=tracker.team_colors(),
+                             ball_possession=possession, minimap=MinimapRenderer() if minimap else None)
+
+    # A etapa encode já roda em sua própria thread, então o encoder grava de forma síncrona.
+    encoder = VideoEncoder.from_video(input_video_path, output_video_path, background=False,
+                                      segment_length=output_segment_length)
+
+    def render(frames):
+        return renderer.render_stream(frames, num_workers=render_workers, window_size=batch_size)
+
+    def encode(frames):
+        for frame in frames:
+            encoder.write(frame)
+            yield None
+
+    rendering = ThreadedPipeline(queue_size=queue_size)
+    rendering.add_stage("decode", decode).add_stage("render", render).add_stage("encode", encode)
+    with instrumentation.stage("rendering_pipeline", frames=tracks.num_frames):
+        try:
+            rendering_report = rendering.run()
+        finally:
+            encoder.close()
+    print_pipeline_report("Rendering pipeline", rendering_report)
+
+    report = {"analysis": analysis_report, "rendering": rendering_report}
+    if report_path is not None:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print("Threaded analysis finished!")
+    return tracks, report
@@ -0,0 +1 @@
+from .player_ball_assigner import PlayerBallAssigner
\ No newline at end of file
@@ -0,0 +1,132 @@
+import sys
+import numpy as np
+sys.path.append('../')
+from utils import TrackTable
+
+
+class PlayerBallAssigner():
+    # Posse de bola por quadro: o jogador cujos pés (coluna 'position') estão mais perto do centro da bola,
+    # desde que a menos de max_player_ball_distance pixels. A busca é feita para a partida inteira de uma vez:
+    # cada linha de jogador é comparada só com a bola do seu quadro (cerca de 20 candidatos por quadro), e o
+    # mais próximo de cada quadro sai de uma única ordenação por (quadro, distância), sem laços em Python.
+    # Suavização: posses mais curtas que min_possession_frames quadros (a bola passando perto de um jogador
+    # durante um passe, ou trocas de um quadro entre dois jogadores próximos) são descartadas, e os quadros sem
+    # dono (bola em disputa ou no ar) ficam com o último jogador que teve a posse.
+    # O padrão de 70 pixels é um valor novo, escolhido aqui para vídeos 1920x1080; não vem de uma versão
+    # anterior do projeto.
+    def __init__(self, max_player_ball_distance=70, min_possession_frames=3):
+        self.max_player_ball_distance = max_player_ball_distance
+        self.min_possession_frames = min_possession_frames
+
+    def nearest_players(self, tracks):
+        # Linha do jogador mais próximo da bola em cada quadro (-1 quando não há bola ou ninguém a alcança).
+        num_frames = tracks.num_frames
+        if tracks.has_column('position'):
+            position = tracks.get_column('position')
+        else:
+            # Mesmas posições de Tracker.add_position_to_tracks: pés dos jogadores e centro da bola.
+            bbox = tracks.bbox
+            position = np.stack([(bbox[:, 0] + bbox[:, 2]) / 2, bbox[:, 3]], axis=1)
+            is_ball = tracks.object_mask('ball')
+            position[is_ball, 1] = (bbox[is_ball, 1] + bbox[is_ball, 3]) / 2
+
+        # Posição da bola por quadro (a primeira detecção, se houver mais de uma).
+        ball_rows = np.flatnonzero(tracks.object_mask('ball'))
+        ball_rows = ball_rows[~np.isnan(position[ball_rows]).any(axis=1)]
+        ball_frames, first = np.unique(tracks.frame[ball_rows], return_index=True)
+        ball_position = np.full((num_frames, 2), np.nan, dtype=np.float32)
+        ball_position[ball_frames] = position[ball_rows[first]]
+
+        # Distância ao quadrado de cada linha até a bola do seu quadro, coordenada a coordenada (evita copiar as
+        # posições de todas as linhas). Comparações com NaN são falsas: quadros sem bola não têm candidatos.
+        ball_position = ball_position[tracks.frame]
+        squared_distance = np.square(position[:, 0] - ball_position[:, 0])
+        squared_distance += np.square(position[:, 1] - ball_position[:, 1])
+        within = tracks.object_mask('player') & (squared_distance <= self.max_player_ball_distance ** 2)
+        player_rows = np.flatnonzero(within)
+        player_frames, distance = tracks.frame[player_rows], squared_distance[player_rows]
+
+        order = np.lexsort((distance, player_frames))
+        frames, first = np.unique(player_frames[order], return_index=True)
+        nearest = np.full(num_frames, -1, dtype=np.int64)
+        nearest[frames] = player_rows[order[first]]
+        return nearest
+
+    def smooth(self, holder):
+        # holder: identificador do dono por quadro (-1 sem dono). Retorna (suavizado, aceito), em que aceito
+        # marca os quadros em que o dono suavizado de fato estava com a bola (e não só herdou a posse).
+        holder = np.asarray(holder, dtype=np.int64)
+        if not len(holder):
+            return holder.copy(), np.zeros(0, dtype=bool)
+        run_start = np.flatnonzero(np.r_[True, holder[1:] != holder[:-1]])
+        run_length = np.diff(np.r_[run_start, len(holder)])
+        run_holder = holder[run_start]
+        # Um novo dono precisa de min_possession_frames quadros seguidos; trechos curtos só contam quando são
+        # do dono atual (o último trecho longo), que volta a tocar na bola depois de uma interferência.
+        long_run = (run_holder >= 0) & (run_length >= self.min_possession_frames)
+        last_long = np.maximum.accumulate(np.where(long_run, np.arange(len(run_start)), -1))
+        current_holder = np.where(last_long >= 0, run_holder[np.maximum(last_long, 0)], -1)
+        accepted_run = long_run | ((run_holder >= 0) & (run_holder == current_holder))
+        accepted = np.repeat(accepted_run, run_length)
+
+        # Propaga para a frente o último quadro com posse aceita.
+        last = np.maximum.accumulate(np.where(accepted, np.arange(len(holder)), -1))
+        smoothed = np.where(last >= 0, holder[np.maximum(last, 0)], -1)
+        return smoothed, accepted
+
+    def assign_ball_possession(self, tracks):
+        # Retorna, por quadro, o track_id do jogador com a posse ('player', -1 antes da primeira posse), o time
+        # da posse ('team') e a fração acumulada de posse de cada time ('team_possession').
+        print("Assigning ball possession...")
+        if isinstance(tracks, TrackTable):
+            possession = self._assign_ball_possession_to_table(tracks)
+        else:
+            possession = self._assign_ball_possession_to_dict(tracks)
+        print("Ball possession assigned!")
+        return possession
+
+    def _assign_ball_possession_to_table(self, tracks):
+        nearest = self.nearest_players(tracks)
+        # O track_id identifica o jogador entre quadros; a linha não.
+        holder = np.full(len(nearest), -1, dtype=np.int64)
+        holder[nearest >= 0] = tracks.track_id[nearest[nearest >= 0]]
+        player, accepted = self.smooth(holder)
+
+        # Coluna 'has_ball': 1 na linha de quem está com a bola nos quadros de posse aceita.
+        has_ball = tracks.ensure_column('has_ball')
+        has_ball[:] = np.nan
+        has_ball[nearest[accepted]] = 1
+
+        # Time da posse em cada quadro, herdado junto com o jogador nos quadros sem dono.
+        team = np.full(len(player), np.nan, dtype=np.float32)
+        if tracks.has_column('team'):
+            team[accepted] = tracks.get_column('team')[nearest[accepted]]
+            last = np.maximum.accumulate(np.where(accepted, np.arange(len(player)), -1))
+            team = np.where(last >= 0, team[np.maximum(last, 0)], np.nan).astype(np.float32)
+        return {"player": player, "team": team, "team_possession": self.team_possession(team)}
+
+    @staticmethod
+    def team_possession(team):
+        # Fração acumulada de posse de cada time até cada quadro, (num_frames, 2), contando apenas os quadros
+        # com time conhecido (NaN enquanto nenhum time teve a bola).
+        counts = np.cumsum(np.stack([team == 1, team == 2], axis=1), axis=0, dtype=np.float64)
+        total = counts.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (counts / total).astype(np.float32)
+
+    @staticmethod
+    def summary(possession):
+        # Posse da partida inteira: percentual de cada time e quadros com dono.
+        team_possession = possession["team_possession"]
+        final = team_possession[-1] if len(team_possession) else np.full(2, np.nan)
+        return {"team_1": None if np.isnan(final[0]) else round(100 * float(final[0]), 2),
+                "team_2": None if np.isnan(final[1]) else round(100 * float(final[1]), 2),
+                "frames_with_holder": int(np.count_nonzero(possession["player"] >= 0))}
+
+    def _assign_ball_possession_to_dict(self, tracks):
+        # Calcula sobre a tabela colunar e marca has_ball de volta nos dicionários.
+        table = TrackTable.from_dict(tracks)
+        possession = self._assign_ball_possession_to_table(table)
+        for row in np.flatnonzero(table.get_column('has_ball') == 1):
+            tracks['player'][table.frame[row]][int(table.track_id[row])]['has_ball'] = True
+        return possession
@@ -0,0 +1 @@
+from .frame_renderer import FrameRenderer, draw_ellipse, TEAM_COLORS
\ No newline at end of file
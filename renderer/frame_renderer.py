@@ -0,0 +1,186 @@
+import sys
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('../')
+from utils import get_center_of_bbox, get_bbox_width, get_foot_position, iter_frame_windows, TrackTable
+
+# Cor da elipse de cada classe de objeto, na ordem de OBJECT_CLASSES (player, referees, ball).
+OBJECT_COLORS = ((0, 0, 255), (0, 255, 0), (255, 0, 0))
+# Cores padrão das elipses dos jogadores por time (coluna 'team'), quando as cores das camisas não são conhecidas.
+TEAM_COLORS = {1: (0, 0, 255), 2: (255, 255, 0)}
+
+
+def draw_ellipse(frame, bbox, color):
+    # Coordenada y do canto inferior do retângulo delimitador (bbox)
+    y2 = int(bbox[3])
+    # Obtém o centro x do bbox e ignora a coordenada y retornada
+    x_center, _ = get_center_of_bbox(bbox)
+    # Calcula a largura do bbox
+    width = get_bbox_width(bbox)
+
+    # Desenha uma elipse na imagem de entrada
+    cv2.ellipse(frame,
+                center=(x_center, y2),  # Define o centro da elipse
+                axes=(int(width), int(0.35 * width)),  # Define os eixos maior e menor da elipse
+                angle=0.0,  # Sem rotação
+                startAngle=-45,  # Ângulo inicial para desenhar a elipse
+                endAngle=235,  # Ângulo final para desenhar a elipse
+                color=color,  # Cor da elipse
+                thickness=2,  # Espessura da linha
+                lineType=cv2.LINE_4  # Tipo de linha
+                )
+    return frame
+
+
+def draw_triangle(frame, bbox, color):
+    # Triângulo preenchido, com contorno preto, apontando para o topo da caixa
+    y = int(bbox[1])
+    x, _ = get_center_of_bbox(bbox)
+    triangle_points = np.array([[x, y], [x - 10, y - 20], [x + 10, y - 20]])
+    cv2.drawContours(frame, [triangle_points], 0, color, cv2.FILLED)
+    cv2.drawContours(frame, [triangle_points], 0, (0, 0, 0), 2)
+    return frame
+
+
+class FrameRenderer():
+    # Compõe todas as camadas (elipses, velocidade/distância e painel da câmera) em uma única passada
+    # por quadro, desenhando diretamente sobre o quadro recebido, sem cópias.
+    # tracks pode ser None quando as linhas de cada quadro são passadas direto para draw_rows (modo ao vivo).
+    # Quando as trilhas têm a coluna 'team', a elipse de cada jogador usa a cor do seu time (team_colors).
+    # Com a coluna 'has_ball', quem está com a bola ganha um triângulo; com ball_possession (o resultado de
+    # PlayerBallAssigner.assign_ball_possession), um painel mostra a posse acumulada de cada time.
+    # Com um MinimapRenderer (heatmap) e a coluna 'position_transformed', desenha o minimapa do campo.
+    def __init__(self, tracks, camera_movement_per_frame=None, draw_speed_and_distance=True, team_colors=None,
+                 ball_possession=None, minimap=None):
+        if tracks is not None and not isinstance(tracks, TrackTable):
+            tracks = TrackTable.from_dict(tracks)
+        self.tracks = tracks
+        self.camera_movement_per_frame = camera_movement_per_frame
+        self.draw_speed_and_distance = draw_speed_and_distance
+        self.team_colors = team_colors or TEAM_COLORS
+        self.ball_possession = ball_possession
+        self.minimap = minimap
+        self.panel_alpha = 0.6
+        # Fundo branco do painel da câmera, alocado uma única vez e reutilizado em todos os quadros.
+        self._panel_background = np.full((101, 501, 3), 255, dtype=np.uint8)
+        # Mesmo fundo para o painel de posse, no canto inferior direito.
+        self._possession_background = np.full((121, 461, 3), 255, dtype=np.uint8)
+
+    def render_frame(self, frame, frame_num):
+        tracks = self.tracks
+        frame_slice = tracks.frame_slice(frame_num)
+        speed = distance = team = has_ball = None
+        if tracks.has_column('speed') and tracks.has_column('distance'):
+            speed = tracks.get_column('speed')[frame_slice]
+            distance = tracks.get_column('distance')[frame_slice]
+        if tracks.has_column('team'):
+            team = tracks.get_column('team')[frame_slice]
+        if tracks.has_column('has_ball'):
+            has_ball = tracks.get_column('has_ball')[frame_slice]
+        camera_movement = None if self.camera_movement_per_frame is None else \
+            self.camera_movement_per_frame[frame_num]
+        self.draw_rows(frame, tracks.bbox[frame_slice], tracks.object_class[frame_slice], speed, distance, team,
+                       has_ball, camera_movement)
+
+        if self.ball_possession is not None:
+            self.draw_possession_panel(frame, self.ball_possession["team_possession"][frame_num])
+        if self.minimap is not None and tracks.has_column('position_transformed'):
+            self.draw_minimap(frame, tracks.get_column('position_transformed')[frame_slice],
+                              tracks.object_class[frame_slice], team)
+        return frame
+
+    def draw_rows(self, frame, bboxes, object_classes, speed=None, distance=None, team=None, has_ball=None,
+                  camera_movement=None):
+        # Camada 1: elipses, na mesma ordem de antes (jogadores, árbitros e por último a bola).
+        for object_class, color in enumerate(OBJECT_COLORS):
+            rows = object_classes == object_class
+            if object_class == 0 and team is not None:
+                # Jogadores sem time (NaN) mantêm a cor padrão.
+                for bbox, player_team in zip(bboxes[rows], team[rows]):
+                    draw_ellipse(frame, bbox, color if np.isnan(player_team) else
+                                 self.team_colors.get(int(player_team), color))
+                continue
+            for bbox in bboxes[rows]:
+                draw_ellipse(frame, bbox, color)
+        if has_ball is not None:
+            for bbox in bboxes[has_ball == 1]:
+                draw_triangle(frame, bbox, (0, 0, 255))
+
+        # Camada 2: painel semitransparente com o movimento da câmera, entre as elipses e os textos como no
+        # fluxo original (draw_annotations, draw_camera_movement e draw_speed_and_distance).
+        if camera_movement is not None:
+            self.draw_camera_panel(frame, camera_movement)
+
+        # Camada 3: velocidade e distância dos jogadores.
+        if self.draw_speed_and_distance and speed is not None and distance is not None:
+            labeled = (object_classes == 0) & ~np.isnan(speed) & ~np.isnan(distance)
+            for bbox, player_speed, player_distance in zip(bboxes[labeled], speed[labeled], distance[labeled]):
+                x, y = get_foot_position(bbox)
+                # Desloca o texto para baixo para não sobrepor o jogador.
+                position = (int(x), int(y) + 40)
+                cv2.putText(frame, f"{player_speed:.2f} km/h", position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+                cv2.putText(frame, f"{player_distance:.2f} m", (position[0], position[1] + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+        return frame
+
+    def draw_camera_panel(self, frame, camera_movement):
+        # Mistura apenas a região do painel, em vez de copiar o quadro inteiro para o overlay.
+        panel = frame[:self._panel_background.shape[0], :self._panel_background.shape[1]]
+        background = self._panel_background[:panel.shape[0], :panel.shape[1]]
+        cv2.addWeighted(background, self.panel_alpha, panel, 1 - self.panel_alpha, 0, panel)
+
+        x_movement, y_movement = camera_movement
+        cv2.putText(frame, f"Camera Movimento X: {x_movement:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                    (0, 0, 0), 3)
+        cv2.putText(frame, f"Camera Movimento Y: {y_movement:.2f}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1,
+                    (0, 0, 0), 3)
+
+    def draw_minimap(self, frame, position_transformed, object_classes, team=None):
+        return self.minimap.draw(frame, position_transformed, object_classes, team, self.team_colors)
+
+    def draw_possession_panel(self, frame, team_possession):
+        # Posse acumulada de cada time até o quadro atual (nada é desenhado antes da primeira posse).
+        if np.isnan(team_possession).any():
+            return
+        height, width = self._possession_background.shape[:2]
+        top, left = max(frame.shape[0] - height - 20, 0), max(frame.shape[1] - width - 20, 0)
+        panel = frame[top:top + height, left:left + width]
+        background = self._possession_background[:panel.shape[0], :panel.shape[1]]
+        cv2.addWeighted(background, self.panel_alpha, panel, 1 - self.panel_alpha, 0, panel)
+
+        cv2.putText(frame, f"Posse de bola Time 1: {100 * team_possession[0]:.2f}%", (left + 10, top + 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+        cv2.putText(frame, f"Posse de bola Time 2: {100 * team_possession[1]:.2f}%", (left + 10, top + 100),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 3)
+
+    def _render_range(self, frames, first_frame_num):
+        for offset, frame in enumerate(frames):
+            self.render_frame(frame, first_frame_num + offset)
+
+    def _render_window(self, executor, frames, first_frame_num, num_workers):
+        # Divide a janela em intervalos contíguos e disjuntos, um por worker.
+        range_size = max(1, -(-len(frames) // num_workers))
+        futures = [executor.submit(self._render_range, frames[start:start + range_size], first_frame_num + start)
+                   for start in range(0, len(frames), range_size)]
+        for future in futures:
+            future.result()
+
+    def render_frames(self, frames, num_workers=4):
+        # Desenha uma lista de quadros (in place) e a retorna.
+        print("Rendering frames...")
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            self._render_window(executor, frames, 0, num_workers)
+        print("Frames rendered!")
+        return frames
+
+    def render_stream(self, frames, num_workers=4, window_size=64):
+        # Desenha um fluxo de quadros janela a janela, preservando a ordem; as threads do OpenCV
+        # liberam o GIL durante o desenho, então os intervalos de cada janela avançam em paralelo.
+        frame_num = 0
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for window in iter_frame_windows(frames, window_size):
+                self._render_window(executor, window, frame_num, num_workers)
+                frame_num += len(window)
+                for frame in window:
+                    yield frame
@@ -1 +1 @@
-from .speed_and_distance_estimator import SpeedAndDistanceEstimator
\ No newline at end of file
+from .speed_and_distance_estimator import SpeedAndDistanceEstimator, LiveSpeedAndDistanceEstimator
\ No newline at end of file
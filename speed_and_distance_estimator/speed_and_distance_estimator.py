@@ -1,15 +1,37 @@
 import sys
+from collections import deque
 import cv2
+import numpy as np
 sys.path.append("../")
-from utils import measure_distance, get_foot_position
+from utils import measure_distance, get_foot_position, TrackTable, OBJECT_CLASSES
 
 class SpeedAndDistanceEstimator():
-    def __init__(self):
-        self.frame_window = 5
-        self.frame_rate = 24
+    def __init__(self, frame_rate=24, method='rolling', frame_window=5, smoothing_window=5, max_gap_frames=12):
+        # 'rolling': velocidade média em uma janela deslizante de frame_window quadros centrada em cada quadro,
+        # sobre posições suavizadas por uma média móvel de smoothing_window amostras.
+        # 'blocks': método original, com janelas fixas e não sobrepostas de frame_window quadros.
+        self.method = method
+        self.frame_window = frame_window
+        self.smoothing_window = smoothing_window
+        # Lacunas (quadros sem posição transformada) maiores que max_gap_frames quebram a série da trilha:
+        # a distância não é contada através delas e a janela de velocidade não as atravessa.
+        self.max_gap_frames = max_gap_frames
+        # Deve ser o FPS real do vídeo de origem (ver utils.get_video_properties)
+        self.frame_rate = frame_rate
 
     def add_speed_and_distance_to_tracks(self, tracks):
         print("Adding speed and distance to tracks...")
+        if isinstance(tracks, TrackTable):
+            if self.method == 'rolling':
+                self._add_rolling_speed_and_distance_to_table(tracks)
+            else:
+                self._add_speed_and_distance_to_table(tracks)
+            print("Speed and distance added to tracks!")
+            return
+        if self.method == 'rolling':
+            self._add_rolling_speed_and_distance_to_dict(tracks)
+            print("Speed and distance added to tracks!")
+            return
         # Dicionário para armazenar a distância total percorrida por cada objeto e trilha.
         total_distance = {}
 
@@ -63,49 +85,226 @@ class SpeedAndDistanceEstimator():
                         tracks[object][frame_num_batch][track_id]['distance'] = total_distance[object][track_id]
         print("Speed and distance added to tracks!")
 
+    def _add_speed_and_distance_to_table(self, tracks):
+        speed = tracks.ensure_column('speed')
+        distance = tracks.ensure_column('distance')
+        position_transformed = tracks.get_column('position_transformed')
+        number_of_frames = tracks.num_frames
+        # Janelas não sobrepostas: início em frame_num e fim em last_frame, como no formato de dicionários.
+        window_start = np.arange(0, number_of_frames, self.frame_window)
+        window_end = np.minimum(window_start + self.frame_window, number_of_frames - 1)
+
+        for _, _, rows in tracks.iter_tracks('player'):
+            track_frames = tracks.frame[rows]
+            # Localiza a linha da trilha no quadro inicial e no quadro final de cada janela.
+            start_index = np.minimum(np.searchsorted(track_frames, window_start), len(rows) - 1)
+            end_index = np.minimum(np.searchsorted(track_frames, window_end), len(rows) - 1)
+            start_position = position_transformed[rows[start_index]]
+            end_position = position_transformed[rows[end_index]]
+            time_elapsed = (window_end - window_start) / self.frame_rate
+
+            valid = ((track_frames[start_index] == window_start) & (track_frames[end_index] == window_end) &
+                     ~np.isnan(start_position[:, 0]) & ~np.isnan(end_position[:, 0]) & (time_elapsed > 0))
+            distance_covered = np.where(valid, np.linalg.norm(end_position - start_position, axis=1), 0)
+            speed_km_per_hour = distance_covered / np.where(valid, time_elapsed, 1) * 3.6
+            total_distance = np.cumsum(distance_covered)
+
+            # Cada linha recebe os valores da janela a que pertence, exceto o último quadro da janela.
+            window = track_frames // self.frame_window
+            in_window = valid[window] & (track_frames < window_end[window])
+            speed[rows[in_window]] = speed_km_per_hour[window[in_window]]
+            distance[rows[in_window]] = total_distance[window[in_window]]
+
+    def _add_rolling_speed_and_distance_to_table(self, tracks):
+        speed = tracks.ensure_column('speed')
+        distance = tracks.ensure_column('distance')
+        speed[:] = np.nan
+        distance[:] = np.nan
+
+        # Séries de todas as trilhas de jogadores de uma vez: linhas ordenadas por (trilha, quadro),
+        # mantendo só as amostras com posição transformada.
+        index = tracks.track_index
+        order, offsets = index["order"], index["offsets"]
+        track_of_row = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        is_player = index["object_class"][track_of_row] == OBJECT_CLASSES.index('player')
+        position = tracks.get_column('position_transformed')[order].astype(np.float64)
+        keep = is_player & ~np.isnan(position).any(axis=1)
+        rows, track, position = order[keep], track_of_row[keep], position[keep]
+        if not len(rows):
+            return
+        frame = tracks.frame[rows].astype(np.int64)
+
+        # Segmentos: trechos de uma trilha sem lacunas maiores que max_gap_frames. Cada segmento é expandido
+        # para uma grade densa com um ponto por quadro, e as lacunas menores são interpoladas linearmente.
+        new_track = np.r_[True, track[1:] != track[:-1]]
+        segment_start = new_track | np.r_[True, np.diff(frame) > self.max_gap_frames]
+        segment = np.cumsum(segment_start) - 1
+        starts = np.flatnonzero(segment_start)
+        ends = np.r_[starts[1:], len(rows)] - 1
+        segment_length = frame[ends] - frame[starts] + 1
+        dense_offsets = np.r_[0, np.cumsum(segment_length)]
+        sample_slot = dense_offsets[segment] + frame - frame[starts][segment]
+        slots = np.arange(dense_offsets[-1])
+        dense_position = np.stack([np.interp(slots, sample_slot, position[:, 0]),
+                                   np.interp(slots, sample_slot, position[:, 1])], axis=1)
+        dense_segment = np.repeat(np.arange(len(starts)), segment_length)
+        first, last = dense_offsets[dense_segment], dense_offsets[dense_segment + 1] - 1
+
+        # Média móvel centrada das posições; nas bordas do segmento a janela encolhe dos dois lados,
+        # para que um movimento uniforme continue uniforme.
+        half = np.minimum(self.smoothing_window // 2, np.minimum(slots - first, last - slots))
+        cumulative_position = np.vstack([np.zeros((1, 2)), np.cumsum(dense_position, axis=0)])
+        smoothed = (cumulative_position[slots + half + 1] - cumulative_position[slots - half]) / \
+            (2 * half + 1)[:, None]
+
+        # Distância entre quadros consecutivos do mesmo segmento (nada é contado através das lacunas grandes)
+        # e distância acumulada desde o início de cada trilha.
+        step = np.r_[0.0, np.linalg.norm(np.diff(smoothed, axis=0), axis=1)]
+        step[first == slots] = 0
+        cumulative_distance = np.cumsum(step)
+        track_first_slot = dense_offsets[segment[new_track]][np.cumsum(new_track) - 1]
+        total_distance = cumulative_distance[sample_slot] - cumulative_distance[track_first_slot]
+
+        # Velocidade: distância percorrida na janela de frame_window quadros centrada em cada amostra
+        # (cortada nos limites do segmento) dividida pelo tempo da janela.
+        half = self.frame_window // 2
+        low = np.maximum(sample_slot - half, first[sample_slot])
+        high = np.minimum(sample_slot + half, last[sample_slot])
+        time_elapsed = (high - low) / self.frame_rate
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed_km_per_hour = np.where(time_elapsed > 0, (cumulative_distance[high] - cumulative_distance[low]) /
+                                         time_elapsed * 3.6, np.nan)
+
+        # Segmentos com um único quadro não têm velocidade nem entram na distância exibida.
+        measured = ~np.isnan(speed_km_per_hour)
+        speed[rows[measured]] = speed_km_per_hour[measured]
+        distance[rows[measured]] = total_distance[measured]
+
+    def _add_rolling_speed_and_distance_to_dict(self, tracks):
+        # Calcula sobre a tabela colunar e copia os resultados de volta para os dicionários.
+        table = TrackTable.from_dict(tracks)
+        self._add_rolling_speed_and_distance_to_table(table)
+        speed, distance = table.get_column('speed'), table.get_column('distance')
+        for row in np.flatnonzero(table.object_mask('player') & ~np.isnan(speed)):
+            track_info = tracks['player'][table.frame[row]][int(table.track_id[row])]
+            track_info['speed'] = float(speed[row])
+            track_info['distance'] = float(distance[row])
+
     def draw_speed_and_distance(self, frames, tracks):
         print("Drawing speed and distance...")
         # Lista para armazenar os quadros com os desenhos de velocidade e distância.
         output_frames = []
         # Itera sobre cada quadro e o respectivo número do quadro.
         for frame_num, frame in enumerate(frames):
-            # Itera sobre cada objeto e suas trilhas nos dados de rastreamento.
-            for object, object_tracks in tracks.items():
-                # Ignora objetos que não devem ser exibidos (ex: "ball" ou "referees").
-                if object == "ball" or object == "referees":
-                    continue
-                # Itera sobre as informações de trilha de cada objeto no quadro atual.
-                for _, track_info in object_tracks[frame_num].items():
-                    # Verifica se as informações de velocidade estão disponíveis na trilha.
-                    if "speed" in track_info:
-                        speed = track_info.get('speed', None)
-                        distance = track_info.get('distance', None)
-                        # Se a velocidade ou distância estiverem ausentes, ignora esta trilha.
-                        if speed is None or distance is None:
-                            continue
-
-                        # Obtém a caixa delimitadora do objeto rastreado.
-                        bbox = track_info['bbox']
-                        # Calcula a posição dos pés com base na caixa delimitadora.
-                        position = get_foot_position(bbox)
-                        # Converte a posição para uma lista para ajustes.
-                        position = list(position)
-                        # Ajusta a posição vertical para não sobrepor o texto ao objeto.
-                        position[1] += 40
-
-                        # Converte a posição de volta para tupla e arredonda para inteiro.
-                        position = tuple(map(int, position))
-                        # Desenha o texto da velocidade no quadro.
-                        cv2.putText(frame, f"{speed:.2f} km/h", position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
-                        # Desenha o texto da distância logo abaixo do texto da velocidade.
-                        cv2.putText(frame, f"{distance:.2f} m", (position[0], position[1] + 20),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
             # Adiciona o quadro modificado à lista de saída.
-            output_frames.append(frame)
+            output_frames.append(self.draw_frame_speed_and_distance(frame, frame_num, tracks))
 
         # Retorna a lista de quadros com os desenhos de velocidade e distância.
         print("Speed and distance drawn!")
         return output_frames
 
+    def draw_frame_speed_and_distance(self, frame, frame_num, tracks):
+        # Itera sobre cada objeto e suas trilhas nos dados de rastreamento.
+        for object, object_tracks in tracks.items():
+            # Ignora objetos que não devem ser exibidos (ex: "ball" ou "referees").
+            if object == "ball" or object == "referees":
+                continue
+            # Itera sobre as informações de trilha de cada objeto no quadro atual.
+            for _, track_info in object_tracks[frame_num].items():
+                # Verifica se as informações de velocidade estão disponíveis na trilha.
+                if "speed" in track_info:
+                    speed = track_info.get('speed', None)
+                    distance = track_info.get('distance', None)
+                    # Se a velocidade ou distância estiverem ausentes, ignora esta trilha.
+                    if speed is None or distance is None:
+                        continue
+
+                    # Obtém a caixa delimitadora do objeto rastreado.
+                    bbox = track_info['bbox']
+                    # Calcula a posição dos pés com base na caixa delimitadora.
+                    position = get_foot_position(bbox)
+                    # Converte a posição para uma lista para ajustes.
+                    position = list(position)
+                    # Ajusta a posição vertical para não sobrepor o texto ao objeto.
+                    position[1] += 40
+
+                    # Converte a posição de volta para tupla e arredonda para inteiro.
+                    position = tuple(map(int, position))
+                    # Desenha o texto da velocidade no quadro.
+                    cv2.putText(frame, f"{speed:.2f} km/h", position, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+                    # Desenha o texto da distância logo abaixo do texto da velocidade.
+                    cv2.putText(frame, f"{distance:.2f} m", (position[0], position[1] + 20),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+        return frame
+
+
+class LiveSpeedAndDistanceEstimator():
+    # Versão incremental do método 'rolling' para o modo ao vivo: recebe as posições no campo de um quadro
+    # por vez e usa apenas quadros passados (média móvel e janela de velocidade voltadas para trás).
+    # Mantém o mesmo tratamento de lacunas: as menores que max_gap_frames são interpoladas e as maiores
+    # iniciam um novo segmento, sem contar distância através delas.
+    def __init__(self, frame_rate=24, frame_window=5, smoothing_window=5, max_gap_frames=12, prune_interval=100):
+        self.frame_rate = frame_rate
+        # Mesma duração de janela do método centrado: 2 * (frame_window // 2) quadros.
+        self.speed_span = max(2 * (frame_window // 2), 1)
+        self.smoothing_window = smoothing_window
+        self.max_gap_frames = max_gap_frames
+        self.prune_interval = prune_interval
+        self.reset()
+
+    def reset(self):
+        # Estado por trilha: último quadro, posições recentes (para a média móvel), última posição suavizada
+        # e o histórico (quadro, distância acumulada) da janela de velocidade.
+        self.track_states = {}
+        # A distância total sobrevive ao descarte do estado de trilhas que somem por muito tempo.
+        self.total_distance = {}
+        self.last_prune = 0
+
+    def _new_segment(self):
+        return {"last_frame": None, "positions": deque(maxlen=self.smoothing_window), "smoothed": None,
+                "history": deque(maxlen=self.speed_span + 1)}
+
+    def _advance(self, track_id, state, frame_num, position):
+        # Avança a trilha um quadro, acumulando o passo entre as posições suavizadas.
+        state["positions"].append(position)
+        smoothed = np.mean(state["positions"], axis=0)
+        if state["smoothed"] is not None:
+            self.total_distance[track_id] += float(np.linalg.norm(smoothed - state["smoothed"]))
+        state["smoothed"] = smoothed
+        state["history"].append((frame_num, self.total_distance[track_id]))
+        state["last_frame"] = frame_num
+
+    def update(self, frame_num, track_ids, positions):
+        # track_ids (N,) e positions (N, 2) em metros (NaN fora do campo). Retorna velocidade (km/h) e
+        # distância (m) por linha, NaN enquanto a trilha não tiver dois quadros no segmento atual.
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        speed = np.full(len(positions), np.nan, dtype=np.float32)
+        distance = np.full(len(positions), np.nan, dtype=np.float32)
+        for row in np.flatnonzero(~np.isnan(positions).any(axis=1)):
+            track_id = int(track_ids[row])
+            position = positions[row]
+            state = self.track_states.get(track_id)
+            self.total_distance.setdefault(track_id, 0.0)
+            if state is None or frame_num - state["last_frame"] > self.max_gap_frames:
+                state = self.track_states[track_id] = self._new_segment()
+            elif frame_num - state["last_frame"] > 1:
+                # Lacuna pequena: preenche os quadros intermediários por interpolação linear.
+                last_frame, last_position = state["last_frame"], state["positions"][-1]
+                for missing_frame in range(last_frame + 1, frame_num):
+                    fraction = (missing_frame - last_frame) / (frame_num - last_frame)
+                    self._advance(track_id, state, missing_frame,
+                                  last_position + (position - last_position) * fraction)
+            self._advance(track_id, state, frame_num, position)
 
+            first_frame, first_distance = state["history"][0]
+            if frame_num > first_frame:
+                time_elapsed = (frame_num - first_frame) / self.frame_rate
+                speed[row] = (self.total_distance[track_id] - first_distance) / time_elapsed * 3.6
+                distance[row] = self.total_distance[track_id]
 
+        # Descarta periodicamente o estado das trilhas que não aparecem há mais de max_gap_frames quadros.
+        if frame_num - self.last_prune >= self.prune_interval:
+            self.track_states = {track_id: state for track_id, state in self.track_states.items()
+                                 if frame_num - state["last_frame"] <= self.max_gap_frames}
+            self.last_prune = frame_num
+        return speed, distance
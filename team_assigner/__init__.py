@@ -0,0 +1 @@
+from .team_assigner import TeamAssigner, batched_kmeans
\ No newline at end of file
@@ -0,0 +1,168 @@
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import TrackTable
+
+
+def batched_kmeans(points, k=2, iterations=10):
+    # k-means independente para cada lote de pontos (B, P, D), todos os lotes de uma vez com broadcasting.
+    # A inicialização é determinística: o primeiro ponto do lote e, a seguir, o ponto mais distante dos
+    # centróides já escolhidos. Retorna os rótulos (B, P) e os centróides (B, k, D).
+    points = np.asarray(points, dtype=np.float32)
+    batches = np.arange(len(points))
+    centroids = np.empty((len(points), k, points.shape[2]), dtype=np.float32)
+    centroids[:, 0] = points[:, 0]
+    distances = ((points - centroids[:, :1]) ** 2).sum(axis=2)
+    for c in range(1, k):
+        centroids[:, c] = points[batches, distances.argmax(axis=1)]
+        distances = np.minimum(distances, ((points - centroids[:, c:c + 1]) ** 2).sum(axis=2))
+
+    for _ in range(iterations):
+        labels = ((points[:, :, None] - centroids[:, None]) ** 2).sum(axis=3).argmin(axis=2)
+        one_hot = (labels[:, :, None] == np.arange(k)).astype(np.float32)
+        counts = one_hot.sum(axis=1)
+        sums = np.einsum('bpk,bpd->bkd', one_hot, points)
+        # Um cluster que ficou vazio mantém o centróide anterior.
+        new_centroids = np.where(counts[:, :, None] > 0, sums / np.maximum(counts, 1)[:, :, None], centroids)
+        converged = np.allclose(new_centroids, centroids)
+        centroids = new_centroids
+        if converged:
+            break
+    labels = ((points[:, :, None] - centroids[:, None]) ** 2).sum(axis=3).argmin(axis=2)
+    return labels, centroids
+
+
+class TeamAssigner():
+    # Separa os jogadores em dois times pela cor da camisa. Para cada jogador, uma grade de samples x samples
+    # pixels é amostrada na metade de cima da caixa e dividida em dois clusters (camisa e fundo, sendo camisa o
+    # cluster da maioria dos pixels do centro da grade), com o k-means de todos os jogadores do quadro rodando
+    # de uma vez.
+    # As cores dos dois times vêm de um k-means sobre as camisas do primeiro quadro com min_players jogadores.
+    # O time de cada track_id do ByteTrack é calculado uma vez e guardado; a trilha só é classificada de novo
+    # a cada recheck_interval quadros, e o time final é o mais votado entre essas verificações.
+    # Os goleiros são rastreados como jogadores e ficam no time de camisa mais parecida.
+    def __init__(self, recheck_interval=50, samples=8, min_players=6, iterations=10):
+        self.recheck_interval = recheck_interval
+        self.samples = samples
+        self.min_players = min_players
+        self.iterations = iterations
+        # Índices (na grade achatada) da metade central das linhas e colunas amostradas.
+        middle = np.arange(samples // 4, samples - samples // 4)
+        self._center = (middle[:, None] * samples + middle[None, :]).ravel()
+        self.reset()
+
+    def reset(self):
+        self.frame_index = 0
+        self.team_colors = None  # (2, 3) em BGR, times 1 e 2
+        # Indexados pelo track_id (os IDs do ByteTrack são inteiros crescentes); crescem por duplicação.
+        self._votes = np.zeros((0, 2), dtype=np.int32)
+        self._last_checked = np.zeros(0, dtype=np.int64)
+        self.stats = {"frames": 0, "player_rows": 0, "classified_rows": 0}
+
+    def get_state(self):
+        return {"frame_index": self.frame_index, "team_colors": self.team_colors, "votes": self._votes.copy(),
+                "last_checked": self._last_checked.copy(), "stats": dict(self.stats)}
+
+    def set_state(self, state):
+        self.frame_index = state["frame_index"]
+        self.team_colors = state["team_colors"]
+        self._votes = state["votes"].copy()
+        self._last_checked = state["last_checked"].copy()
+        self.stats = dict(state["stats"])
+
+    def report(self):
+        rows = self.stats["player_rows"]
+        return dict(self.stats, classified_fraction=round(self.stats["classified_rows"] / rows, 4) if rows else 0.0)
+
+    def _reserve(self, max_track_id):
+        capacity = len(self._last_checked)
+        if max_track_id < capacity:
+            return
+        new_capacity = max(2 * capacity, max_track_id + 1, 64)
+        votes = np.zeros((new_capacity, 2), dtype=np.int32)
+        votes[:capacity] = self._votes
+        last_checked = np.full(new_capacity, np.iinfo(np.int64).min // 2, dtype=np.int64)
+        last_checked[:capacity] = self._last_checked
+        self._votes, self._last_checked = votes, last_checked
+
+    def sample_jersey_pixels(self, frame, bboxes):
+        # Grade de pixels (N, samples * samples, 3) da metade de cima de cada caixa, em uma única indexação.
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        grid = np.linspace(0.0, 1.0, self.samples, dtype=np.float32)
+        x1, y1, x2, y2 = bboxes.T
+        xs = np.rint(x1[:, None] + (x2 - x1)[:, None] * grid).astype(np.int64).clip(0, frame.shape[1] - 1)
+        ys = np.rint(y1[:, None] + (y2 - y1)[:, None] * grid / 2).astype(np.int64).clip(0, frame.shape[0] - 1)
+        return frame[ys[:, :, None], xs[:, None, :]].reshape(len(bboxes), -1, frame.shape[2])
+
+    def jersey_colors(self, frame, bboxes):
+        # Cor da camisa (N, 3) de cada jogador: centróide do cluster predominante no centro da grade (as bordas
+        # da caixa costumam ter gramado, e o centro da metade de cima é a camisa).
+        if not len(bboxes):
+            return np.zeros((0, 3), dtype=np.float32)
+        labels, centroids = batched_kmeans(self.sample_jersey_pixels(frame, bboxes), 2, self.iterations)
+        jersey = (labels[:, self._center].mean(axis=1) > 0.5).astype(np.int64)
+        return centroids[np.arange(len(centroids)), jersey]
+
+    def fit(self, frame, bboxes):
+        # Cores dos dois times a partir das camisas de um quadro; o time 1 é o de cor mais escura,
+        # para que a numeração não dependa da ordem dos jogadores.
+        _, centroids = batched_kmeans(self.jersey_colors(frame, bboxes)[None], 2, self.iterations)
+        self.team_colors = centroids[0][np.argsort(centroids[0].sum(axis=1))]
+
+    def classify(self, frame, bboxes):
+        # Time (1 ou 2) de cada caixa no quadro, pela cor de time mais próxima da camisa.
+        colors = self.jersey_colors(frame, bboxes)
+        distances = ((colors[:, None] - self.team_colors[None]) ** 2).sum(axis=2)
+        return distances.argmin(axis=1) + 1
+
+    def update(self, frame, track_ids, bboxes):
+        # Observa os jogadores de um quadro e classifica apenas as trilhas novas ou sem verificação há
+        # recheck_interval quadros.
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        self.stats["frames"] += 1
+        self.stats["player_rows"] += len(track_ids)
+        if self.team_colors is None and len(track_ids) >= self.min_players:
+            self.fit(frame, bboxes)
+        if self.team_colors is not None and len(track_ids):
+            self._reserve(int(track_ids.max()))
+            stale = self.frame_index - self._last_checked[track_ids] >= self.recheck_interval
+            if stale.any():
+                teams = self.classify(frame, bboxes[stale])
+                np.add.at(self._votes, (track_ids[stale], teams - 1), 1)
+                self._last_checked[track_ids[stale]] = self.frame_index
+                self.stats["classified_rows"] += int(stale.sum())
+        self.frame_index += 1
+
+    def teams(self, track_ids):
+        # Time mais votado de cada track_id (NaN para trilhas ainda não classificadas).
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        teams = np.full(len(track_ids), np.nan, dtype=np.float32)
+        known = track_ids < len(self._votes)
+        votes = self._votes[track_ids[known]]
+        teams[known] = np.where(votes.sum(axis=1) > 0, votes.argmax(axis=1) + 1, np.nan)
+        return teams
+
+    def colors(self):
+        # Cores BGR dos times para desenhar as elipses ({1: cor, 2: cor}), ou None antes do ajuste.
+        if self.team_colors is None:
+            return None
+        return {team + 1: tuple(int(c) for c in color) for team, color in enumerate(self.team_colors)}
+
+    def add_team_to_tracks(self, tracks):
+        print("Adding team to tracks...")
+        if isinstance(tracks, TrackTable):
+            # O time de cada linha é o da sua trilha, inclusive nos quadros anteriores à classificação.
+            team = np.full(len(tracks), np.nan, dtype=np.float32)
+            players = tracks.object_mask('player')
+            team[players] = self.teams(tracks.track_id[players])
+            tracks.set_column('team', team)
+            print("Team added to tracks!")
+            return
+        for track in tracks['player']:
+            for track_id, track_info in track.items():
+                team = self.teams([track_id])[0]
+                if not np.isnan(team):
+                    track_info['team'] = int(team)
+        print("Team added to tracks!")
+
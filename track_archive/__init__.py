@@ -0,0 +1 @@
+from .track_archive import TrackArchive
\ No newline at end of file
@@ -0,0 +1,249 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import TrackTable, OBJECT_CLASSES
+from utils.track_table import TRACK_COLUMNS, object_class_code
+
+# Versão do formato do arquivo; mudar impede a leitura de arquivos antigos.
+ARCHIVE_FORMAT_VERSION = 1
+
+# Colunas fixas da tabela: nome -> (largura, dtype).
+BASE_COLUMNS = {
+    "frame": (1, np.int32),
+    "object_class": (1, np.int8),
+    "track_id": (1, np.int32),
+    "bbox": (4, np.float32),
+}
+
+
+def shuffle_bytes(values):
+    # Agrupa o i-ésimo byte de todos os valores (como o filtro shuffle do Blosc): os bytes mais significativos
+    # de floats e inteiros próximos se repetem, o que o zlib comprime bem melhor do que os valores intercalados.
+    values = np.ascontiguousarray(values)
+    return values.reshape(-1).view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def unshuffle_bytes(buffer, dtype):
+    dtype = np.dtype(dtype)
+    shuffled = np.frombuffer(buffer, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(shuffled.T).view(dtype).reshape(-1)
+
+
+class TrackArchive():
+    # Arquivo em disco das trilhas enriquecidas (bbox, posições, velocidade, distância, time, posse), para
+    # consultar trechos da partida sem carregar tudo como o antigo stub em pickle.
+    # Cada coluna é dividida em blocos de chunk_frames quadros, comprimidos com zlib (bytes embaralhados) e
+    # gravados em sequência em <coluna>.bin, lido com np.memmap: uma consulta só lê e descomprime os blocos
+    # que toca. Com compression=None os blocos ficam crus e são lidos direto do mmap, sem cópia.
+    # Os índices são .npy sem compressão (também com mmap): frame_offsets (linhas de cada quadro), chunk_rows
+    # (primeira linha de cada bloco), chunk_bytes (posição de cada bloco em cada coluna) e o índice de trilhas
+    # (classe, track_id, primeiro e último quadro, número de linhas). O layout fica em meta.json.
+    def __init__(self, path, max_cached_chunks=16):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get("version") != ARCHIVE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported track archive version {meta.get('version')}: {path}")
+        self.num_frames = meta["num_frames"]
+        self.num_rows = meta["num_rows"]
+        self.chunk_frames = meta["chunk_frames"]
+        self.compression = meta["compression"]
+        self.column_names = list(meta["columns"])
+        self.metadata = meta.get("metadata", {})
+        self.frame_offsets = np.load(os.path.join(path, 'frame_offsets.npy'), mmap_mode='r')
+        self.chunk_rows = np.load(os.path.join(path, 'chunk_rows.npy'), mmap_mode='r')
+        self.chunk_bytes = np.load(os.path.join(path, 'chunk_bytes.npy'), mmap_mode='r')
+        self.track_index = {name: np.load(os.path.join(path, f'tracks_{name}.npy'), mmap_mode='r')
+                            for name in ("object_class", "track_id", "first_frame", "last_frame", "rows")}
+        self._data = {}
+        for name in self.column_names:
+            data_path = os.path.join(path, f'{name}.bin')
+            # np.memmap não aceita arquivos vazios (tabela sem linhas).
+            self._data[name] = np.memmap(data_path, dtype=np.uint8, mode='r') if os.path.getsize(data_path) \
+                else np.zeros(0, dtype=np.uint8)
+        self.max_cached_chunks = max_cached_chunks
+        self._chunk_cache = OrderedDict()
+
+    def __len__(self):
+        return self.num_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._data = {}
+        self._chunk_cache.clear()
+
+    @property
+    def num_chunks(self):
+        return len(self.chunk_rows) - 1
+
+    @classmethod
+    def write(cls, path, tracks, chunk_frames=1000, compression='zlib', level=1, metadata=None):
+        # Grava as trilhas (TrackTable ou o antigo formato de dicionários) em path e retorna o arquivo aberto.
+        # Grava em um diretório temporário e renomeia, para que leitores nunca vejam arquivos incompletos.
+        # metadata (por exemplo {"fps": 24}) é guardado em meta.json; com fps, frame_range converte segundos.
+        if compression not in ('zlib', None):
+            raise ValueError(f"Unknown compression: {compression}")
+        if not isinstance(tracks, TrackTable):
+            tracks = TrackTable.from_dict(tracks)
+        columns = dict(BASE_COLUMNS)
+        columns.update({name: TRACK_COLUMNS[name] for name in TRACK_COLUMNS if tracks.has_column(name)})
+        chunk_starts = np.r_[np.arange(0, tracks.num_frames, chunk_frames), tracks.num_frames]
+        chunk_rows = tracks.frame_offsets[chunk_starts] if tracks.num_frames else np.zeros(1, dtype=np.int64)
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        temporary_path = os.path.join(parent, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        os.makedirs(temporary_path)
+        chunk_bytes = np.zeros((len(columns), len(chunk_rows)), dtype=np.int64)
+        for index, (name, (width, dtype)) in enumerate(columns.items()):
+            values = getattr(tracks, name) if name in BASE_COLUMNS else tracks.get_column(name)
+            values = np.asarray(values, dtype=dtype)
+            with open(os.path.join(temporary_path, f'{name}.bin'), 'wb') as f:
+                for chunk in range(len(chunk_rows) - 1):
+                    block = values[chunk_rows[chunk]:chunk_rows[chunk + 1]]
+                    encoded = zlib.compress(shuffle_bytes(block), level) if compression == 'zlib' else \
+                        np.ascontiguousarray(block).tobytes()
+                    f.write(encoded)
+                    chunk_bytes[index, chunk + 1] = chunk_bytes[index, chunk] + len(encoded)
+
+        index = tracks.track_index
+        first_rows = index["order"][index["offsets"][:-1]]
+        last_rows = index["order"][index["offsets"][1:] - 1]
+        track_arrays = {
+            "object_class": index["object_class"],
+            "track_id": index["track_id"],
+            "first_frame": tracks.frame[first_rows],
+            "last_frame": tracks.frame[last_rows],
+            "rows": np.diff(index["offsets"]),
+        }
+        for name, values in track_arrays.items():
+            np.save(os.path.join(temporary_path, f'tracks_{name}.npy'), np.ascontiguousarray(values))
+        np.save(os.path.join(temporary_path, 'frame_offsets.npy'), tracks.frame_offsets)
+        np.save(os.path.join(temporary_path, 'chunk_rows.npy'), np.asarray(chunk_rows, dtype=np.int64))
+        np.save(os.path.join(temporary_path, 'chunk_bytes.npy'), chunk_bytes)
+        with open(os.path.join(temporary_path, 'meta.json'), 'w') as f:
+            json.dump({
+                "version": ARCHIVE_FORMAT_VERSION,
+                "num_frames": int(tracks.num_frames),
+                "num_rows": len(tracks),
+                "chunk_frames": chunk_frames,
+                "compression": compression,
+                "columns": {name: {"width": width, "dtype": np.dtype(dtype).name}
+                            for name, (width, dtype) in columns.items()},
+                "object_classes": list(OBJECT_CLASSES),
+                "metadata": metadata or {},
+                "created": time.time(),
+            }, f, indent=1)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(temporary_path, path)
+        return cls(path)
+
+    def _chunk(self, name, chunk):
+        # Valores de uma coluna em um bloco, descomprimidos uma vez e mantidos em um cache LRU pequeno.
+        key = (name, chunk)
+        if key in self._chunk_cache:
+            self._chunk_cache.move_to_end(key)
+            return self._chunk_cache[key]
+        width, dtype = BASE_COLUMNS[name] if name in BASE_COLUMNS else TRACK_COLUMNS[name]
+        column = self.column_names.index(name)
+        start, stop = int(self.chunk_bytes[column, chunk]), int(self.chunk_bytes[column, chunk + 1])
+        encoded = self._data[name][start:stop]
+        if self.compression == 'zlib':
+            values = unshuffle_bytes(zlib.decompress(encoded), dtype)
+        else:
+            values = encoded.view(dtype)
+        values = values.reshape(-1) if width == 1 else values.reshape(-1, width)
+        self._chunk_cache[key] = values
+        if len(self._chunk_cache) > self.max_cached_chunks:
+            self._chunk_cache.popitem(last=False)
+        return values
+
+    def _read_rows(self, name, start_row, stop_row):
+        # Linhas [start_row, stop_row) de uma coluna, lendo só os blocos que elas atravessam e copiando cada um
+        # direto no array de saída. O resultado é sempre uma cópia (nunca o cache nem o mmap somente leitura),
+        # então a TrackTable retornada pode ser alterada.
+        first = max(int(np.searchsorted(self.chunk_rows, start_row, side='right')) - 1, 0)
+        last = min(int(np.searchsorted(self.chunk_rows, stop_row, side='left')), self.num_chunks)
+        if last - first == 1:
+            chunk_start = int(self.chunk_rows[first])
+            return self._chunk(name, first)[start_row - chunk_start:stop_row - chunk_start].copy()
+        width, dtype = BASE_COLUMNS[name] if name in BASE_COLUMNS else TRACK_COLUMNS[name]
+        values = np.empty((max(stop_row - start_row, 0),) if width == 1 else (max(stop_row - start_row, 0), width),
+                          dtype=dtype)
+        for chunk in range(first, last):
+            chunk_start, chunk_stop = int(self.chunk_rows[chunk]), int(self.chunk_rows[chunk + 1])
+            begin, end = max(chunk_start, start_row), min(chunk_stop, stop_row)
+            values[begin - start_row:end - start_row] = self._chunk(name, chunk)[begin - chunk_start:end - chunk_start]
+        return values
+
+    def _check_columns(self, columns):
+        columns = self.column_names if columns is None else list(columns)
+        missing = [name for name in columns if name not in self.column_names]
+        if missing:
+            raise KeyError(f"Columns not in track archive: {missing}")
+        return columns
+
+    def frame_range(self, start_seconds, stop_seconds=None):
+        # Converte um intervalo em segundos para (quadro inicial, quadro final) com o FPS gravado no arquivo.
+        fps = self.metadata.get("fps")
+        if not fps:
+            raise ValueError("Track archive has no fps in its metadata")
+        stop = self.num_frames if stop_seconds is None else min(int(round(stop_seconds * fps)), self.num_frames)
+        return min(int(round(start_seconds * fps)), self.num_frames), stop
+
+    def frames(self, start, stop=None, columns=None):
+        # TrackTable com as linhas dos quadros [start, stop), mantendo os números de quadro originais
+        # (frame_slice(f) funciona para f no intervalo). columns limita as colunas opcionais lidas.
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        start = min(max(start, 0), stop)
+        columns = [name for name in self._check_columns(columns) if name not in BASE_COLUMNS]
+        start_row, stop_row = int(self.frame_offsets[start]), int(self.frame_offsets[stop])
+        base = {name: self._read_rows(name, start_row, stop_row) for name in BASE_COLUMNS}
+        return TrackTable(base["frame"], base["object_class"], base["track_id"], base["bbox"], num_frames=stop,
+                          columns={name: self._read_rows(name, start_row, stop_row) for name in columns})
+
+    def tracks(self, object_name=None):
+        # Índice de trilhas (classe, track_id, primeiro e último quadro, linhas), opcionalmente de uma classe.
+        if object_name is None:
+            return {name: np.asarray(values) for name, values in self.track_index.items()}
+        selected = np.asarray(self.track_index["object_class"]) == object_class_code(object_name)
+        return {name: np.asarray(values)[selected] for name, values in self.track_index.items()}
+
+    def track(self, track_id, object_name='player', columns=None, start=None, stop=None):
+        # Linhas de uma trilha ordenadas por quadro, como {"frame": ..., coluna: ...}, opcionalmente limitadas
+        # aos quadros [start, stop). Só os blocos entre o primeiro e o último quadro da trilha são lidos.
+        columns = [name for name in self._check_columns(columns) if name not in ("frame", "object_class", "track_id")]
+        matches = np.flatnonzero((np.asarray(self.track_index["object_class"]) == object_class_code(object_name)) &
+                                 (np.asarray(self.track_index["track_id"]) == track_id))
+        if len(matches):
+            first_frame = int(self.track_index["first_frame"][matches[0]])
+            last_frame = int(self.track_index["last_frame"][matches[0]])
+            start = first_frame if start is None else max(start, first_frame)
+            stop = last_frame + 1 if stop is None else min(stop, last_frame + 1)
+        if not len(matches) or start >= stop:
+            start = stop = 0
+        start_row, stop_row = int(self.frame_offsets[start]), int(self.frame_offsets[stop])
+        selected = (self._read_rows("track_id", start_row, stop_row) == track_id) & \
+            (self._read_rows("object_class", start_row, stop_row) == object_class_code(object_name))
+        result = {"frame": self._read_rows("frame", start_row, stop_row)[selected]}
+        for name in columns:
+            result[name] = self._read_rows(name, start_row, stop_row)[selected]
+        return result
+
+    def to_table(self, columns=None):
+        # A partida inteira como TrackTable (equivalente a carregar o antigo stub).
+        return self.frames(0, self.num_frames, columns=columns)
@@ -0,0 +1,147 @@
+import numpy as np
+import supervision as sv
+import sys
+sys.path.append('../')
+from utils import TrackTable, OBJECT_CLASSES
+
+
+class BallTracker():
+    # Acompanha a bola com inferência apenas em um recorte (ROI) ao redor da posição prevista. O recorte é
+    # processado na resolução original, então a bola não é reduzida junto com o quadro inteiro (melhor recall)
+    # e o modelo roda em uma imagem roi_size x roi_size (mais barato que o quadro inteiro). A previsão usa a
+    # velocidade das duas últimas observações. Quando o recorte não encontra a bola (um chute, uma previsão
+    # ruim), ela é procurada nas detecções do quadro inteiro, que já foram calculadas; se também não está lá por
+    # mais de max_missed quadros, é considerada perdida e deixa de ser procurada no recorte.
+    def __init__(self, tracker, roi_size=320, roi_conf=0.05, max_missed=3):
+        self.tracker = tracker
+        self.roi_size = roi_size
+        self.roi_conf = roi_conf
+        self.max_missed = max_missed
+        self.reset()
+
+    def reset(self):
+        self.frame_index = 0
+        self.observations = []  # até duas últimas (quadro, centro, tamanho da caixa)
+        self.missed = 0
+        self.stats = {"frames": 0, "roi_searches": 0, "roi_hits": 0, "full_frame_searches": 0,
+                      "full_frame_hits": 0}
+
+    def get_state(self):
+        return {"frame_index": self.frame_index, "observations": list(self.observations), "missed": self.missed,
+                "stats": dict(self.stats)}
+
+    def set_state(self, state):
+        self.frame_index = state["frame_index"]
+        self.observations = list(state["observations"])
+        self.missed = state["missed"]
+        self.stats = dict(state["stats"])
+
+    def report(self):
+        searches = self.stats["roi_searches"]
+        return dict(self.stats, roi_hit_rate=round(self.stats["roi_hits"] / searches, 4) if searches else 0.0)
+
+    @property
+    def lost(self):
+        return not self.observations or self.missed > self.max_missed
+
+    def predict(self):
+        # Posição prevista da bola no quadro atual (velocidade constante entre as duas últimas observações).
+        last_frame, last_center, _ = self.observations[-1]
+        if len(self.observations) < 2:
+            return last_center
+        previous_frame, previous_center, _ = self.observations[-2]
+        velocity = (last_center - previous_center) / (last_frame - previous_frame)
+        return last_center + velocity * (self.frame_index - last_frame)
+
+    def _roi(self, frame_shape, center):
+        # Recorte quadrado de roi_size pixels centrado na previsão, deslocado para dentro do quadro.
+        height, width = frame_shape[:2]
+        size_x, size_y = min(self.roi_size, width), min(self.roi_size, height)
+        x1 = int(np.clip(center[0] - size_x / 2, 0, width - size_x))
+        y1 = int(np.clip(center[1] - size_y / 2, 0, height - size_y))
+        return x1, y1, x1 + size_x, y1 + size_y
+
+    def _closest(self, detections, center):
+        centers = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2
+        return int(np.argmin(np.linalg.norm(centers - center, axis=1)))
+
+    def _search_roi(self, frame, ball_class):
+        center = self.predict()
+        x1, y1, x2, y2 = self._roi(frame.shape, center)
+        self.stats["roi_searches"] += 1
+        detections, _ = self.tracker.predict_crops([frame[y1:y2, x1:x2]], self.roi_size, self.roi_conf)[0]
+        detections = detections[detections.class_id == ball_class]
+        if not len(detections):
+            return None
+        detections.xyxy = detections.xyxy + np.array([x1, y1, x1, y1], dtype=detections.xyxy.dtype)
+        self.stats["roi_hits"] += 1
+        return detections[self._closest(detections, center)]
+
+    def update(self, frame, detection, class_name):
+        # Recebe as detecções do quadro inteiro e devolve as mesmas detecções com, no máximo, uma bola:
+        # a encontrada no recorte enquanto a bola está sendo acompanhada; se o recorte não a encontra, a do quadro
+        # inteiro mais próxima da previsão (ou a de maior confiança, quando a bola está perdida).
+        ball_class = self.tracker.class_ids(class_name)["ball"]
+        is_ball = detection.class_id == ball_class
+        ball = None
+        lost = self.lost
+        if not lost:
+            ball = self._search_roi(frame, ball_class)
+        if ball is None:
+            self.stats["full_frame_searches"] += 1
+            full_frame_balls = detection[is_ball]
+            if len(full_frame_balls):
+                self.stats["full_frame_hits"] += 1
+                if not lost:
+                    best = self._closest(full_frame_balls, self.predict())
+                elif full_frame_balls.confidence is not None:
+                    best = int(np.argmax(full_frame_balls.confidence))
+                else:
+                    best = len(full_frame_balls) - 1
+                ball = full_frame_balls[best]
+
+        if ball is None:
+            self.missed += 1
+        else:
+            xyxy = ball.xyxy[0].astype(np.float64)
+            self.observations = (self.observations + [(self.frame_index, (xyxy[:2] + xyxy[2:]) / 2,
+                                                       xyxy[2:] - xyxy[:2])])[-2:]
+            self.missed = 0
+        self.frame_index += 1
+        self.stats["frames"] += 1
+
+        # A bola escolhida vai para o final, onde add_tracked_detections_to_tracks a procura.
+        others = detection[~is_ball]
+        return (sv.Detections.merge([others, ball]) if ball is not None else others), class_name
+
+
+def interpolate_ball_positions(tracks, max_gap_frames=None):
+    # Preenche os quadros sem bola interpolando linearmente as caixas entre as detecções vizinhas, de uma vez
+    # para todos os quadros. Lacunas maiores que max_gap_frames (quando definido) e os quadros antes da
+    # primeira ou depois da última detecção continuam sem bola. Retorna uma nova tabela (ou dicionário).
+    if not isinstance(tracks, TrackTable):
+        return interpolate_ball_positions(TrackTable.from_dict(tracks), max_gap_frames).to_dict()
+    ball_rows = np.flatnonzero(tracks.object_mask('ball'))
+    if len(ball_rows) < 2:
+        return tracks
+    # Uma bola por quadro (as linhas estão ordenadas por quadro; mantém a última de cada quadro).
+    ball_rows = ball_rows[np.r_[tracks.frame[ball_rows][1:] != tracks.frame[ball_rows][:-1], True]]
+    known_frames = tracks.frame[ball_rows]
+    missing_frames = np.setdiff1d(np.arange(known_frames[0], known_frames[-1] + 1), known_frames)
+    if max_gap_frames is not None:
+        # Os quadros ausentes estão em ordem, então cada lacuna ocupa gap_length posições consecutivas.
+        gap_length = np.diff(known_frames) - 1
+        missing_frames = missing_frames[np.repeat(gap_length <= max_gap_frames, gap_length)]
+    if not len(missing_frames):
+        return tracks
+
+    known_bbox = tracks.bbox[ball_rows]
+    new_bbox = np.stack([np.interp(missing_frames, known_frames, known_bbox[:, k]) for k in range(4)], axis=1)
+    columns = {}
+    for name, values in tracks.columns.items():
+        padding = np.full((len(missing_frames),) + values.shape[1:], np.nan, dtype=values.dtype)
+        columns[name] = np.concatenate([values, padding])
+    return TrackTable(np.r_[tracks.frame, missing_frames],
+                      np.r_[tracks.object_class, np.full(len(missing_frames), OBJECT_CLASSES.index('ball'))],
+                      np.r_[tracks.track_id, np.ones(len(missing_frames), dtype=np.int32)],
+                      np.concatenate([tracks.bbox, new_bbox]), num_frames=tracks.num_frames, columns=columns)
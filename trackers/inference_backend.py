@@ -0,0 +1,166 @@
+import os
+import shutil
+import time
+import cv2
+import numpy as np
+import supervision as sv
+from ultralytics import YOLO
+import sys
+sys.path.append('../')
+from analysis_cache import hash_file
+from instrumentation import peak_rss_bytes
+
+# Formatos de exportação do ultralytics suportados como backend (além do 'pytorch', que usa o .pt direto).
+EXPORT_FORMATS = {"onnx": ".onnx", "openvino": "_openvino_model", "torchscript": ".torchscript"}
+
+
+def export_model(model_path, export_format='onnx', imgsz=640, export_dir='models/exports'):
+    # Exporta os pesos uma única vez: o arquivo exportado é nomeado pelo hash dos pesos, do formato e do imgsz,
+    # então as próximas execuções o reaproveitam e pesos novos geram uma nova exportação.
+    weights_hash = hash_file(model_path)[:16]
+    base_name = os.path.splitext(os.path.basename(model_path))[0]
+    export_path = os.path.join(export_dir, f"{base_name}-{weights_hash}-{imgsz}{EXPORT_FORMATS[export_format]}")
+    if os.path.exists(export_path):
+        return export_path
+
+    print(f"Exporting {model_path} to {export_format}...")
+    os.makedirs(export_dir, exist_ok=True)
+    exported_path = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True)
+    shutil.move(exported_path, export_path)
+    print("Model exported to:", export_path)
+    return export_path
+
+
+class LetterboxBuffer():
+    # Buffers pré-alocados para redimensionar os quadros para imgsz x imgsz com bordas (letterbox) e convertê-los
+    # para o tensor BCHW RGB em [0, 1] esperado pelo modelo, sem alocar memória a cada lote.
+    def __init__(self, imgsz=640, capacity=1):
+        self.imgsz = imgsz
+        self.capacity = 0
+        self.frame_shape = None
+        self.scale = 1.0
+        self.pad = (0, 0)
+        self._reserve(capacity)
+
+    def _reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        self.capacity = capacity
+        self.images = np.full((capacity, self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        self.tensor = np.zeros((capacity, 3, self.imgsz, self.imgsz), dtype=np.float32)
+        self.frame_shape = None
+
+    def _configure(self, frame_shape):
+        # Escala e bordas só mudam quando muda a resolução dos quadros.
+        height, width = frame_shape[:2]
+        self.scale = min(self.imgsz / height, self.imgsz / width)
+        new_width, new_height = int(round(width * self.scale)), int(round(height * self.scale))
+        left, top = (self.imgsz - new_width) // 2, (self.imgsz - new_height) // 2
+        self.pad = (left, top)
+        self.resized_size = (new_width, new_height)
+        self.images[:] = 114
+        self.frame_shape = frame_shape
+
+    def fill(self, frames):
+        # Retorna uma visão (N, 3, imgsz, imgsz) do tensor pré-alocado com os quadros já preparados.
+        self._reserve(len(frames))
+        if self.frame_shape != frames[0].shape:
+            self._configure(frames[0].shape)
+        left, top = self.pad
+        new_width, new_height = self.resized_size
+        for index, frame in enumerate(frames):
+            cv2.resize(frame, self.resized_size, dst=self.images[index, top:top + new_height, left:left + new_width],
+                       interpolation=cv2.INTER_LINEAR)
+        count = len(frames)
+        # BGR -> RGB, HWC -> CHW e normalização, gravando direto no buffer de saída.
+        np.multiply(self.images[:count, :, :, ::-1].transpose(0, 3, 1, 2), 1 / 255, out=self.tensor[:count])
+        return self.tensor[:count]
+
+    def to_frame_coordinates(self, xyxy):
+        # Desfaz o letterbox: coordenadas da imagem do modelo -> coordenadas do quadro original.
+        left, top = self.pad
+        xyxy = (xyxy - np.array([left, top, left, top], dtype=np.float32)) / self.scale
+        height, width = self.frame_shape[:2]
+        return np.clip(xyxy, 0, [width, height, width, height]).astype(np.float32)
+
+
+class InferenceBackend():
+    # Executa o modelo de detecção em um formato otimizado para CPU ('onnx', 'openvino', 'torchscript') ou
+    # no próprio PyTorch ('pytorch'). Com batch_size='auto', o tamanho do lote é escolhido medindo a latência
+    # de cada candidato e respeitando memory_limit_bytes.
+    def __init__(self, model_path, backend='onnx', imgsz=640, conf=0.1, batch_size='auto', device='cpu',
+                 export_dir='models/exports', memory_limit_bytes=2 * 1024 ** 3, frame_size=(1920, 1080)):
+        self.backend = backend
+        self.imgsz = imgsz
+        self.conf = conf
+        self.device = device
+        self.weights_path = model_path if backend == 'pytorch' else export_model(model_path, backend, imgsz,
+                                                                                 export_dir)
+        self.model = YOLO(self.weights_path, task='detect')
+        self.letterbox = LetterboxBuffer(imgsz)
+        self.frames = 0
+        self.seconds = 0.0
+        self.batch_size_measurements = []
+        if batch_size == 'auto':
+            batch_size = self.choose_batch_size(frame_size, memory_limit_bytes)
+        self.batch_size = batch_size
+
+    @property
+    def signature(self):
+        # Parâmetros que alteram as detecções (usados na chave do cache de rastreamento).
+        return {"backend": self.backend, "imgsz": self.imgsz, "conf": self.conf}
+
+    def _run(self, frames):
+        import torch  # dependência do ultralytics
+        batch = torch.from_numpy(self.letterbox.fill(frames))
+        return self.model.predict(batch, conf=self.conf, device=self.device, verbose=False)
+
+    def predict(self, frames):
+        # Retorna (sv.Detections, nomes das classes) por quadro, com as caixas nas coordenadas do quadro.
+        started = time.perf_counter()
+        detections = []
+        for result in self._run(frames):
+            detection = sv.Detections.from_ultralytics(result)
+            detection.xyxy = self.letterbox.to_frame_coordinates(detection.xyxy)
+            detections.append((detection, result.names))
+        self.seconds += time.perf_counter() - started
+        self.frames += len(frames)
+        return detections
+
+    def choose_batch_size(self, frame_size=(1920, 1080), memory_limit_bytes=2 * 1024 ** 3,
+                          candidates=(1, 2, 4, 8, 16, 32), repeats=3, min_gain=0.05):
+        # Aumenta o lote enquanto o tempo por quadro cair pelo menos min_gain e o pico de memória
+        # medido (ou, sem medição, o tamanho dos buffers) continuar abaixo do limite.
+        width, height = frame_size
+        sample = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        baseline_memory = peak_rss_bytes()
+        best_batch_size, best_seconds_per_frame = candidates[0], None
+        for batch_size in candidates:
+            frames = [sample] * batch_size
+            self._run(frames)  # aquecimento
+            started = time.perf_counter()
+            for _ in range(repeats):
+                self._run(frames)
+            seconds_per_frame = (time.perf_counter() - started) / (repeats * batch_size)
+            buffer_bytes = self.letterbox.images[:batch_size].nbytes + self.letterbox.tensor[:batch_size].nbytes
+            memory_bytes = max(peak_rss_bytes() - baseline_memory, buffer_bytes)
+            self.batch_size_measurements.append({"batch_size": batch_size,
+                                                 "ms_per_frame": round(seconds_per_frame * 1000, 3),
+                                                 "memory_bytes": int(memory_bytes)})
+            if memory_bytes > memory_limit_bytes:
+                break
+            if best_seconds_per_frame is not None and seconds_per_frame > best_seconds_per_frame * (1 - min_gain):
+                break
+            best_batch_size, best_seconds_per_frame = batch_size, seconds_per_frame
+        print(f"Batch size for {self.backend}: {best_batch_size}")
+        return best_batch_size
+
+    def report(self):
+        return {
+            "backend": self.backend,
+            "batch_size": self.batch_size,
+            "frames": self.frames,
+            "seconds": round(self.seconds, 4),
+            "fps": round(self.frames / self.seconds, 2) if self.seconds else 0.0,
+            "batch_size_measurements": self.batch_size_measurements,
+        }
@@ -0,0 +1,132 @@
+import dataclasses
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+from camera_movement_estimator import track_points, LK_PARAMS
+from utils import iter_frame_windows
+
+
+class KeyframeDetector():
+    # Executa o modelo apenas nos quadros-chave e propaga as caixas com fluxo óptico nos quadros intermediários.
+    # Quadros-chave: um a cada keyframe_interval quadros e, fora dessa grade, sempre que houver troca de cena
+    # (diferença média entre quadros acima de scene_change_threshold) ou quando a propagação ficar pouco
+    # confiável (mediana do deslocamento das caixas acima de motion_threshold pixels, ou mais de
+    # max_lost_fraction das caixas sem nenhum ponto acompanhado).
+    def __init__(self, tracker, keyframe_interval=5, scene_change_threshold=40.0, motion_threshold=20.0,
+                 max_lost_fraction=0.5, flow_scale=0.5, points_per_side=3):
+        self.tracker = tracker
+        self.keyframe_interval = keyframe_interval
+        self.scene_change_threshold = scene_change_threshold
+        self.motion_threshold = motion_threshold
+        self.max_lost_fraction = max_lost_fraction
+        self.flow_scale = flow_scale
+        self.points_per_side = points_per_side
+        self.lk_params = dict(LK_PARAMS)
+        self.reset()
+
+    def reset(self):
+        self.frame_index = 0
+        self.previous_gray = None
+        self.detections = None
+        self.class_names = None
+        self.stats = {"frames": 0, "detected_frames": 0, "scheduled_keyframes": 0, "triggered_keyframes": 0}
+
+    def get_state(self):
+        return {"frame_index": self.frame_index, "previous_gray": self.previous_gray,
+                "detections": self.detections, "class_names": self.class_names, "stats": dict(self.stats)}
+
+    def set_state(self, state):
+        self.frame_index = state["frame_index"]
+        self.previous_gray = state["previous_gray"]
+        self.detections = state["detections"]
+        self.class_names = state["class_names"]
+        self.stats = dict(state["stats"])
+
+    def report(self):
+        frames = self.stats["frames"]
+        return dict(self.stats, detection_savings=round(1 - self.stats["detected_frames"] / frames, 4)
+                    if frames else 0.0)
+
+    def _prepare_grayscale(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.flow_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _box_points(self, xyxy):
+        # Grade de points_per_side x points_per_side pontos no interior (60% central) de cada caixa.
+        steps = np.linspace(0.2, 0.8, self.points_per_side)
+        grid_x, grid_y = np.meshgrid(steps, steps)
+        widths = (xyxy[:, 2] - xyxy[:, 0])[:, None]
+        heights = (xyxy[:, 3] - xyxy[:, 1])[:, None]
+        x = xyxy[:, 0:1] + widths * grid_x.ravel()[None, :]
+        y = xyxy[:, 1:2] + heights * grid_y.ravel()[None, :]
+        return np.stack([x, y], axis=2).reshape(-1, 2) * self.flow_scale
+
+    def _propagate(self, gray):
+        # Move cada caixa pela mediana do deslocamento dos seus pontos; retorna as detecções propagadas e
+        # se a propagação continua confiável.
+        xyxy = self.detections.xyxy
+        if not len(xyxy):
+            return self.detections, True
+        points = self._box_points(xyxy)
+        new_points, found = track_points(self.previous_gray, gray, points, self.lk_params)
+        displacement = ((new_points - points) / self.flow_scale).reshape(len(xyxy), -1, 2)
+        found = found.reshape(len(xyxy), -1)
+
+        box_shift = np.zeros((len(xyxy), 2), dtype=np.float32)
+        tracked_boxes = found.any(axis=1)
+        for box in np.flatnonzero(tracked_boxes):
+            box_shift[box] = np.median(displacement[box][found[box]], axis=0)
+
+        propagated = dataclasses.replace(self.detections, xyxy=xyxy + np.tile(box_shift, 2))
+        lost_fraction = 1 - tracked_boxes.mean()
+        motion = np.median(np.linalg.norm(box_shift[tracked_boxes], axis=1)) if tracked_boxes.any() else 0.0
+        reliable = lost_fraction <= self.max_lost_fraction and motion <= self.motion_threshold
+        return propagated, reliable
+
+    def _is_scene_change(self, gray):
+        return float(cv2.absdiff(self.previous_gray, gray).mean()) > self.scene_change_threshold
+
+    def _detect(self, frames):
+        return self.tracker.detect_batch(frames)
+
+    def process_frame(self, frame, detect=None):
+        # Um quadro por vez (modo ao vivo). detect=True força a detecção; detect=False pede a propagação, que
+        # ainda cai na detecção se não houver caixas anteriores ou a propagação não for confiável; None segue
+        # a grade de quadros-chave.
+        if detect is None:
+            detect = self.frame_index % self.keyframe_interval == 0
+        return self._advance(frame, self._prepare_grayscale(frame), self._detect([frame])[0] if detect else None)
+
+    def _advance(self, frame, gray, detection=None):
+        if detection is not None:
+            self.detections, self.class_names = detection
+            self.stats["scheduled_keyframes"] += 1
+            self.stats["detected_frames"] += 1
+        else:
+            reliable = self.detections is not None and not self._is_scene_change(gray)
+            if reliable:
+                propagated, reliable = self._propagate(gray)
+            if reliable:
+                self.detections = propagated
+            else:
+                self.detections, self.class_names = self._detect([frame])[0]
+                self.stats["triggered_keyframes"] += 1
+                self.stats["detected_frames"] += 1
+        self.previous_gray = gray
+        self.frame_index += 1
+        self.stats["frames"] += 1
+        return self.detections, self.class_names
+
+    def iter_detections(self, frames):
+        # Gera (sv.Detections, nomes das classes) por quadro. Os quadros-chave da grade de cada lote são
+        # detectados em uma única chamada ao modelo; os disparados por cena ou movimento, individualmente.
+        for frames_batch in iter_frame_windows(frames, self.tracker.batch_size):
+            scheduled = [offset for offset in range(len(frames_batch))
+                         if (self.frame_index + offset) % self.keyframe_interval == 0]
+            scheduled_detections = dict(zip(scheduled, self._detect([frames_batch[offset] for offset in scheduled])
+                                             if scheduled else []))
+            for offset, frame in enumerate(frames_batch):
+                yield self._advance(frame, self._prepare_grayscale(frame), scheduled_detections.get(offset))
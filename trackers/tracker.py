@@ -1,17 +1,48 @@
 from ultralytics import YOLO
 import supervision as sv
+from supervision.tracker.byte_tracker.basetrack import BaseTrack
 import pickle
-import cv2
+import numpy as np
 import os
 import sys
 sys.path.append('../')
-from utils import get_center_of_bbox, get_bbox_width, get_foot_position
+from renderer import draw_ellipse, TEAM_COLORS
+from team_assigner import TeamAssigner
+from utils import get_center_of_bbox, get_foot_position, iter_frame_windows, TrackTable, \
+    TrackTableBuilder, OBJECT_CLASSES, save_checkpoint, load_checkpoint, remove_checkpoint, video_signature
+from .keyframe_detector import KeyframeDetector
+from .inference_backend import InferenceBackend
+from .ball_tracker import BallTracker, interpolate_ball_positions
 
 
 class Tracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, keyframe_interval=None, keyframe_options=None, backend=None,
+                 backend_options=None, ball_roi=False, ball_roi_options=None, assign_teams=False, team_options=None,
+                 model=None):
+        self.model_path = model_path
         self.tracker = sv.ByteTrack()
+        self.detection_conf = 0.1
+        self.batch_size = 20  # Define o tamanho do lote para processamento de frames
+        # Com backend ('onnx', 'openvino', 'torchscript' ou 'pytorch'), a detecção usa um InferenceBackend:
+        # modelo exportado uma única vez, letterbox pré-alocado e lote escolhido pela latência medida
+        self.backend = None
+        if backend is not None and model is None:
+            self.backend = InferenceBackend(model_path, backend, conf=self.detection_conf, **(backend_options or {}))
+            self.batch_size = self.backend.batch_size
+        # model permite usar um modelo já carregado no lugar do YOLO(model_path) (ex.: o detector simulado dos
+        # benchmarks), com a mesma interface de predict
+        if model is not None:
+            self.model = model
+        else:
+            self.model = self.backend.model if self.backend is not None else YOLO(model_path)
+        # Com keyframe_interval, o modelo roda só nos quadros-chave e as caixas são propagadas por fluxo óptico
+        self.keyframe_detector = KeyframeDetector(self, keyframe_interval, **(keyframe_options or {})) \
+            if keyframe_interval else None
+        # Com ball_roi, a bola é procurada em um recorte ao redor da posição prevista, e no quadro inteiro só
+        # quando ela é perdida
+        self.ball_tracker = BallTracker(self, **(ball_roi_options or {})) if ball_roi else None
+        # Com assign_teams, cada trilha de jogador recebe um time pela cor da camisa (coluna 'team')
+        self.team_assigner = TeamAssigner(**(team_options or {})) if assign_teams else None
 
     def track(self, image):
         # Rastreia objetos na imagem usando o modelo YOLO
@@ -19,6 +50,10 @@ class Tracker:
 
     def add_position_to_tracks(self,tracks):
         print("Adding position to tracks...")
+        if isinstance(tracks, TrackTable):
+            tracks.set_column('position', self.positions_from_bboxes(tracks.bbox, tracks.object_mask('ball')))
+            print("Position added to tracks!")
+            return
         for object, object_tracks in tracks.items():
             for frame_num, track in enumerate(object_tracks):
                 for track_id, track_info in track.items():
@@ -30,17 +65,137 @@ class Tracker:
                     tracks[object][frame_num][track_id]['position'] = position
         print("Position added to tracks!")
 
+    @staticmethod
+    def positions_from_bboxes(bbox, is_ball):
+        # Calcula todas as posições de uma vez: centro da bola e pés dos demais objetos
+        position = np.trunc(np.stack([(bbox[:, 0] + bbox[:, 2]) / 2, bbox[:, 3]], axis=1))
+        position[is_ball, 1] = np.trunc((bbox[is_ball, 1] + bbox[is_ball, 3]) / 2)
+        return position
+
     def detect_frames(self, frames):
         # Detecta objetos em uma lista de frames
-        batch_size = 20  # Define o tamanho do lote para processamento de frames
-        detections = []  # Inicializa uma lista vazia para armazenar detecções
-        for i in range(0, len(frames), batch_size):
-            detections_batch = self.model.predict(
-                frames[i:i + batch_size], conf=0.1)
-            detections += detections_batch
-        return detections  # Retorna a lista de detecções para todos os frames
-
-    def get_object_tracking(self, frames, read_from_stub=False, stub_path=None):
+        return list(self.iter_detections(frames))  # Retorna a lista de detecções para todos os frames
+
+    def iter_detections(self, frames):
+        # Detecta objetos em qualquer iterável de frames, mantendo em memória apenas um lote por vez
+        for frames_batch in iter_frame_windows(frames, self.batch_size):
+            for detection in self.predict_batch(frames_batch):
+                yield detection
+
+    def predict_batch(self, frames_batch):
+        # Executa o modelo sobre um lote de frames e retorna uma detecção por frame
+        return self.model.predict(frames_batch, conf=self.detection_conf)
+
+    def to_supervision(self, detection):
+        # Converte a saída do YOLO para sv.Detections, junto com o mapeamento id -> nome das classes
+        return sv.Detections.from_ultralytics(detection), detection.names
+
+    def predict_crops(self, crops, imgsz, conf):
+        # Executa o modelo em recortes pequenos (imgsz x imgsz) e retorna (sv.Detections, nomes) por recorte,
+        # com as caixas nas coordenadas do recorte
+        return [self.to_supervision(detection) for detection in self.model.predict(crops, conf=conf, imgsz=imgsz,
+                                                                                    verbose=False)]
+
+    def detect_batch(self, frames_batch):
+        # Retorna (sv.Detections, nomes das classes) para cada frame do lote
+        if self.backend is not None:
+            return self.backend.predict(frames_batch)
+        return [self.to_supervision(detection) for detection in self.predict_batch(frames_batch)]
+
+    def iter_supervision_detections(self, frames):
+        # Gera (sv.Detections, nomes das classes) por frame, detectando todos os frames ou só os quadros-chave
+        for frames_batch in iter_frame_windows(frames, self.batch_size):
+            detections = self.keyframe_detector.iter_detections(frames_batch) \
+                if self.keyframe_detector is not None else self.detect_batch(frames_batch)
+            if self.ball_tracker is None:
+                yield from detections
+                continue
+            for frame, (detection_supervision, class_name) in zip(frames_batch, detections):
+                yield self.ball_tracker.update(frame, detection_supervision, class_name)
+
+    def iter_frames_with_detections(self, frames):
+        # Como iter_supervision_detections, mas gera (frame, (sv.Detections, nomes das classes))
+        for frames_batch in iter_frame_windows(frames, self.batch_size):
+            yield from zip(frames_batch, self.iter_supervision_detections(frames_batch))
+
+    def create_track_builder(self):
+        # As trilhas são acumuladas em buffers colunares e viram uma TrackTable ao final
+        return TrackTableBuilder()
+
+    def reset_tracking(self):
+        # Prepara o rastreamento de um novo vídeo sem recarregar o modelo: zera o ByteTrack, o contador de IDs
+        # e o estado dos quadros-chave
+        self.tracker.reset()
+        if self.keyframe_detector is not None:
+            self.keyframe_detector.reset()
+        if self.ball_tracker is not None:
+            self.ball_tracker.reset()
+        if self.team_assigner is not None:
+            self.team_assigner.reset()
+
+    def get_tracking_state(self):
+        # O contador de IDs do ByteTrack é um atributo de classe e precisa ser salvo junto com o rastreador,
+        # senão as trilhas criadas após retomar um checkpoint receberiam IDs repetidos.
+        state = {"tracker": self.tracker, "track_id_counter": BaseTrack._count}
+        if self.keyframe_detector is not None:
+            state["keyframe_detector"] = self.keyframe_detector.get_state()
+        if self.ball_tracker is not None:
+            state["ball_tracker"] = self.ball_tracker.get_state()
+        if self.team_assigner is not None:
+            state["team_assigner"] = self.team_assigner.get_state()
+        return state
+
+    def set_tracking_state(self, state):
+        self.tracker = state["tracker"]
+        BaseTrack._count = state["track_id_counter"]
+        # A assinatura do checkpoint inclui tracking_params, então o estado salvo tem as mesmas partes ativas
+        if self.keyframe_detector is not None:
+            self.keyframe_detector.set_state(state["keyframe_detector"])
+        if self.ball_tracker is not None:
+            self.ball_tracker.set_state(state["ball_tracker"])
+        if self.team_assigner is not None:
+            self.team_assigner.set_state(state["team_assigner"])
+
+    def tracking_params(self):
+        # Todos os parâmetros que alteram as trilhas: entram na chave do cache e na assinatura dos checkpoints
+        return {
+            "conf": self.detection_conf,
+            "backend": None if self.backend is None else self.backend.signature,
+            "tracker": type(self.tracker).__name__,
+            "keyframes": None if self.keyframe_detector is None else {
+                name: getattr(self.keyframe_detector, name) for name in (
+                    "keyframe_interval", "scene_change_threshold", "motion_threshold", "max_lost_fraction",
+                    "flow_scale", "points_per_side")},
+            "ball_roi": None if self.ball_tracker is None else {
+                name: getattr(self.ball_tracker, name) for name in ("roi_size", "roi_conf", "max_missed")},
+            # As entradas com times também guardam as cores das camisas (ver tracking_cache_arrays).
+            "teams": None if self.team_assigner is None else dict({
+                name: getattr(self.team_assigner, name) for name in (
+                    "recheck_interval", "samples", "min_players", "iterations")}, cached_colors=True),
+            "supervision": sv.__version__,
+        }
+
+    def tracking_cache_key(self, cache, video_path):
+        # A chave do cache depende do conteúdo do vídeo, dos pesos do modelo e dos parâmetros de detecção.
+        return cache.make_key("object_tracking", files={"video": video_path, "model": self.model_path},
+                              params=self.tracking_params())
+
+    def tracking_cache_arrays(self, tracks):
+        # Arrays da entrada do AnalysisCache: a tabela de trilhas e, quando já calculadas, as cores das camisas,
+        # sem as quais um acerto no cache desenharia os times com a paleta padrão
+        arrays = tracks.to_arrays()
+        if self.team_assigner is not None and self.team_assigner.team_colors is not None:
+            arrays["team_colors"] = np.asarray(self.team_assigner.team_colors, dtype=np.float64)
+        return arrays
+
+    def tracks_from_cache(self, arrays):
+        # Inverso de tracking_cache_arrays: restaura as cores das camisas e retorna a tabela de trilhas
+        if self.team_assigner is not None and "team_colors" in arrays:
+            self.team_assigner.team_colors = np.array(arrays["team_colors"])
+        return TrackTable.from_arrays(arrays)
+
+    def get_object_tracking(self, frames, read_from_stub=False, stub_path=None, cache=None, video_path=None,
+                            checkpoint_path=None, checkpoint_interval=1000, instrumentation=None):
         print("Getting object tracking...")
         # Obtém o rastreamento de objetos para os frames fornecidos
         if read_from_stub and stub_path is not None and os.path.exists(stub_path):
@@ -48,58 +203,44 @@ class Tracker:
             with open(stub_path, 'rb') as f:
                 return pickle.load(f)  # Carrega os dados do stub e retorna
 
-        detections = self.detect_frames(frames)  # Detecta objetos em cada frame
-
-        tracks = {
-            "player": [],
-            "referees": [],
-            "ball": []
-        }
-
-        for frame_num, detection in enumerate(detections):
-            class_name = detection.names  # Obtém os nomes das classes detectadas
-
-            class_name_inv = {v: k for k, v in class_name.items()}  # Inverte o mapeamento de classes
-
-            detection_supervision = sv.Detections.from_ultralytics(
-                detection)  # Converte as detecções para o formato supervision
-
-            for object_ind, class_id in enumerate(detection_supervision.class_id):
-                # Verifica se algum objeto é um "goalkeeper" e, se for, muda sua classe para "player"
-                if class_name[class_id] == "goalkeeper":
-                    detection_supervision.class_id[object_ind] = class_name_inv["player"]
-
-            detection_with_tracking = self.tracker.update_with_detections(
-                detection_supervision)  # Atualiza o rastreamento dos objetos detectados
-
-            tracks["player"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
-
-            for frame_detection in detection_with_tracking:
-                if frame_detection is None:
-                    continue
-                if frame_detection[0] is None:
-                    continue
-                bbox = frame_detection[0].tolist()  # Converte as coordenadas do retângulo delimitador para uma lista
-                class_id = frame_detection[3]  # Obtém o ID da classe do objeto detectado
-                track_id = frame_detection[4]  # Obtém o ID de rastreamento do objeto detectado
-
-                if class_id == class_name_inv["player"]:
-                    # Se a classe for um jogador, adiciona as informações do rastreamento ao dicionário de jogadores
-                    tracks["player"][frame_num][track_id] = {"bbox": bbox}
-
-                if class_id == class_name_inv["referee"]:
-                    # Se a classe for um árbitro, adiciona as informações do rastreamento ao dicionário de árbitros
-                    tracks["referees"][frame_num][track_id] = {"bbox": bbox}
-
-            for frame_detection in detection_supervision:
-                bbox = frame_detection[0].tolist()  # Converte as coordenadas do retângulo delimitador para uma lista
-                class_id = frame_detection[3]
-
-                if class_id == class_name_inv["ball"]:
-                    # Se a classe for uma bola, adiciona as informações do rastreamento ao dicionário de bola
-                    tracks["ball"][frame_num][1] = {"bbox": bbox}
+        # Com um AnalysisCache e o caminho do vídeo, reaproveita o rastreamento de execuções anteriores
+        cache_key = self.tracking_cache_key(cache, video_path) if cache is not None and video_path else None
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print("Object tracking loaded from cache!")
+                return self.tracks_from_cache(cached[0])
+
+        track_builder = self.create_track_builder()
+        if checkpoint_path is None:
+            # Detecta e rastreia objetos em cada frame; aceita listas ou geradores de frames
+            self.track_frames(frames, track_builder, instrumentation)
+        else:
+            # Com checkpoint_path, o estado é salvo a cada checkpoint_interval frames (de preferência um múltiplo
+            # de batch_size) e uma execução interrompida continua do último checkpoint com o mesmo resultado.
+            # Retomar exige acesso por índice, então aqui frames precisa ser uma lista
+            signature = {"stage": "object_tracking", "model_path": self.model_path, "num_frames": len(frames),
+                         "video": video_signature(video_path) if video_path else None,
+                         "tracking_params": self.tracking_params()}
+            start_frame = 0
+            checkpoint = load_checkpoint(checkpoint_path, signature)
+            if checkpoint is not None:
+                track_builder = checkpoint["track_builder"]
+                self.set_tracking_state(checkpoint["tracking_state"])
+                start_frame = track_builder.num_frames
+                print(f"Resuming object tracking from frame {start_frame}...")
+
+            for window_start in range(start_frame, len(frames), checkpoint_interval):
+                self.track_frames(frames[window_start:window_start + checkpoint_interval], track_builder,
+                                  instrumentation)
+                save_checkpoint(checkpoint_path, signature, {"track_builder": track_builder,
+                                                             "tracking_state": self.get_tracking_state()})
+        tracks = track_builder.build()
+        self.add_team_to_tracks(tracks)
+
+        if cache_key is not None:
+            cache.put(cache_key, self.tracking_cache_arrays(tracks))
+        remove_checkpoint(checkpoint_path)
 
         if stub_path is not None:
             # Se um caminho de stub for fornecido, salva os dados de rastreamento em um arquivo stub
@@ -109,61 +250,84 @@ class Tracker:
         print("Object tracking obtained!")
         return tracks  # Retorna os dados de rastreamento
 
+    def add_team_to_tracks(self, tracks):
+        # Grava o time de cada jogador nas trilhas (só quando assign_teams está ativo)
+        if self.team_assigner is not None:
+            self.team_assigner.add_team_to_tracks(tracks)
+
+    def team_colors(self):
+        # Cores das elipses por time: as cores das camisas, quando já calculadas, ou a paleta padrão
+        colors = self.team_assigner.colors() if self.team_assigner is not None else None
+        return colors or TEAM_COLORS
+
+    def interpolate_ball_positions(self, tracks, max_gap_frames=None):
+        # Preenche os quadros sem bola por interpolação linear (ver ball_tracker.interpolate_ball_positions)
+        return interpolate_ball_positions(tracks, max_gap_frames)
+
+    def track_frames(self, frames, track_builder, instrumentation=None):
+        # Rastreia os frames e acrescenta os resultados ao final de track_builder.
+        # Pode ser chamado várias vezes seguidas com janelas consecutivas do mesmo vídeo.
+        # Com um Instrumentation, a detecção e o rastreamento (ByteTrack) são medidos como etapas separadas.
+        detections = self.iter_frames_with_detections(frames)
+        if instrumentation is None:
+            for frame, (detection_supervision, class_name) in detections:
+                self.add_supervision_detection_to_tracks(detection_supervision, class_name, track_builder, frame)
+            return track_builder
+        for frame, (detection_supervision, class_name) in instrumentation.iterate("detect_frames", detections):
+            with instrumentation.stage("tracking", frames=1):
+                self.add_supervision_detection_to_tracks(detection_supervision, class_name, track_builder, frame)
+        return track_builder
+
+    def add_detection_to_tracks(self, detection, track_builder):
+        # Converte as detecções do YOLO para o formato supervision e as acrescenta às trilhas
+        self.add_supervision_detection_to_tracks(*self.to_supervision(detection), track_builder)
+
+    def class_ids(self, class_name):
+        # Mapeamento nome -> id das classes, recalculado apenas quando o dicionário de nomes muda
+        if class_name is not getattr(self, '_class_name', None):
+            self._class_name = class_name
+            self._class_name_inv = {v: k for k, v in class_name.items()}  # Inverte o mapeamento de classes
+        return self._class_name_inv
+
+    def add_supervision_detection_to_tracks(self, detection_supervision, class_name, track_builder, frame=None):
+        # Com o quadro (frame) e assign_teams, os jogadores do quadro também passam pelo TeamAssigner
+        frame_num = track_builder.new_frame()  # O novo frame é sempre acrescentado ao final
+        first_row = track_builder.size
+        class_name_inv = self.class_ids(class_name)
+
+        if "goalkeeper" in class_name_inv:
+            # Os goleiros são rastreados como jogadores
+            class_id = detection_supervision.class_id
+            class_id[class_id == class_name_inv["goalkeeper"]] = class_name_inv["player"]
+
+        detection_with_tracking = self.tracker.update_with_detections(
+            detection_supervision)  # Atualiza o rastreamento dos objetos detectados
+
+        self.add_tracked_detections_to_tracks(frame_num, detection_with_tracking, detection_supervision,
+                                              class_name_inv, track_builder)
+        if self.team_assigner is not None and frame is not None:
+            object_class, track_id, bbox = track_builder.rows(first_row)
+            is_player = object_class == OBJECT_CLASSES.index('player')
+            self.team_assigner.update(frame, track_id[is_player], bbox[is_player])
+
+    @staticmethod
+    def add_tracked_detections_to_tracks(frame_num, detection_with_tracking, detection_supervision, class_name_inv,
+                                         track_builder):
+        # Acrescenta as linhas do frame diretamente nos buffers, selecionando cada classe com máscaras
+        class_id = detection_with_tracking.class_id
+        for object_name, class_label in (("player", "player"), ("referees", "referee")):
+            rows = class_id == class_name_inv[class_label]
+            track_builder.add_rows(frame_num, object_name, detection_with_tracking.tracker_id[rows],
+                                   detection_with_tracking.xyxy[rows])
+
+        # A bola usa a última detecção do frame (antes do rastreamento) e sempre o ID de rastreamento fixo 1
+        ball_rows = np.flatnonzero(detection_supervision.class_id == class_name_inv["ball"])
+        if len(ball_rows):
+            track_builder.add_rows(frame_num, "ball", [1], detection_supervision.xyxy[ball_rows[-1:]])
+
     def draw_ellipse(self, frame, bbox, color, track_id=None):
-        # Exibe o ID do rastreamento, útil para debugging
-        # print("track_id", track_id)
-        # Coordenada y do canto inferior do retângulo delimitador (bbox)
-        y2 = int(bbox[3])
-
-        # Obtém o centro x do bbox e ignora a coordenada y retornada
-        x_center, _ = get_center_of_bbox(bbox)
-        # Calcula a largura do bbox
-        width = get_bbox_width(bbox)
-
-        # Desenha uma elipse na imagem de entrada
-        cv2.ellipse(frame,
-                    center=(x_center, y2),  # Define o centro da elipse
-                    axes=(int(width), int(0.35 * width)),  # Define os eixos maior e menor da elipse
-                    angle=0.0,  # Sem rotação
-                    startAngle=-45,  # Ângulo inicial para desenhar a elipse
-                    endAngle=235,  # Ângulo final para desenhar a elipse
-                    color=color,  # Cor da elipse
-                    thickness=2,  # Espessura da linha
-                    lineType=cv2.LINE_4  # Tipo de linha
-                    )
-
-        # Define as dimensões do retângulo para o texto do ID
-        rectangle_width = 40
-        rectangle_height = 20
-        x1_rect = x_center - rectangle_width // 2  # Esquerda do retângulo
-        x2_rect = x_center + rectangle_width // 2  # Direita do retângulo
-        y1_rect = y2 - rectangle_height // 2  # Topo do retângulo
-        y2_rect = y2 + rectangle_height // 2  # Base do retângulo
-
-        # if track_id is not None:
-        #     # Se um ID de rastreamento foi fornecido, desenha um retângulo preenchido
-        #     cv2.rectangle(frame,
-        #                   (x1_rect, y1_rect),  # Canto superior esquerdo
-        #                   (x2_rect, y2_rect),  # Canto inferior direito
-        #                   color,  # Cor do retângulo
-        #                   cv2.FILLED)  # Preenchimento do retângulo
-
-        #     # Ajusta a posição x do texto baseado no tamanho do ID do rastreamento
-        #     x1_text = x1_rect + 12
-        #     if track_id > 99:
-        #         x1_text -= 10  # Ajusta para esquerda se o ID é de três dígitos
-
-        #     # Coloca o texto do ID de rastreamento dentro do retângulo
-        #     cv2.putText(frame,
-        #                 f"{track_id}",
-        #                 (int(x1_text), int(y1_rect + 15)),  # Posição do texto
-        #                 cv2.FONT_HERSHEY_SIMPLEX,  # Fonte do texto
-        #                 0.6,  # Tamanho da fonte
-        #                 (0, 0, 0),  # Cor do texto (preto)
-        #                 2  # Espessura do texto
-        #                 )
-
-        return frame  # Retorna o frame com as modificações aplicadas
+        # O desenho da elipse é compartilhado com o FrameRenderer
+        return draw_ellipse(frame, bbox, color)
 
     def draw_annotations(self, video_frames, tracks):
         print("Drawing annotations...")
@@ -175,26 +339,32 @@ class Tracker:
             # Faz uma cópia do quadro atual para evitar modificar o original
             frame = frame.copy()
 
-            # Acessa os dicionários de rastreamentos dos jogadores, árbitros e bola no quadro atual
-            player_dict = tracks["player"][frame_num]
-            referees_dict = tracks["referees"][frame_num]
-            ball_dict = tracks["ball"][frame_num]
-
-            # Para cada jogador rastreado no quadro atual, desenha uma elipse azul
-            for track_id, player in player_dict.items():
-                frame = self.draw_ellipse(frame, player["bbox"], (0, 0, 255), track_id)
-
-            # Para cada árbitro rastreado, desenha uma elipse verde
-            for _, referee in referees_dict.items():
-                frame = self.draw_ellipse(frame, referee["bbox"], (0, 255, 0))
-
-            # Para a bola rastreada, desenha uma elipse vermelha
-            for _, ball in ball_dict.items():
-                frame = self.draw_ellipse(frame, ball["bbox"], (255, 0, 0))
-
             # Adiciona o quadro anotado à lista de quadros de saída
-            output_video_frames.append(frame)
+            output_video_frames.append(self.draw_frame_annotations(frame, frame_num, tracks))
 
         # Retorna a lista de quadros de vídeo com anotações
         print("Annotations drawn!")
-        return output_video_frames
\ No newline at end of file
+        return output_video_frames
+
+    def draw_frame_annotations(self, frame, frame_num, tracks):
+        # Desenha as anotações de um único quadro diretamente sobre ele (sem cópia)
+        # Acessa os dicionários de rastreamentos dos jogadores, árbitros e bola no quadro atual
+        player_dict = tracks["player"][frame_num]
+        referees_dict = tracks["referees"][frame_num]
+        ball_dict = tracks["ball"][frame_num]
+
+        # Para cada jogador rastreado no quadro atual, desenha uma elipse vermelha (ou na cor do seu time)
+        team_colors = self.team_colors()
+        for track_id, player in player_dict.items():
+            color = team_colors.get(player["team"], (0, 0, 255)) if "team" in player else (0, 0, 255)
+            frame = self.draw_ellipse(frame, player["bbox"], color, track_id)
+
+        # Para cada árbitro rastreado, desenha uma elipse verde
+        for _, referee in referees_dict.items():
+            frame = self.draw_ellipse(frame, referee["bbox"], (0, 255, 0))
+
+        # Para a bola rastreada, desenha uma elipse vermelha
+        for _, ball in ball_dict.items():
+            frame = self.draw_ellipse(frame, ball["bbox"], (255, 0, 0))
+
+        return frame
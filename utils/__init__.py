@@ -1,2 +1,6 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position
\ No newline at end of file
+from .video_utils import read_video, read_video_stream, iter_frame_windows, save_video
+from .video_encoder import VideoEncoder, get_video_properties
+from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position
+from .track_table import TrackTable, TrackTableBuilder, OBJECT_CLASSES
+
+from .checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint, video_signature
\ No newline at end of file
@@ -0,0 +1,37 @@
+import os
+import pickle
+
+
+def video_signature(video_path):
+    # Identifica o vídeo pelo caminho, tamanho e data de modificação (barato, sem ler o conteúdo).
+    stat = os.stat(video_path)
+    return {"video_path": os.path.abspath(video_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_checkpoint(checkpoint_path, signature, state):
+    # Grava em um arquivo temporário e renomeia, para que uma interrupção durante a escrita
+    # nunca deixe um checkpoint corrompido no lugar do anterior.
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{checkpoint_path}.tmp"
+    with open(temporary_path, 'wb') as f:
+        pickle.dump({"signature": signature, "state": state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def load_checkpoint(checkpoint_path, signature):
+    # Retorna o estado salvo apenas se ele foi gerado para o mesmo vídeo e os mesmos parâmetros.
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get("signature") != signature:
+        print("Ignoring checkpoint created for a different run:", checkpoint_path)
+        return None
+    return checkpoint["state"]
+
+
+def remove_checkpoint(checkpoint_path):
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
@@ -0,0 +1,289 @@
+import numpy as np
+
+# Classes de objetos rastreados, na mesma ordem das chaves do antigo dicionário de trilhas.
+OBJECT_CLASSES = ("player", "referees", "ball")
+
+# Colunas opcionais da tabela: nome -> (largura, dtype). Valores ausentes são NaN.
+TRACK_COLUMNS = {
+    "position": (2, np.float32),
+    "position_adjusted": (2, np.float32),
+    "position_transformed": (2, np.float32),
+    "speed": (1, np.float32),
+    "distance": (1, np.float32),
+    "team": (1, np.float32),
+    "has_ball": (1, np.float32),
+}
+
+
+def object_class_code(object_name):
+    return OBJECT_CLASSES.index(object_name)
+
+
+class TrackTable():
+    # Tabela colunar de trilhas: uma linha por objeto rastreado em cada quadro.
+    # As linhas ficam ordenadas por quadro, então frame_offsets[f]:frame_offsets[f + 1] são as linhas do quadro f.
+    def __init__(self, frame, object_class, track_id, bbox, num_frames=None, columns=None):
+        frame = np.asarray(frame, dtype=np.int32).reshape(-1)
+        object_class = np.asarray(object_class, dtype=np.int8).reshape(-1)
+        track_id = np.asarray(track_id, dtype=np.int32).reshape(-1)
+        bbox = np.asarray(bbox, dtype=np.float32).reshape(-1, 4)
+        columns = dict(columns or {})
+
+        # Ordena (de forma estável) por quadro e classe, preservando a ordem de inserção dentro do quadro.
+        order = np.lexsort((object_class, frame))
+        if not np.array_equal(order, np.arange(len(order))):
+            frame, object_class, track_id, bbox = frame[order], object_class[order], track_id[order], bbox[order]
+            columns = {name: values[order] for name, values in columns.items()}
+
+        if num_frames is None:
+            num_frames = int(frame[-1]) + 1 if len(frame) else 0
+
+        self.frame = frame
+        self.object_class = object_class
+        self.track_id = track_id
+        self.bbox = bbox
+        self.num_frames = num_frames
+        self.columns = {}
+        for name, values in columns.items():
+            self.set_column(name, values)
+
+        self.frame_offsets = np.searchsorted(frame, np.arange(num_frames + 1)).astype(np.int64)
+        self._track_index = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def from_dict(cls, tracks):
+        # Converte o antigo formato {"player": [{track_id: {"bbox": ...}}]} para a tabela.
+        builder = TrackTableBuilder()
+        num_frames = max((len(object_tracks) for object_tracks in tracks.values()), default=0)
+        columns = {name: [] for name in TRACK_COLUMNS}
+        present = set()
+        for frame_num in range(num_frames):
+            builder.new_frame()
+            for object_name in OBJECT_CLASSES:
+                object_tracks = tracks.get(object_name, [])
+                if frame_num >= len(object_tracks):
+                    continue
+                for track_id, track_info in object_tracks[frame_num].items():
+                    builder.add(frame_num, object_name, track_id, track_info['bbox'])
+                    for name in TRACK_COLUMNS:
+                        if name in track_info:
+                            present.add(name)
+                        columns[name].append(track_info.get(name))
+        table = builder.build()
+        for name in present:
+            values = np.full((len(table), TRACK_COLUMNS[name][0]), np.nan)
+            for row, value in enumerate(columns[name]):
+                if value is not None:
+                    values[row] = np.ravel(value)
+            table.set_column(name, values)
+        return table
+
+    def to_arrays(self):
+        # Representação só com arrays NumPy (para gravar em .npy e carregar com mmap).
+        arrays = {
+            "frame": self.frame,
+            "object_class": self.object_class,
+            "track_id": self.track_id,
+            "bbox": self.bbox,
+            "num_frames": np.array([self.num_frames], dtype=np.int64),
+        }
+        for name, values in self.columns.items():
+            arrays[f"column_{name}"] = values
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        columns = {name[len("column_"):]: values for name, values in arrays.items() if name.startswith("column_")}
+        return cls(arrays["frame"], arrays["object_class"], arrays["track_id"], arrays["bbox"],
+                   num_frames=int(arrays["num_frames"][0]), columns=columns)
+
+    def to_dict(self):
+        # Materializa o antigo formato de dicionários (útil para código legado e stubs antigos).
+        return {object_name: list(self[object_name]) for object_name in OBJECT_CLASSES}
+
+    def has_column(self, name):
+        return name in self.columns
+
+    def get_column(self, name):
+        return self.columns[name]
+
+    def set_column(self, name, values):
+        width, dtype = TRACK_COLUMNS[name]
+        values = np.asarray(values, dtype=dtype)
+        values = values.reshape(len(self.frame)) if width == 1 else values.reshape(len(self.frame), width)
+        self.columns[name] = values
+
+    def ensure_column(self, name):
+        # Cria a coluna preenchida com NaN caso ainda não exista.
+        if name not in self.columns:
+            width, dtype = TRACK_COLUMNS[name]
+            shape = (len(self.frame),) if width == 1 else (len(self.frame), width)
+            self.columns[name] = np.full(shape, np.nan, dtype=dtype)
+        return self.columns[name]
+
+    def frame_slice(self, frame_num):
+        return slice(int(self.frame_offsets[frame_num]), int(self.frame_offsets[frame_num + 1]))
+
+    def object_mask(self, object_name):
+        return self.object_class == object_class_code(object_name)
+
+    def _build_track_index(self):
+        # Índice por trilha: linhas ordenadas por (classe, track_id, quadro) e os deslocamentos de cada trilha.
+        order = np.lexsort((self.frame, self.track_id, self.object_class))
+        object_class = self.object_class[order]
+        track_id = self.track_id[order]
+        starts = np.flatnonzero(np.r_[True, (object_class[1:] != object_class[:-1]) |
+                                      (track_id[1:] != track_id[:-1])]) if len(order) else np.zeros(0, np.int64)
+        self._track_index = {
+            "order": order,
+            "offsets": np.r_[starts, len(order)].astype(np.int64),
+            "object_class": object_class[starts],
+            "track_id": track_id[starts],
+        }
+
+    @property
+    def track_index(self):
+        if self._track_index is None:
+            self._build_track_index()
+        return self._track_index
+
+    def track_rows(self, object_name, track_id):
+        # Retorna as linhas de uma trilha ordenadas por quadro.
+        index = self.track_index
+        matches = np.flatnonzero((index["object_class"] == object_class_code(object_name)) &
+                                 (index["track_id"] == track_id))
+        if not len(matches):
+            return np.zeros(0, dtype=np.int64)
+        k = matches[0]
+        return index["order"][index["offsets"][k]:index["offsets"][k + 1]]
+
+    def iter_tracks(self, object_name=None):
+        index = self.track_index
+        for k in range(len(index["track_id"])):
+            name = OBJECT_CLASSES[index["object_class"][k]]
+            if object_name is not None and name != object_name:
+                continue
+            rows = index["order"][index["offsets"][k]:index["offsets"][k + 1]]
+            yield name, int(index["track_id"][k]), rows
+
+    def row_dict(self, row):
+        # Reconstrói o dicionário de uma linha no formato antigo.
+        info = {"bbox": self.bbox[row].tolist()}
+        for name, values in self.columns.items():
+            value = values[row]
+            if name == "position":
+                info[name] = (int(value[0]), int(value[1]))
+            elif name == "position_adjusted":
+                info[name] = (float(value[0]), float(value[1]))
+            elif name == "position_transformed":
+                info[name] = None if np.isnan(value[0]) else value.tolist()
+            elif name == "team":
+                if not np.isnan(value):
+                    info[name] = int(value)
+            elif name == "has_ball":
+                if value == 1:
+                    info[name] = True
+            elif not np.isnan(value):
+                # Velocidade e distância só aparecem nos quadros em que foram calculadas.
+                info[name] = float(value)
+        return info
+
+    # Visão de compatibilidade: tracks["player"][frame_num] continua devolvendo {track_id: {...}}.
+    def __getitem__(self, object_name):
+        return TrackTableObjectView(self, object_name)
+
+    def __contains__(self, object_name):
+        return object_name in OBJECT_CLASSES
+
+    def __iter__(self):
+        return iter(OBJECT_CLASSES)
+
+    def keys(self):
+        return list(OBJECT_CLASSES)
+
+    def items(self):
+        return [(object_name, self[object_name]) for object_name in OBJECT_CLASSES]
+
+
+class TrackTableObjectView():
+    # Sequência somente leitura de dicionários por quadro para uma classe de objeto.
+    def __init__(self, table, object_name):
+        self.table = table
+        self.object_class = object_class_code(object_name)
+
+    def __len__(self):
+        return self.table.num_frames
+
+    def __getitem__(self, frame_num):
+        if frame_num < 0:
+            frame_num += self.table.num_frames
+        if not 0 <= frame_num < self.table.num_frames:
+            raise IndexError(frame_num)
+        frame_slice = self.table.frame_slice(frame_num)
+        rows = np.arange(frame_slice.start, frame_slice.stop)
+        rows = rows[self.table.object_class[frame_slice] == self.object_class]
+        return {int(self.table.track_id[row]): self.table.row_dict(row) for row in rows}
+
+    def __iter__(self):
+        for frame_num in range(len(self)):
+            yield self[frame_num]
+
+
+class TrackTableBuilder():
+    # Acumula linhas quadro a quadro em buffers que crescem por duplicação.
+    def __init__(self, initial_capacity=1024):
+        self.num_frames = 0
+        self.size = 0
+        self._frame = np.zeros(initial_capacity, dtype=np.int32)
+        self._object_class = np.zeros(initial_capacity, dtype=np.int8)
+        self._track_id = np.zeros(initial_capacity, dtype=np.int32)
+        self._bbox = np.zeros((initial_capacity, 4), dtype=np.float32)
+
+    def new_frame(self):
+        # Abre um novo quadro (mesmo que ele não tenha objetos) e retorna o seu número.
+        self.num_frames += 1
+        return self.num_frames - 1
+
+    def _reserve(self, extra):
+        capacity = len(self._frame)
+        if self.size + extra <= capacity:
+            return
+        new_capacity = max(capacity * 2, self.size + extra)
+        for name in ("_frame", "_object_class", "_track_id", "_bbox"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add_rows(self, frame_num, object_name, track_ids, bboxes):
+        track_ids = np.asarray(track_ids).reshape(-1)
+        count = len(track_ids)
+        if not count:
+            return
+        self._reserve(count)
+        end = self.size + count
+        self._frame[self.size:end] = frame_num
+        self._object_class[self.size:end] = object_class_code(object_name)
+        self._track_id[self.size:end] = track_ids
+        self._bbox[self.size:end] = np.asarray(bboxes, dtype=np.float32).reshape(count, 4)
+        self.size = end
+
+    def add(self, frame_num, object_name, track_id, bbox):
+        self.add_rows(frame_num, object_name, [track_id], [bbox])
+
+    def rows(self, start, stop=None):
+        # Visões (sem cópia) das linhas [start, stop) já acrescentadas: classe, track_id e bbox.
+        stop = self.size if stop is None else stop
+        return self._object_class[start:stop], self._track_id[start:stop], self._bbox[start:stop]
+
+    def clear(self):
+        # Descarta as linhas acumuladas (mantendo os buffers e a contagem de quadros).
+        self.size = 0
+
+    def build(self):
+        return TrackTable(self._frame[:self.size].copy(), self._object_class[:self.size].copy(),
+                          self._track_id[:self.size].copy(), self._bbox[:self.size].copy(),
+                          num_frames=self.num_frames)
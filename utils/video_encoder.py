@@ -0,0 +1,121 @@
+import os
+import queue
+import threading
+import cv2
+
+# Marca o fim da fila de quadros do encoder.
+_CLOSE = object()
+
+
+def get_video_properties(video_path):
+    # Lê FPS, resolução e número de quadros dos metadados do vídeo.
+    cap = cv2.VideoCapture(video_path)
+    properties = {
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    cap.release()
+    return properties
+
+
+class VideoEncoder():
+    # Grava quadros à medida que são produzidos. Com background=True a codificação roda em uma thread
+    # separada, alimentada por uma fila limitada; com segment_length, a saída é dividida em arquivos de
+    # segment_length quadros (video_000.avi, video_001.avi, ...) que podem ser publicados assim que fecham.
+    def __init__(self, output_video_path, fps=30, frame_size=None, codec='XVID', segment_length=None,
+                 background=True, queue_size=32, on_segment_closed=None):
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.codec = codec
+        self.segment_length = segment_length
+        self.on_segment_closed = on_segment_closed
+        self.frames_written = 0
+        self.output_paths = []
+        self._writer = None
+        self._segment_frames = 0
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, name="video-encoder", daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_video(cls, source_video_path, output_video_path, **kwargs):
+        # Usa o FPS e a resolução do vídeo de origem (quando disponíveis nos metadados).
+        properties = get_video_properties(source_video_path)
+        if properties["fps"] > 0:
+            kwargs.setdefault("fps", properties["fps"])
+        if properties["width"] > 0 and properties["height"] > 0:
+            kwargs.setdefault("frame_size", (properties["width"], properties["height"]))
+        return cls(output_video_path, **kwargs)
+
+    def _segment_path(self):
+        if self.segment_length is None:
+            return self.output_video_path
+        base, extension = os.path.splitext(self.output_video_path)
+        return f"{base}_{len(self.output_paths):03d}{extension}"
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+            if self.on_segment_closed is not None:
+                self.on_segment_closed(self.output_paths[-1])
+
+    def _encode(self, frame):
+        if self.frame_size is None:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+        if (frame.shape[1], frame.shape[0]) != tuple(self.frame_size):
+            frame = cv2.resize(frame, tuple(self.frame_size))
+        if self._writer is None:
+            path = self._segment_path()
+            self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), self.fps,
+                                           tuple(self.frame_size))
+            self.output_paths.append(path)
+            self._segment_frames = 0
+        self._writer.write(frame)
+        self._segment_frames += 1
+        self.frames_written += 1
+        if self.segment_length is not None and self._segment_frames >= self.segment_length:
+            self._close_writer()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is _CLOSE:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self._encode(frame)
+            except Exception as error:
+                self._error = error
+
+    def write(self, frame):
+        if self._error is not None:
+            raise RuntimeError("Video encoding failed") from self._error
+        if self._queue is None:
+            self._encode(frame)
+        else:
+            self._queue.put(frame)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+        self._close_writer()
+        if self._error is not None:
+            raise RuntimeError("Video encoding failed") from self._error
+        return self.output_paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,4 +1,5 @@
 import cv2
+from .video_encoder import VideoEncoder
 
 def read_video(video_path):
     print('Reading video from:', video_path)
@@ -13,12 +14,43 @@ def read_video(video_path):
     print('Video read successfully!')
     return frames
 
-def save_video(output_video_frames, output_video_path):
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_video_path, fourcc, 30, (output_video_frames[0].shape[1], output_video_frames[0].shape[0]))
+def read_video_stream(video_path, start_frame=0):
+    # Lê os quadros sob demanda, sem manter o vídeo inteiro em memória
+    cap = cv2.VideoCapture(video_path)
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def iter_frame_windows(frames, window_size):
+    # Agrupa quadros de qualquer iterável em janelas de no máximo window_size quadros
+    window = []
+    for frame in frames:
+        window.append(frame)
+        if len(window) == window_size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+def save_video(output_video_frames, output_video_path, fps=30, codec='XVID', segment_length=None):
+    # Aceita tanto uma lista quanto um gerador de quadros; a codificação roda em segundo plano
+    # enquanto o gerador produz os próximos quadros.
     print('Saving video to:', output_video_path)
-    for frame in output_video_frames:
-        out.write(frame)
-    out.release()
+    encoder = VideoEncoder(output_video_path, fps=fps, codec=codec, segment_length=segment_length)
+    try:
+        for frame in output_video_frames:
+            encoder.write(frame)
+    finally:
+        output_paths = encoder.close()
+    if not output_paths:
+        print('No frames to save to:', output_video_path)
+        return output_paths
     print('Video saved successfully!')
-    
+    return output_paths
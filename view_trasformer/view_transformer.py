@@ -1,5 +1,8 @@
 import numpy as np
 import cv2
+import sys
+sys.path.append('../')
+from utils import TrackTable
 
 
 class ViewTransformer():
@@ -7,6 +10,8 @@ class ViewTransformer():
         # Definição das dimensões.
         court_width = 68
         court_length = 23.32
+        self.court_width = court_width
+        self.court_length = court_length
 
         # Definição dos vértices da quadra na imagem pixelada.
         self.pixel_vertices = np.array([[110, 1035],
@@ -45,24 +50,115 @@ class ViewTransformer():
         # Redimensiona o ponto transformado para o formato padrão.
         return transformed_point.reshape(-1, 2)
 
-    def add_transformed_position_to_tracks(self, tracks):
+    def points_inside_pitch(self, points):
+        # Equivalente vetorizado de cv2.pointPolygonTest(..., False) >= 0 para um array (N, 2) de pontos.
+        # Assim como em transform_point, as coordenadas são truncadas para inteiros antes do teste.
+        points = np.trunc(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        px, py = points[:, 0], points[:, 1]
+        inside = np.zeros(len(points), dtype=bool)
+        on_edge = np.zeros(len(points), dtype=bool)
+        vertices = self.pixel_vertices.astype(np.float64)
+
+        for (ax, ay), (bx, by) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            # Pontos sobre a aresta contam como dentro do polígono.
+            cross = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+            on_edge |= ((cross == 0) & (np.minimum(ax, bx) <= px) & (px <= np.maximum(ax, bx)) &
+                        (np.minimum(ay, by) <= py) & (py <= np.maximum(ay, by)))
+            # Teste do raio horizontal: alterna o estado a cada aresta cruzada.
+            crosses_y = (ay > py) != (by > py)
+            if ay != by:
+                x_intersection = (bx - ax) * (py - ay) / (by - ay) + ax
+                inside ^= crosses_y & (px < x_intersection)
+
+        return inside | on_edge
+
+    def transform_points(self, points):
+        # Transforma um array (N, 2) de posições ajustadas em uma única chamada.
+        # Retorna as coordenadas no campo (NaN fora do campo) e a máscara de pontos dentro do campo.
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        inside = self.points_inside_pitch(points)
+        transformed = np.full(points.shape, np.nan, dtype=np.float32)
+        if inside.any():
+            inside_points = points[inside].reshape(-1, 1, 2)
+            transformed[inside] = cv2.perspectiveTransform(inside_points, self.perspective_transformer).reshape(-1, 2)
+        return transformed, inside
+
+    def get_frame_homographies(self, motion_matrices):
+        # Combina o movimento da câmera de cada quadro com a transformação de perspectiva: H = P @ M.
+        motion_matrices = np.asarray(motion_matrices, dtype=np.float64).reshape(-1, 3, 3)
+        return np.matmul(self.perspective_transformer, motion_matrices)
+
+    def transform_points_per_frame(self, points, frame_indices, frame_homographies, chunk_size=262144):
+        # Projeta as posições originais (sem ajuste) direto para o campo usando a homografia do seu quadro.
+        # O teste de "dentro do campo" é feito no espaço do campo, que é o retângulo dos target_vertices.
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        frame_indices = np.asarray(frame_indices).reshape(-1)
+        homographies = np.asarray(frame_homographies, dtype=np.float64).reshape(-1, 9)
+        transformed = np.full(points.shape, np.nan, dtype=np.float32)
+        inside = np.zeros(len(points), dtype=bool)
+
+        # Processa em blocos para limitar a memória das matrizes replicadas por ponto.
+        for start in range(0, len(points), chunk_size):
+            end = min(start + chunk_size, len(points))
+            h = homographies[frame_indices[start:end]]
+            x, y = points[start:end, 0], points[start:end, 1]
+            w = h[:, 6] * x + h[:, 7] * y + h[:, 8]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tx = (h[:, 0] * x + h[:, 1] * y + h[:, 2]) / w
+                ty = (h[:, 3] * x + h[:, 4] * y + h[:, 5]) / w
+            chunk_inside = ((w > 0) & (tx >= 0) & (tx <= self.court_length) &
+                            (ty >= 0) & (ty <= self.court_width))
+            inside[start:end] = chunk_inside
+            transformed[start:end] = np.where(chunk_inside[:, None], np.stack([tx, ty], axis=1), np.nan)
+        return transformed, inside
+
+    def add_transformed_position_to_tracks(self, tracks, motion_matrices=None):
         print("Adding transformed positions to tracks...")
-        # Itera sobre cada objeto e suas trilhas dentro do dicionário de trilhas.
-        for object, object_tracks in tracks.items():
-            # Itera sobre cada quadro e sua respectiva trilha para o objeto.
-            for frame_num, track in enumerate(object_tracks):
-                # Itera sobre cada identificador de trilha e suas informações no quadro atual.
-                for track_id, track_info in track.items():
-                    # Obtém a posição ajustada armazenada na trilha.
-                    position = track_info['position_adjusted']
-                    # Converte a posição para um array NumPy para facilitar transformações.
-                    position = np.array(position)
-                    # Transforma a posição utilizando uma função definida pelo usuário.
-                    position_transformed = self.transform_point(position)
-                    # Verifica se a posição transformada não é nula.
-                    if position_transformed is not None:
-                        # Reduz a dimensão do array e converte para lista.
-                        position_transformed = position_transformed.squeeze().tolist()
-                    # Atualiza a trilha com a nova posição transformada.
-                    tracks[object][frame_num][track_id]['position_transformed'] = position_transformed
+        if motion_matrices is not None:
+            # Modo de homografia por quadro: dispensa o passo separado de ajuste pela câmera.
+            self._add_per_frame_transformed_position_to_tracks(tracks, motion_matrices)
+            print("Transformed positions added to tracks!")
+            return
+
+        if isinstance(tracks, TrackTable):
+            # Pontos fora do campo ficam como NaN (equivalente ao None do formato antigo).
+            position_transformed, _ = self.transform_points(tracks.get_column('position_adjusted'))
+            tracks.set_column('position_transformed', position_transformed)
+            print("Transformed positions added to tracks!")
+            return
+
+        # Reúne todas as posições ajustadas para transformá-las em lote.
+        entries = [track_info for object_tracks in tracks.values() for track in object_tracks
+                   for track_info in track.values()]
+        if not entries:
+            print("Transformed positions added to tracks!")
+            return
+        positions = np.array([track_info['position_adjusted'] for track_info in entries], dtype=np.float32)
+        position_transformed, inside = self.transform_points(positions)
+
+        # Atualiza cada trilha com a nova posição transformada (None quando está fora do campo).
+        for track_info, transformed, is_inside in zip(entries, position_transformed.tolist(), inside):
+            track_info['position_transformed'] = transformed if is_inside else None
         print("Transformed positions added to tracks!")
+
+    def _add_per_frame_transformed_position_to_tracks(self, tracks, motion_matrices):
+        frame_homographies = self.get_frame_homographies(motion_matrices)
+        if isinstance(tracks, TrackTable):
+            position_transformed, _ = self.transform_points_per_frame(tracks.get_column('position'), tracks.frame,
+                                                                      frame_homographies)
+            tracks.set_column('position_transformed', position_transformed)
+            return
+
+        entries = []
+        frame_indices = []
+        for object_tracks in tracks.values():
+            for frame_num, track in enumerate(object_tracks):
+                for track_info in track.values():
+                    entries.append(track_info)
+                    frame_indices.append(frame_num)
+        if not entries:
+            return
+        positions = np.array([track_info['position'] for track_info in entries], dtype=np.float64)
+        position_transformed, inside = self.transform_points_per_frame(positions, frame_indices, frame_homographies)
+        for track_info, transformed, is_inside in zip(entries, position_transformed.tolist(), inside):
+            track_info['position_transformed'] = transformed if is_inside else None
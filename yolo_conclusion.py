@@ -1,9 +1,15 @@
-from ultralytics import YOLO
+from trackers.inference_backend import InferenceBackend
 
-model = YOLO('models/best.pt')
+# Backend de inferência: 'pytorch' usa os pesos originais com o YOLO.predict de sempre. 'onnx', 'openvino' ou
+# 'torchscript' exportam o modelo uma única vez para models/exports/ e exigem o pacote do formato (por exemplo
+# onnx e onnxruntime), que não está em requirements.txt
+BACKEND = 'pytorch'
 
-results = model.predict('input_videos/08fd33_0.mp4', save=True)
+backend = InferenceBackend('models/best.pt', backend=BACKEND, batch_size=1)
+
+# Grava o vídeo anotado (em runs/detect/), como antes, com o modelo do backend escolhido
+results = backend.model.predict('input_videos/08fd33_0.mp4', save=True)
 print(results[0])
 print('=============================================')
 for box in results[0].boxes:
-    print(box)
\ No newline at end of file
+    print(box)